@@ -0,0 +1,126 @@
+"""
+One entry point for the Python scripts.
+
+  python -m scripts                         list commands and whether their env is set
+  python -m scripts <command> [args...]     run scripts/<command>.py with args
+  python -m scripts health [command...]     check env vars and dependencies (exit 1 if not ready)
+
+e.g. `python -m scripts generate-blog-covers --dry-run --limit 5`. Nothing
+heavy is imported until a command is chosen, and a command's credentials are
+checked before its script is even loaded: --help needs none, --dry-run skips
+the ones only live runs use (usually GEMINI_API_KEY).
+"""
+
+import importlib.util
+import os
+import runpy
+import sys
+from dataclasses import dataclass
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# `python -m scripts` runs from the repo root; the scripts import `common.*`
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from common import env
+
+DB = ("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
+MGMT = ("SUPABASE_ACCESS_TOKEN",)
+GEMINI = ("GEMINI_API_KEY",)
+
+
+@dataclass
+class Command:
+    summary: str
+    env: tuple = ()        # needed by every run except --help
+    live_env: tuple = ()   # not needed with --dry-run
+    deps: tuple = ("requests",)
+
+
+COMMANDS = {
+    "generate-blog-articles": Command("Write and publish blog articles with Gemini", DB, GEMINI),
+    "generate-blog-covers": Command("Generate cover images for posts without one", DB, GEMINI),
+    "analyze-posts": Command("Precompute TOC, word count and links of posts", DB),
+    "compute-related-posts": Command("Precompute related posts (TF-IDF neighbours)", DB, (),
+                                     ("requests", "numpy", "scipy")),
+    "build-search-index": Command("Build the client-side search index shards", DB),
+    "generate-collection-covers": Command("Generate collection cover artwork", (), GEMINI + DB + MGMT),
+    "generate-category-artwork": Command("Generate category artwork", (), GEMINI + DB),
+    "generate-brand-assets": Command("Generate logo, OG image and card art", (), GEMINI + DB, ("requests", "PIL")),
+    "generate-missing-covers": Command("Cover AI collections that have no image", GEMINI + DB),
+    "seed-categories-tags": Command("Seed categories/tags and categorize locations", DB + MGMT),
+    "seed-new-collections": Command("Seed curated collections", DB),
+    "populate-collection-locations": Command("Rebuild collection_locations from rules", DB, (), ("supabase",)),
+    "patch-unmatched-categories": Command("Categorize locations the keyword pass missed", DB + MGMT),
+    "classify-unmatched-locations": Command("N-gram classifier for uncategorized locations", DB + MGMT, (),
+                                            ("requests", "numpy", "scipy")),
+    "generate-categorize-sql": Command("Regenerate the categorize_locations() migration", deps=()),
+    "gemini-usage-report": Command("Aggregate Gemini token usage across runs", deps=()),
+    "mock-api-server": Command("Offline mock of Gemini, PostgREST, Storage and SQL", deps=()),
+    "benchmark-hot-paths": Command("Benchmark matching/slugify hot paths", deps=()),
+    "benchmark-pipelines": Command("Throughput sweep of the generators against the mock", deps=("requests",)),
+}
+
+
+def needed_env(command: Command, args: list[str]) -> tuple:
+    if "-h" in args or "--help" in args:
+        return ()
+    return command.env if "--dry-run" in args else command.env + command.live_env
+
+
+def missing_deps(command: Command) -> list[str]:
+    return [name for name in command.deps if importlib.util.find_spec(name) is None]
+
+
+def list_commands():
+    print("usage: python -m scripts <command> [args...]   (python -m scripts health [command...])\n")
+    width = max(map(len, COMMANDS))
+    for name, command in COMMANDS.items():
+        absent = env.missing(*command.env, *command.live_env)
+        status = f"needs {', '.join(absent)}" if absent else "ready"
+        print(f"  {name:{width}s}  {command.summary:52s} {status}")
+
+
+def health(names: list[str]) -> int:
+    unknown = [n for n in names if n not in COMMANDS]
+    if unknown:
+        print(f"Unknown command(s): {', '.join(unknown)}")
+        return 2
+    failures = 0
+    for name in names or COMMANDS:
+        command = COMMANDS[name]
+        problems = [f"env {v}" for v in env.missing(*command.env, *command.live_env)]
+        problems += [f"module {m}" for m in missing_deps(command)]
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok  '} {name}" + (f": missing {', '.join(problems)}" if problems else ""))
+    return 1 if failures else 0
+
+
+def run(name: str, args: list[str]):
+    command = COMMANDS[name]
+    absent = env.missing(*needed_env(command, args))
+    if absent:
+        print(f"ERROR: {name} needs environment variables: {', '.join(absent)}")
+        sys.exit(1)
+    path = os.path.join(SCRIPTS_DIR, f"{name}.py")
+    sys.argv = [path, *args]
+    runpy.run_path(path, run_name="__main__")
+
+
+def main():
+    argv = sys.argv[1:]
+    if not argv or argv[0] in ("-h", "--help", "list"):
+        list_commands()
+        return
+    name, args = argv[0].removesuffix(".py"), argv[1:]
+    if name == "health":
+        sys.exit(health(args))
+    if name not in COMMANDS:
+        print(f"Unknown command: {name}\n")
+        list_commands()
+        sys.exit(2)
+    run(name, args)
+
+
+if __name__ == "__main__":
+    main()
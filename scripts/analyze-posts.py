@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Fill the precomputed post columns (toc, word_count, place_slugs, images) for
+posts written before generate-blog-articles.py stored them, or edited since.
+
+Each post's content goes through common/post_html.py once; headings without
+an id get one, so the content is written back along with the derivatives.
+Writing place_slugs also refreshes the post's location_posts rows (the
+reverse index place pages read, kept in sync by a trigger), so this is the
+backfill for both.
+
+reading_time is only filled in when it is NULL or the post came from the
+generator (no author_id); an admin-authored post keeps the value its author set.
+
+Usage:
+  export SUPABASE_URL="..." SUPABASE_SERVICE_ROLE_KEY="..."
+  python3 scripts/analyze-posts.py              # posts never analyzed (word_count IS NULL)
+  python3 scripts/analyze-posts.py --all        # every post, e.g. after changing the analyzer
+  python3 scripts/analyze-posts.py --dry-run    # print what would change
+"""
+
+import argparse
+import os
+import requests
+
+from common import env, post_html, profiling, telemetry
+from common.endpoints import supabase_url
+from common.pipeline import run_items
+
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+PAGE_SIZE = 100
+
+HEADERS_REST = {
+    "apikey": SERVICE_ROLE_KEY,
+    "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
+    "Content-Type": "application/json",
+    "Prefer": "return=minimal",
+}
+
+
+@telemetry.instrument("rest.get_posts")
+def get_posts(after_id: str, only_new: bool) -> list:
+    """One page of posts with id > after_id, in id order."""
+    params = {"select": "id,slug,content,reading_time,author_id", "order": "id.asc", "limit": PAGE_SIZE}
+    if after_id:
+        params["id"] = f"gt.{after_id}"
+    if only_new:
+        params["word_count"] = "is.null"
+    resp = requests.get(f"{SUPABASE_URL}/rest/v1/posts", headers=HEADERS_REST, params=params, timeout=30)
+    if resp.status_code != 200:
+        print(f"Error fetching posts: {resp.status_code} {resp.text[:300]}")
+        return []
+    return resp.json()
+
+
+@telemetry.instrument("rest.update_post", ok=bool)
+def update_post(post_id: str, data: dict) -> bool:
+    resp = requests.patch(f"{SUPABASE_URL}/rest/v1/posts?id=eq.{post_id}", headers=HEADERS_REST,
+                          json=data, timeout=30)
+    if resp.status_code not in (200, 204):
+        print(f"  DB update error ({resp.status_code}): {resp.text[:300]}")
+        return False
+    return True
+
+
+def analyze_post(post: dict, dry_run: bool) -> bool:
+    analysis = post_html.analyze(post.get("content") or "")
+    print(f"  {post['slug']}: {analysis.word_count} words, {len(analysis.toc)} headings, "
+          f"{len(analysis.place_slugs)} place links, {len(analysis.images)} images")
+    if dry_run:
+        return True
+    data = {
+        "toc": analysis.toc,
+        "word_count": analysis.word_count,
+        "place_slugs": analysis.place_slugs,
+        "images": analysis.images,
+    }
+    if post.get("reading_time") is None or post.get("author_id") is None:
+        data["reading_time"] = analysis.reading_time
+    if analysis.content != post.get("content"):
+        data["content"] = analysis.content
+    return update_post(post["id"], data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--all", action="store_true", help="Re-analyze every post, not just unanalyzed ones")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--workers", type=int, default=4, help="Posts updated in parallel")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
+    args = parser.parse_args()
+    telemetry.start_run("analyze-posts", profile=args.profile)
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
+
+    print(f"{'=' * 60}")
+    print(f"Post Analyzer — {'all posts' if args.all else 'posts not analyzed yet'}")
+    print(f"{'=' * 60}")
+
+    done = failed = 0
+    after_id = ""
+    while True:
+        posts = get_posts(after_id, only_new=not args.all)
+        if not posts:
+            break
+        outcomes = run_items(posts, lambda p: analyze_post(p, args.dry_run), workers=args.workers)
+        done += sum(outcomes)
+        failed += len(outcomes) - sum(outcomes)
+        after_id = posts[-1]["id"]
+
+    print(f"\n{'=' * 60}")
+    print(f"Done! Analyzed: {done} | Failed: {failed}" + (" (dry run)" if args.dry_run else ""))
+    print(f"{'=' * 60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Benchmark the matching, scoring and text-processing hot paths on synthetic
+Vietnamese catalogues, and compare against a stored baseline.
+
+Benchmarks (N = catalogue size):
+  match_category / match_expanded   N location names
+  slugify                           N location names
+  location_store.build              stream N locations (+ memberships) into a LocationStore
+  match_locations                   every COLLECTION_RULES entry over a store of N rows
+  get_scene_for_post                N post titles/tags
+  prompt_context.encode              N locations, in prompt-sized groups of 15
+  estimate_reading_time             N / 100 articles of ~1,500 words
+
+Usage:
+  python3 scripts/benchmark-hot-paths.py                         # 1k, 10k, 100k
+  python3 scripts/benchmark-hot-paths.py --sizes 1k,10k,100k,1M
+  python3 scripts/benchmark-hot-paths.py --only match_category,slugify
+  python3 scripts/benchmark-hot-paths.py --save-baseline         # record this machine's numbers
+  python3 scripts/benchmark-hot-paths.py --tolerance 0.15        # exit 1 on >15% regression
+
+ops/sec is the best of --repeat runs; peak MB is the tracemalloc peak of one
+extra run of the timed body (prepared inputs excluded); "exp" is the fitted
+exponent of time vs N (1.0 = linear).
+
+The baseline is machine-specific: record it on the machine that runs the
+comparison (e.g. the cron host) before relying on the exit code.
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import cycle, islice
+from typing import Callable
+
+from common import prompt_context, synthetic
+from common.category_keywords import match_category, match_expanded
+from common.collection_rules import COLLECTION_RULES, all_rule_keywords
+from common.location_store import LocationStore, match_locations
+from common.script_loader import SCRIPTS_DIR, load_script
+
+DEFAULT_BASELINE = os.path.join(SCRIPTS_DIR, "benchmarks", "hot-paths-baseline.json")
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def size_label(n: int) -> str:
+    if n >= 1_000_000 and n % 1_000_000 == 0:
+        return f"{n // 1_000_000}M"
+    if n >= 1_000 and n % 1_000 == 0:
+        return f"{n // 1_000}k"
+    return str(n)
+
+
+# ─── Benchmarks ──────────────────────────────────────────────────────────────
+# prepare(n) builds the inputs (untimed) and returns (run, ops): run() is the
+# timed body and ops the number of operations one run performs.
+
+@dataclass
+class Bench:
+    name: str
+    prepare: Callable[[int], tuple[Callable[[], None], int]]
+    unit: str = "ops"
+
+
+def _names(n):
+    return synthetic.location_names(n, seed=n)
+
+
+def bench_match_category(n):
+    names = _names(n)
+    return (lambda: [match_category(x) for x in names]), n
+
+
+def bench_match_expanded(n):
+    names = _names(n)
+    return (lambda: [match_expanded(x) for x in names]), n
+
+
+def bench_slugify(n):
+    articles = load_script("generate-blog-articles.py")
+    names = _names(n)
+    return (lambda: [articles.slugify(x) for x in names]), n
+
+
+def _fill_store(n) -> LocationStore:
+    store = LocationStore(all_rule_keywords())
+    memberships = []
+    for loc in synthetic.locations(n, seed=n):
+        store.add(loc)
+        memberships.append((loc["id"], loc["category_slugs"], loc["tag_slugs"]))
+    for location_id, categories, tags in memberships:
+        for slug in categories:
+            store.add_category(location_id, slug)
+        for slug in tags:
+            store.add_tag(location_id, slug)
+    return store
+
+
+def bench_store_build(n):
+    return (lambda: _fill_store(n)), n
+
+
+def bench_match_locations(n):
+    store = _fill_store(n)
+    rules = list(COLLECTION_RULES.values())
+    return (lambda: [match_locations(store, r) for r in rules]), n * len(rules)
+
+
+def bench_get_scene(n):
+    covers = load_script("generate-blog-covers.py")
+    posts = [(p["title"], p["category"], p["tags"]) for p in synthetic.posts(n, seed=n)]
+    return (lambda: [covers.get_scene_for_post(*p) for p in posts]), n
+
+
+def bench_prompt_context(n):
+    # Reuse a bounded pool of rows so 1M doesn't mean 1M dicts in memory
+    pool = list(synthetic.locations(min(n, 30_000), seed=n))
+    groups = [list(islice(cycle(pool), start, start + 15)) for start in range(0, min(n, len(pool)), 15)]
+    calls = math.ceil(n / 15)
+    return (lambda: [prompt_context.encode(g, 1500) for g in islice(cycle(groups), calls)]), n
+
+
+def bench_reading_time(n):
+    articles = load_script("generate-blog-articles.py")
+    rng = random.Random(n)
+    pool = [synthetic.article_html(1500, rng, [f"loc-{i}" for i in range(rng.randint(5, 15))]) for _ in range(100)]
+    count = max(10, n // 100)
+    return (lambda: [articles.estimate_reading_time(h) for h in islice(cycle(pool), count)]), count
+
+
+BENCHES = [
+    Bench("match_category", bench_match_category, "names"),
+    Bench("match_expanded", bench_match_expanded, "names"),
+    Bench("slugify", bench_slugify, "names"),
+    Bench("location_store.build", bench_store_build, "rows"),
+    Bench("match_locations", bench_match_locations, "row×rule"),
+    Bench("get_scene_for_post", bench_get_scene, "posts"),
+    Bench("prompt_context.encode", bench_prompt_context, "rows"),
+    Bench("estimate_reading_time", bench_reading_time, "articles"),
+]
+
+
+# ─── Measurement ─────────────────────────────────────────────────────────────
+
+def measure(bench: Bench, n: int, repeat: int, memory: bool) -> dict:
+    run, ops = bench.prepare(n)
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    result = {
+        "ops": ops,
+        "seconds": best,
+        "ops_per_sec": ops / best if best > 0 else float("inf"),
+        "mean_seconds": sum(timings) / len(timings),
+    }
+    if memory:
+        # Separate pass: tracemalloc slows allocation-heavy code too much to time under it
+        gc.collect()
+        tracemalloc.start()
+        run()
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result
+
+
+def scaling_exponent(points: list[tuple[int, float]]) -> float | None:
+    """Least-squares slope of log(seconds) vs log(n): ~1.0 is linear, ~2.0 quadratic."""
+    points = [(n, s) for n, s in points if s > 0]
+    if len(points) < 2:
+        return None
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(s) for _, s in points]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var if var else None
+
+
+def fmt_rate(value: float) -> str:
+    for threshold, suffix in ((1e6, "M"), (1e3, "k")):
+        if value >= threshold:
+            return f"{value / threshold:.1f}{suffix}"
+    return f"{value:.0f}"
+
+
+def print_report(results: dict, sizes: list[int]):
+    labels = [size_label(n) for n in sizes]
+    header = f"{'benchmark':24s}" + "".join(f"{label:>10s}" for label in labels) + f"{'exp':>7s}{'peak MB':>10s}"
+    print(header)
+    print("─" * len(header))
+    for name, entry in results.items():
+        per_size = entry["sizes"]
+        row = f"{name:24s}"
+        for label in labels:
+            row += f"{fmt_rate(per_size[label]['ops_per_sec']) + '/s':>10s}" if label in per_size else f"{'—':>10s}"
+        exponent = entry.get("scaling_exponent")
+        row += f"{exponent:7.2f}" if exponent is not None else f"{'—':>7s}"
+        peak = per_size[labels[-1]].get("peak_mb") if labels[-1] in per_size else None
+        row += f"{peak:10.1f}" if peak is not None else f"{'—':>10s}"
+        print(row)
+
+    print("\nScaling (µs per op, relative to the smallest size):")
+    for name, entry in results.items():
+        per_op = [(label, entry["sizes"][label]["seconds"] / entry["sizes"][label]["ops"] * 1e6)
+                  for label in labels if label in entry["sizes"]]
+        if not per_op:
+            continue
+        base = per_op[0][1] or 1e-12
+        curve = "  ".join(f"{label}:{us:.2f}µs({us / base:.1f}x)" for label, us in per_op)
+        print(f"  {name:24s} {curve}")
+
+
+# ─── Baseline ────────────────────────────────────────────────────────────────
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return human-readable regressions (slower or bigger than tolerance allows)."""
+    regressions = []
+    print(f"\nAgainst baseline ({baseline.get('recorded_at', '?')}, {baseline.get('machine', '?')}):")
+    for name, entry in results.items():
+        for label, current in entry["sizes"].items():
+            previous = baseline.get("results", {}).get(name, {}).get("sizes", {}).get(label)
+            if not previous:
+                continue
+            speed = current["ops_per_sec"] / previous["ops_per_sec"] - 1
+            line = f"  {name:24s} {label:>5s}  ops/s {speed:+7.1%}"
+            flag = speed < -tolerance
+            if "peak_mb" in current and previous.get("peak_mb"):
+                growth = current["peak_mb"] / previous["peak_mb"] - 1
+                line += f"  peak {growth:+7.1%}"
+                flag = flag or growth > tolerance
+            print(line + ("  ← REGRESSION" if flag else ""))
+            if flag:
+                regressions.append(f"{name} @ {label}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scripts/ hot paths on synthetic catalogues")
+    parser.add_argument("--sizes", default="1k,10k,100k", help="comma-separated catalogue sizes (e.g. 1k,10k,100k,1M)")
+    parser.add_argument("--only", default="", help="comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per point (best is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="allowed slowdown / memory growth")
+    parser.add_argument("--output", help="also write the full results JSON here")
+    args = parser.parse_args()
+
+    sizes = sorted(parse_size(s) for s in args.sizes.split(",") if s.strip())
+    only = {s.strip() for s in args.only.split(",") if s.strip()}
+    benches = [b for b in BENCHES if not only or b.name in only]
+    unknown = only - {b.name for b in BENCHES}
+    if unknown:
+        print(f"ERROR: unknown benchmark(s): {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    print(f"{'=' * 60}")
+    print(f"Hot-path benchmarks — sizes {', '.join(size_label(n) for n in sizes)}")
+    print(f"{'=' * 60}")
+
+    results = {}
+    for bench in benches:
+        entry = {"unit": bench.unit, "sizes": {}}
+        for n in sizes:
+            print(f"  {bench.name} @ {size_label(n)}...", end="", flush=True)
+            point = measure(bench, n, args.repeat, not args.no_memory)
+            entry["sizes"][size_label(n)] = point
+            print(f" {fmt_rate(point['ops_per_sec'])} {bench.unit}/s")
+        entry["scaling_exponent"] = scaling_exponent(
+            [(n, entry["sizes"][size_label(n)]["seconds"]) for n in sizes]
+        )
+        results[bench.name] = entry
+
+    print()
+    print_report(results, sizes)
+
+    report = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": f"{platform.node()} {platform.machine()} Python {platform.python_version()}",
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} — run with --save-baseline to record one.")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput harness for the content generators.
+
+Runs generate-blog-covers.py, generate-collection-covers.py and
+generate-blog-articles.py item by item against an in-process mock of Gemini,
+PostgREST, Storage and the Management API (common/mock_api.py), sweeping worker
+concurrency and per-item pacing delay. For every point it reports items/min,
+p50/p95/p99 item latency, Gemini quota utilisation and 429/5xx retries, so a
+backfill can be sized from numbers instead of guesses.
+
+Usage:
+  python3 scripts/benchmark-pipelines.py
+  python3 scripts/benchmark-pipelines.py --pipelines blog-covers --items 40 --concurrency 1,2,4,8,16
+  python3 scripts/benchmark-pipelines.py --latency gemini=lognormal:9,0.4 --rpm gemini=10 \\
+      --throttle-rate gemini=0.03 --sleep-scale 0.1 --output pipelines.json
+  python3 scripts/benchmark-pipelines.py --rpm gemini=10 --keys 4
+  python3 scripts/benchmark-pipelines.py --pipelines blog-articles --latency gemini/gemini-3-flash-preview=uniform:200,300
+
+The generators' own retry sleeps (30s after a 429...) are real unless
+--sleep-scale shrinks them; scaled runs understate wall time under throttling.
+Use --seed to replay recorded tables / SQL fixtures instead of synthetic data.
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from common import key_pool, model_cascade, synthetic, throttle
+from common.mock_api import MockServer, MockState, build_policies
+from common.pipeline import run_items
+
+DEFAULT_LATENCY = [
+    "gemini=lognormal:2,0.35",
+    "rest=uniform:0.02,0.08",
+    "storage=uniform:0.05,0.2",
+    "sql=uniform:0.05,0.15",
+]
+
+
+class _ScaledTime:
+    """Stand-in for a script's `time` module whose sleep() is scaled."""
+
+    def __init__(self, scale: float):
+        self.scale = scale
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds * self.scale)
+
+
+# ─── Pipelines ───────────────────────────────────────────────────────────────
+# seed(n) -> mock tables; items(module, n) -> work items; step(module) -> item -> bool
+
+@dataclass
+class Pipeline:
+    script: str
+    default_delay: float
+    seed: Callable[[int], dict]
+    items: Callable[[object, int], list]
+    step: Callable[[object], Callable[[object], bool]]
+
+
+def _collection_items(module, n):
+    rng = random.Random(n)
+    scenes = [info["prompt"][len(module.STYLE_PREFIX):] for info in module.COLLECTIONS.values()]
+    return [
+        (f"synthetic-{i}", {"id": 1000 + i, "title": f"Synthetic {i}", "prompt": module.STYLE_PREFIX + rng.choice(scenes)})
+        for i in range(n)
+    ]
+
+
+def _article_items(module, n):
+    topics = module.build_topics()
+    items = []
+    for i in range(n):
+        topic = dict(topics[i % len(topics)])
+        if i >= len(topics):
+            topic["title"] = f"{topic['title']} (#{i // len(topics) + 1})"
+        items.append(topic)
+    return items
+
+
+PIPELINES = {
+    "blog-covers": Pipeline(
+        script="generate-blog-covers.py",
+        default_delay=3.0,
+        seed=lambda n: {"tables": {"posts": list(synthetic.posts(n, seed=n))}},
+        items=lambda module, n: list(synthetic.posts(n, seed=n)),
+        step=lambda module: module.cover_post,
+    ),
+    "collection-covers": Pipeline(
+        script="generate-collection-covers.py",
+        default_delay=5.0,
+        seed=lambda n: {"tables": {"collections": [{"id": 1000 + i, "slug": f"synthetic-{i}"} for i in range(n)]}},
+        items=_collection_items,
+        step=lambda module: lambda item: module.cover_collection(*item) is not None,
+    ),
+    "blog-articles": Pipeline(
+        script="generate-blog-articles.py",
+        default_delay=2.0,
+        seed=lambda n: {"tables": {"locations": list(synthetic.locations(500, seed=0))}},
+        items=_article_items,
+        step=lambda module: module.generate_article,
+    ),
+}
+
+
+# ─── Measurement ─────────────────────────────────────────────────────────────
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Linear-interpolated percentile, q in [0, 100]."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lo, hi = math.floor(rank), math.ceil(rank)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+
+
+def run_point(state: MockState, pipeline: Pipeline, module, items_count: int, workers: int, delay: float, verbose: bool) -> dict:
+    state.reseed(pipeline.seed(items_count))
+    state.reset_stats()
+    throttle.reset()
+    key_pool.reset()
+    model_cascade.reset()
+    items = pipeline.items(module, items_count)
+    step = pipeline.step(module)
+    latencies = []
+
+    def timed(item) -> bool:
+        start = time.perf_counter()
+        try:
+            return bool(step(item))
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    start = time.perf_counter()
+    with sink:
+        outcomes = run_items(items, timed, workers=workers, delay=delay)
+    wall = time.perf_counter() - start
+
+    stats = state.snapshot()
+    gemini = stats["gemini"]
+    accepted = sum(n for code, n in gemini["status"].items() if code.startswith("2"))
+    rpm_limit = state.policies["gemini"].rpm
+    # Every 429/5xx answer is either retried by the script or fails the item
+    rejected = {
+        service: sum(n for code, n in s["status"].items() if code == "429" or code.startswith("5"))
+        for service, s in stats.items()
+    }
+    return {
+        "workers": workers,
+        "delay": delay,
+        "items": len(items),
+        "ok": sum(outcomes),
+        "failed": len(outcomes) - sum(outcomes),
+        "wall_seconds": wall,
+        "items_per_min": sum(outcomes) / wall * 60 if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "gemini_requests": gemini["requests"],
+        "gemini_rpm": accepted / wall * 60 if wall else 0.0,
+        "quota_utilisation": min(1.0, accepted / (rpm_limit * wall / 60)) if rpm_limit and wall else None,
+        "gemini_tokens": dict(gemini["tokens"]),
+        "retries": sum(rejected.values()),
+        "retries_by_service": rejected,
+    }
+
+
+def fmt(value, spec: str, missing: str = "—") -> str:
+    return format(value, spec) if value is not None else missing
+
+
+def print_table(name: str, points: list[dict]):
+    print(f"\n{name}")
+    header = f"{'workers':>7s} {'delay':>6s} {'ok/items':>9s} {'items/min':>10s} {'p50 s':>7s} {'p95 s':>7s} {'p99 s':>7s} {'gem rpm':>8s} {'quota':>6s} {'retries':>8s}"
+    print(header)
+    print("─" * len(header))
+    for p in points:
+        print(
+            f"{p['workers']:7d} {p['delay']:6.1f} {p['ok']:>4d}/{p['items']:<4d} {p['items_per_min']:10.1f} "
+            f"{fmt(p['p50'], '7.2f')} {fmt(p['p95'], '7.2f')} {fmt(p['p99'], '7.2f')} "
+            f"{p['gemini_rpm']:8.1f} {fmt(p['quota_utilisation'], '6.0%', '     —')} {p['retries']:8d}"
+        )
+    best = max(points, key=lambda p: p["items_per_min"])
+    print(f"  best: {best['items_per_min']:.1f} items/min at workers={best['workers']} delay={best['delay']}")
+
+
+def parse_list(text: str, convert) -> list:
+    return [convert(v) for v in text.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep generator concurrency against a mock API")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES), help=f"comma-separated: {', '.join(PIPELINES)}")
+    parser.add_argument("--items", type=int, default=16, help="items per run")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="worker counts to sweep")
+    parser.add_argument("--delays", default="0", help="per-item pacing delays to sweep (seconds; 'default' = script default)")
+    parser.add_argument("--latency", action="append", metavar="SERVICE=SPEC", help="mock latency model (see mock-api-server.py)")
+    parser.add_argument("--error-rate", action="append", metavar="SERVICE=P")
+    parser.add_argument("--throttle-rate", action="append", metavar="SERVICE=P")
+    parser.add_argument("--retry-after", action="append", metavar="SERVICE=S")
+    parser.add_argument("--rpm", action="append", metavar="SERVICE=N", help="per-key requests/minute quota")
+    parser.add_argument("--quota", action="append", metavar="SERVICE=N", help="per-key total request quota")
+    parser.add_argument("--keys", type=int, default=1, help="size of the Gemini API key pool")
+    parser.add_argument("--image-size", type=int, default=256, help="side of mock PNGs (payload size)")
+    parser.add_argument("--sleep-scale", type=float, default=1.0, help="scale the scripts' own retry sleeps")
+    parser.add_argument("--seed", help="JSON tables/sql fixtures to use instead of synthetic data")
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--output", help="write all points as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the generators' own output")
+    args = parser.parse_args()
+
+    names = parse_list(args.pipelines, str.strip)
+    unknown = [n for n in names if n not in PIPELINES]
+    if unknown:
+        print(f"ERROR: unknown pipeline(s): {', '.join(unknown)}")
+        sys.exit(1)
+
+    policies = build_policies(
+        latency=DEFAULT_LATENCY + (args.latency or []),
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        rpm=args.rpm,
+        quota=args.quota,
+    )
+    state = MockState(None, policies, image_size=args.image_size, random_seed=args.random_seed)
+    server = MockServer(state).start()
+
+    # The scripts read their endpoints and keys at import time
+    os.environ.update({
+        "MOCK_API_URL": server.url,
+        "GEMINI_API_KEY": "mock-gemini-key",
+        "GEMINI_API_KEYS": ",".join(f"mock-gemini-key-{i}" for i in range(args.keys)),
+        "SUPABASE_SERVICE_ROLE_KEY": "mock-service-role",
+        "SUPABASE_ACCESS_TOKEN": "mock-access-token",
+    })
+    if "common.endpoints" in sys.modules:
+        importlib.reload(sys.modules["common.endpoints"])
+    from common.script_loader import load_script
+    # Retry waits live in the shared Gemini limiter, not in the scripts
+    throttle.TIME_SCALE = args.sleep_scale
+
+    fixture = None
+    if args.seed:
+        with open(args.seed, encoding="utf-8") as f:
+            fixture = json.load(f)
+
+    print(f"{'=' * 60}")
+    print(f"Pipeline throughput — mock at {server.url}")
+    for service, policy in policies.items():
+        print(f"  {service:8s} latency={policy.latency.kind}({policy.latency.a:g},{policy.latency.b:g}) "
+              f"429={policy.throttle_rate:g} 5xx={policy.error_rate:g} rpm={policy.rpm or '∞'} quota={policy.quota or '∞'}")
+    print(f"{'=' * 60}")
+
+    report = {"policies": {s: repr(p) for s, p in policies.items()}, "pipelines": {}}
+    try:
+        for name in names:
+            pipeline = PIPELINES[name]
+            if fixture:
+                pipeline.seed = lambda n, fixture=fixture: fixture
+            module = load_script(pipeline.script)
+            module.time = _ScaledTime(args.sleep_scale)
+            delays = [pipeline.default_delay if d.strip() == "default" else float(d) for d in args.delays.split(",") if d.strip()]
+            points = []
+            for workers in parse_list(args.concurrency, int):
+                for delay in delays:
+                    print(f"  {name}: workers={workers} delay={delay}...", end="", flush=True)
+                    point = run_point(state, pipeline, module, args.items, workers, delay, args.verbose)
+                    print(f" {point['items_per_min']:.1f} items/min")
+                    points.append(point)
+            report["pipelines"][name] = points
+            print_table(name, points)
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Build the static client-side search index and upload it to Supabase Storage.
+
+Published locations (name, district), collections (title) and posts (title,
+tags) are folded and tokenized by common/search_index.py into an inverted
+index sharded by token prefix, so the frontend (src/utils/searchIndex.ts)
+matches "pho" to "Phở" and "com tam" to "Cơm tấm" by fetching one or two
+small JSON files instead of querying Postgres on every keystroke.
+
+Files go to <bucket>/search-index/<version>/, where the version is a hash of
+the content: they never change once written and are served with a long
+immutable cache. search-index/manifest.json names the current version and is
+uploaded last with a short cache, so readers switch over atomically. Builds
+older than the previous one are deleted.
+
+Usage:
+  export SUPABASE_URL="..." SUPABASE_SERVICE_ROLE_KEY="..."
+  python3 scripts/build-search-index.py
+  python3 scripts/build-search-index.py --dry-run          # build and print sizes only
+  python3 scripts/build-search-index.py --out /tmp/search  # write the files locally instead
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+
+import requests
+
+from common import env, profiling, search_index, storage, telemetry
+from common.endpoints import supabase_url
+from common.pipeline import run_items
+
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+BUCKET = "location-images"
+FOLDER = "search-index"
+PAGE_SIZE = 1000
+MANIFEST_CACHE = "public, max-age=60"
+
+HEADERS_REST = {
+    "apikey": SERVICE_ROLE_KEY,
+    "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
+    "Content-Type": "application/json",
+}
+STORE = storage.Bucket(SUPABASE_URL, SERVICE_ROLE_KEY, BUCKET)
+
+
+@telemetry.instrument("rest.get")
+def rest_get_all(table: str, params: dict) -> list:
+    """Every row of a PostgREST query, PAGE_SIZE at a time."""
+    rows, offset = [], 0
+    while True:
+        page_params = {**params, "limit": PAGE_SIZE, "offset": offset}
+        resp = requests.get(f"{SUPABASE_URL}/rest/v1/{table}", headers=HEADERS_REST, params=page_params, timeout=60)
+        if resp.status_code != 200:
+            print(f"Error fetching {table}: {resp.status_code} {resp.text[:300]}")
+            sys.exit(1)
+        page = resp.json()
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def load_docs() -> list:
+    """Everything searchable, most important first within each kind."""
+    locations = rest_get_all("locations", {
+        "select": "slug,name,district", "status": "eq.published",
+        "order": "google_review_count.desc.nullslast,slug.asc",
+    })
+    collections = rest_get_all("collections", {
+        "select": "slug,title", "status": "eq.published", "order": "slug.asc",
+    })
+    posts = rest_get_all("posts", {
+        "select": "slug,title,tags", "status": "eq.published", "order": "published_at.desc.nullslast",
+    })
+    docs = [search_index.Doc("location", l["slug"], l["name"], l.get("district") or "", [l.get("district") or ""])
+            for l in locations if l.get("slug") and l.get("name")]
+    docs += [search_index.Doc("collection", c["slug"], c["title"])
+             for c in collections if c.get("slug") and c.get("title")]
+    docs += [search_index.Doc("post", p["slug"], p["title"], "", list(p.get("tags") or []))
+             for p in posts if p.get("slug") and p.get("title")]
+    return docs
+
+
+def prune(current: str, previous: str | None):
+    """Delete builds other than the current one and the previous one (readers may still hold its manifest)."""
+    keep = {current, previous}
+    builds = {name.split("/", 1)[0] for name in STORE.list_folder(FOLDER) if name != "manifest.json"}
+    for build in sorted(builds - keep):
+        files = [f"{FOLDER}/{build}/{name}" for name in STORE.list_folder(f"{FOLDER}/{build}")]
+        if files and STORE.delete(files):
+            print(f"  Deleted old build {build} ({len(files)} files)")
+
+
+def current_version() -> str | None:
+    resp = requests.get(STORE.public_url(f"{FOLDER}/manifest.json"), timeout=15)
+    try:
+        return resp.json().get("version") if resp.status_code == 200 else None
+    except ValueError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="Build and print sizes, upload nothing")
+    parser.add_argument("--out", help="Write the files to this directory instead of uploading")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel uploads")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
+    args = parser.parse_args()
+    telemetry.start_run("build-search-index", profile=args.profile)
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
+
+    print("=" * 60)
+    print("SEARCH INDEX")
+    print("=" * 60)
+
+    docs = load_docs()
+    files = search_index.build(docs)
+    build_version = search_index.version(files)
+    counts = {kind: sum(d.kind == kind for d in docs) for kind in search_index.KINDS}
+    manifest = search_index.manifest(files, build_version, datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                                     counts)
+
+    shard_sizes = {name: len(data) for name, data in files.items() if name != "docs.json"}
+    largest = max(shard_sizes, key=shard_sizes.get, default=None)
+    print(f"{len(docs)} docs ({', '.join(f'{n} {k}s' for k, n in counts.items())}), {len(shard_sizes)} shards, "
+          f"{sum(map(len, files.values())) / 1024:.0f} KB total; docs.json {len(files['docs.json']) / 1024:.0f} KB"
+          + (f", largest shard {largest} {shard_sizes[largest] / 1024:.1f} KB" if largest else ""))
+    print(f"Version {build_version}")
+
+    if args.dry_run:
+        print("\nDry run complete.")
+        return
+
+    if args.out:
+        target = os.path.join(args.out, build_version)
+        os.makedirs(target, exist_ok=True)
+        for name, data in files.items():
+            with open(os.path.join(target, name), "wb") as f:
+                f.write(data)
+        with open(os.path.join(args.out, "manifest.json"), "wb") as f:
+            f.write(manifest)
+        print(f"Wrote {len(files)} files to {target}")
+        return
+
+    previous = current_version()
+    if previous == build_version:
+        print("Index unchanged, nothing to upload.")
+        return
+
+    outcomes = run_items(
+        list(files.items()),
+        lambda item: STORE.upload(f"{FOLDER}/{build_version}/{item[0]}", item[1], "application/json"),
+        workers=args.workers,
+    )
+    if not all(outcomes):
+        print(f"{outcomes.count(None)} file(s) failed to upload; manifest left at {previous or 'none'}.")
+        sys.exit(1)
+    # Only now point readers at the new build
+    if not STORE.upload(f"{FOLDER}/manifest.json", manifest, "application/json", MANIFEST_CACHE):
+        sys.exit(1)
+    print(f"Uploaded {len(files)} files; manifest now at {build_version} (was {previous or 'none'})")
+    prune(build_version, previous)
+    print("DONE!")
+
+
+if __name__ == "__main__":
+    main()
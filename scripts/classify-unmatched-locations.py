@@ -0,0 +1,150 @@
+"""
+Classify locations that keyword matching could not categorize, using the
+already-categorized locations as labelled data.
+
+Runs after patch-unmatched-categories.py. Every unmatched name is scored
+against per-category character n-gram centroids (common/ngram_classifier.py)
+in one batch; names above --threshold with a clear lead over the runner-up
+are assigned, the rest are printed for manual review.
+
+Run:
+  python scripts/classify-unmatched-locations.py --dry-run   # preview only
+  python scripts/classify-unmatched-locations.py --threshold 0.4
+
+Requires: pip install requests numpy scipy
+"""
+
+import argparse
+import os
+import sys
+
+import requests
+
+from common import env, profiling, telemetry
+from common.endpoints import mgmt_query_url, supabase_url
+from common.bulk_writer import BulkWriter
+
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+MGMT_API_URL = mgmt_query_url()
+MGMT_TOKEN = os.environ.get("SUPABASE_ACCESS_TOKEN", "")
+
+HEADERS_REST = {
+    "apikey": SERVICE_ROLE_KEY,
+    "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
+    "Content-Type": "application/json",
+}
+
+HEADERS_MGMT = {
+    "Authorization": f"Bearer {MGMT_TOKEN}",
+    "Content-Type": "application/json",
+    "User-Agent": "supabase-cli/2.76.15",
+}
+
+# Categories with fewer labelled examples than this make noisy centroids.
+MIN_CLASS_SIZE = 5
+
+
+@telemetry.instrument("sql.query", ok=lambda result: result is not None)
+def run_sql(sql):
+    resp = requests.post(MGMT_API_URL, headers=HEADERS_MGMT, json={"query": sql})
+    if resp.status_code != 201:
+        print(f"SQL ERROR: {resp.status_code} {resp.text[:500]}")
+        return None
+    return resp.json()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=0.35,
+                        help="Minimum cosine similarity to auto-assign (default 0.35)")
+    parser.add_argument("--min-margin", type=float, default=0.05,
+                        help="Minimum lead over the second-best category (default 0.05)")
+    parser.add_argument("--dry-run", action="store_true", help="Only print predictions")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
+    args = parser.parse_args()
+    telemetry.start_run("classify-unmatched-locations", profile=args.profile)
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_ACCESS_TOKEN")
+    try:
+        from common.ngram_classifier import NgramCentroidClassifier
+    except ImportError:
+        print("numpy and scipy are required: pip install numpy scipy")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("CLASSIFYING UNMATCHED LOCATIONS")
+    print("=" * 60)
+
+    labelled = run_sql("""
+        SELECT l.name, c.slug, c.id AS category_id
+        FROM locations l
+        JOIN location_categories lc ON lc.location_id = l.id
+        JOIN categories c ON c.id = lc.category_id
+        WHERE l.status = 'published';
+    """)
+    unmatched = run_sql("""
+        SELECT l.id, l.name
+        FROM locations l
+        WHERE l.status = 'published'
+          AND NOT EXISTS (SELECT 1 FROM location_categories lc WHERE lc.location_id = l.id)
+        ORDER BY l.name;
+    """)
+    if not labelled or not unmatched:
+        print("Nothing to classify (no labelled or no unmatched locations).")
+        return
+
+    class_sizes = {}
+    for row in labelled:
+        class_sizes[row["slug"]] = class_sizes.get(row["slug"], 0) + 1
+    training = [row for row in labelled if class_sizes[row["slug"]] >= MIN_CLASS_SIZE]
+    cat_ids = {row["slug"]: row["category_id"] for row in training}
+    if not training:
+        print(f"No category has {MIN_CLASS_SIZE}+ labelled locations yet, nothing to train on.")
+        return
+
+    print(f"Training on {len(training)} labelled names across {len(cat_ids)} categories")
+    print(f"Scoring {len(unmatched)} unmatched names\n")
+
+    clf = NgramCentroidClassifier().fit(
+        [row["name"] for row in training],
+        [row["slug"] for row in training],
+    )
+    predictions = clf.predict([row["name"] for row in unmatched])
+
+    assignments = []
+    review = []
+    stats = {}
+    for loc, pred in zip(unmatched, predictions):
+        if pred.score >= args.threshold and pred.margin >= args.min_margin:
+            assignments.append({"location_id": loc["id"], "category_id": cat_ids[pred.label]})
+            stats[pred.label] = stats.get(pred.label, 0) + 1
+        else:
+            review.append((loc["name"], pred))
+
+    print(f"Auto-assigned: {len(assignments)}")
+    print(f"Below threshold: {len(review)}")
+    if stats:
+        print("\nAssignments by category:")
+        for slug, count in sorted(stats.items(), key=lambda x: -x[1]):
+            print(f"  {slug:25s} {count:3d}")
+    if review:
+        print("\nNeeds review (best guess, score, margin):")
+        for name, pred in sorted(review, key=lambda x: -x[1].score):
+            print(f"  - {name:45s} {pred.label:20s} {pred.score:.2f} {pred.margin:.2f}")
+
+    if args.dry_run or not assignments:
+        print("\nDry run — nothing written." if args.dry_run else "\nNothing to write.")
+        return
+
+    print(f"\nInserting {len(assignments)} assignments...")
+    writer = BulkWriter(
+        f"{SUPABASE_URL}/rest/v1/location_categories",
+        {**HEADERS_REST, "Prefer": "return=minimal,resolution=merge-duplicates"},
+    )
+    result = writer.write(assignments)
+    result.print_failures()
+    print(f"DONE! Inserted {result.written}/{len(assignments)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Shared helpers for the Python scripts in scripts/.
+
+The scripts are run directly (python3 scripts/<file>.py), which puts scripts/
+on sys.path, so modules here are imported as `from common.<module> import ...`.
+"""
@@ -0,0 +1,193 @@
+"""
+Adaptive bulk writer for PostgREST inserts/upserts.
+
+Replaces the fixed "BATCH_SIZE rows, then time.sleep(0.2)" loops. The writer
+
+  - grows the batch while requests come back fast and small, and shrinks it
+    when latency passes the target or the payload nears max_payload_bytes;
+  - on 413 halves the batch and splits the rejected chunk;
+  - on 429/503 honours Retry-After (or backs off) and retries the same chunk;
+  - on other 5xx / connection errors retries, then splits;
+  - on row-level data errors (400/409/422) splits the chunk until the
+    offending rows are isolated, so one bad row never drops its neighbours;
+  - on any other 4xx (401/403 bad key, 404 wrong table...) fails every
+    remaining row at once: splitting cannot help a request-level error.
+
+Rows that still fail on their own are returned in BulkResult.failed with the
+status code and error body, instead of being printed and forgotten.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import requests
+
+from common import telemetry, throttle
+
+RETRYABLE = {429, 503}
+DATA_ERRORS = {400, 409, 422}
+MAX_RETRIES = 5
+
+
+@dataclass
+class FailedRow:
+    row: dict
+    status: int | None
+    error: str
+
+
+@dataclass
+class BulkResult:
+    written: int = 0
+    failed: list[FailedRow] = field(default_factory=list)
+    requests: int = 0
+    retries: int = 0
+    bytes_sent: int = 0
+
+    def print_failures(self, limit: int = 20, indent: str = "  "):
+        if not self.failed:
+            return
+        print(f"{indent}{len(self.failed)} row(s) failed:")
+        for failure in self.failed[:limit]:
+            print(f"{indent}  - [{failure.status}] {failure.error[:200]} :: {json.dumps(failure.row, ensure_ascii=False)[:200]}")
+        if len(self.failed) > limit:
+            print(f"{indent}  ... and {len(self.failed) - limit} more")
+
+
+class BulkWriter:
+    def __init__(
+        self,
+        url: str,
+        headers: dict,
+        *,
+        initial_batch: int = 200,
+        min_batch: int = 1,
+        max_batch: int = 5000,
+        target_latency: float = 2.0,
+        max_payload_bytes: int = 1_000_000,
+        timeout: float = 60,
+        verbose: bool = True,
+    ):
+        self.url = url
+        self.headers = {**headers, "Content-Type": "application/json"}
+        self.batch_size = initial_batch
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self.timeout = timeout
+        self.verbose = verbose
+        self.session = requests.Session()
+        self._bytes_per_row = 0.0
+
+    def _log(self, msg: str):
+        if self.verbose:
+            print(msg)
+
+    def _size_for_payload(self) -> int:
+        if not self._bytes_per_row:
+            return self.batch_size
+        by_bytes = int(self.max_payload_bytes * 0.8 / self._bytes_per_row)
+        return max(self.min_batch, min(self.batch_size, by_bytes))
+
+    def _grow(self):
+        self.batch_size = min(self.max_batch, self.batch_size + max(1, self.batch_size // 2))
+
+    def _shrink(self):
+        self.batch_size = max(self.min_batch, self.batch_size // 2)
+
+    @telemetry.instrument("rest.bulk_write", ok=lambda result: not result.failed)
+    def write(self, rows: list[dict]) -> BulkResult:
+        result = BulkResult()
+        # Each pending item is (chunk, attempt). A chunk is retried as-is on
+        # throttling and split on data errors.
+        pending: deque[tuple[list[dict], int]] = deque()
+        start = 0
+        batch_no = 0
+
+        while start < len(rows) or pending:
+            if pending:
+                chunk, attempt = pending.popleft()
+            else:
+                size = self._size_for_payload()
+                chunk, attempt = rows[start:start + size], 0
+                start += len(chunk)
+
+            payload = json.dumps(chunk, ensure_ascii=False).encode("utf-8")
+            self._bytes_per_row = len(payload) / len(chunk)
+            batch_no += 1
+            result.requests += 1
+            result.bytes_sent += len(payload)
+
+            began = time.monotonic()
+            try:
+                resp = self.session.post(self.url, headers=self.headers, data=payload, timeout=self.timeout)
+                status, body = resp.status_code, resp.text
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                resp, status, body = None, None, str(e)
+            latency = time.monotonic() - began
+
+            if status in (200, 201, 204):
+                result.written += len(chunk)
+                if latency < self.target_latency and len(payload) < self.max_payload_bytes / 2:
+                    self._grow()
+                elif latency > self.target_latency * 1.5:
+                    self._shrink()
+                self._log(f"  Batch {batch_no}: OK ({len(chunk)} rows, {len(payload):,} B, {latency:.2f}s) → next {self.batch_size}")
+                continue
+
+            if status == 413:
+                self.max_payload_bytes = max(1, min(self.max_payload_bytes, len(payload) // 2))
+                self._shrink()
+                self._log(f"  Batch {batch_no}: 413 payload too large ({len(payload):,} B) → splitting")
+                self._split_or_fail(chunk, attempt, status, body, pending, result)
+                continue
+
+            if status in RETRYABLE or status is None or status >= 500:
+                self._shrink()
+                if attempt < MAX_RETRIES:
+                    wait = _retry_delay(resp, attempt)
+                    result.retries += 1
+                    self._log(f"  Batch {batch_no}: {status or 'connection error'} → retry in {wait:.1f}s "
+                              f"(attempt {attempt + 1}/{MAX_RETRIES}, next size {self.batch_size})")
+                    time.sleep(wait)
+                    pending.appendleft((chunk, attempt + 1))
+                else:
+                    self._split_or_fail(chunk, attempt, status, body, pending, result)
+                continue
+
+            if status in DATA_ERRORS:
+                # Something in this chunk is bad — bisect down to the row.
+                self._log(f"  Batch {batch_no}: {status} {body[:120]} → isolating bad rows")
+                self._split_or_fail(chunk, 0, status, body, pending, result)
+                continue
+
+            # Auth / not found / method errors hit every row alike: stop here.
+            remaining = [row for part in [chunk, *(queued for queued, _ in pending), rows[start:]] for row in part]
+            result.failed += [FailedRow(row, status, body) for row in remaining]
+            self._log(f"  Batch {batch_no}: {status} {body[:120]} → giving up on {len(remaining)} rows")
+            break
+
+        return result
+
+    def _split_or_fail(self, chunk, attempt, status, body, pending, result):
+        if len(chunk) == 1:
+            result.failed.append(FailedRow(chunk[0], status, body))
+            return
+        mid = len(chunk) // 2
+        # Halves go back to the front, in order, before any new rows.
+        pending.appendleft((chunk[mid:], attempt))
+        pending.appendleft((chunk[:mid], attempt))
+
+
+def _retry_delay(resp, attempt: int) -> float:
+    wait = throttle.retry_after(resp) if resp is not None else None
+    if wait is not None:
+        return wait
+    # Exponential backoff with full jitter, capped at 60s.
+    return random.uniform(0, min(60.0, 2.0 ** attempt))
@@ -0,0 +1,180 @@
+"""
+Keyword tables used to assign food categories to locations by name.
+
+CATEGORY_KEYWORDS is the primary table (seed-categories-tags.py) and
+EXPANDED_KEYWORDS the follow-up table for names the primary one misses
+(patch-unmatched-categories.py). Both are also rendered into the
+category_keywords table + categorize_locations() RPC by
+generate-categorize-sql.py, so edits here must be followed by regenerating
+that migration.
+"""
+
+from typing import Optional
+
+# Keywords for matching location names → categories (order matters: first match wins)
+# Each tuple: (category_slug, [keywords])
+CATEGORY_KEYWORDS = [
+    ("pho", ["phở", "pho "]),
+    ("bun", ["bún ", "bún,", "bún.", "bún-"]),
+    ("banh-canh", ["bánh canh"]),
+    ("banh-cuon", ["bánh cuốn", "bánh ướt"]),
+    ("banh-mi", ["bánh mì", "banh mi", "bánh mỳ", "sandwich", "hamburger", "burger"]),
+    ("chao", ["cháo"]),
+    ("xoi", ["xôi"]),
+    ("goi-cuon-nem", ["gỏi cuốn", "nem nướng", "nem cuốn", "bì cuốn", "cuốn diếp"]),
+    ("hu-tieu-mi", [
+        "hủ tiếu", "hủ tíu", "hu tieu", "mì ", "mì,", "mỳ ", "mì quảng",
+        "mì vịt", "mì gia", "mì xào", "sủi cảo", "hoành thánh",
+        "ramen", "sushi", "udon", "soba", "mì ý", "spaghetti"
+    ]),
+    ("com", [
+        "cơm tấm", "cơm ", "com tam", "com binh dan", "cơm hủ",
+        "cơm gà", "cơm niêu", "cơm sườn"
+    ]),
+    ("chay", ["chay", "vegetarian", "vegan", "zen house"]),
+    ("oc-hai-san", [
+        "ốc ", "ốc,", "ghẹ", "hải sản", "seafood", "cua ", "hàu ",
+        "tôm ", "càng ghẹ", "sò ", "nghêu"
+    ]),
+    ("lau-nuong", [
+        "lẩu", "nướng", "hotpot", "bbq", "buffet nướng",
+        "thịt nướng", "steak", "bò nướng", "gà nướng"
+    ]),
+    ("nhau-bia", [
+        "nhậu", "bia ", "beer", "quán nhậu", "rooftop", "lounge",
+        "bar ", "cocktail", "bistro", "wine", "pub"
+    ]),
+    ("cafe", [
+        "cà phê", "cafe", "coffee", "ca phe", "caffe", "kafe",
+        "cappuccino", "matcha", "trà ", "tea ", "acoustic"
+    ]),
+    ("kem-gelato", [
+        "kem ", "kem,", "gelato", "ice cream", "yogurt", "sữa chua"
+    ]),
+    ("che-trang-mieng", [
+        "chè ", "chè,", "bánh ", "dessert", "bánh tráng", "bánh flan",
+        "chuối nướng", "chuối nếp", "tàu hũ", "đậu hũ", "bánh bao",
+        "bánh bột", "bánh khọt", "bánh xèo", "takoyaki", "bánh bạch tuộc",
+        "bánh gạo", "tokbokki", "bánh tráng trộn", "bánh cống",
+        "bánh đúc", "bánh plan"
+    ]),
+    ("nuoc-uong", [
+        "sinh tố", "nước ép", "nước mía", "juice", "smoothie",
+        "trà sữa", "nước uống", "fruit", "boba", "trà trái cây"
+    ]),
+    ("nha-hang", [
+        "nhà hàng", "restaurant", "dining", "quán ăn", "ẩm thực"
+    ]),
+    ("mon-quoc-te", [
+        "pizza", "pasta", "taco", "indian", "korean", "hàn quốc",
+        "japanese", "nhật", "thái ", "thai food", "mexican", "french",
+        "italian", "dimsum", "dim sum"
+    ]),
+]
+
+# Extended keywords for unmatched locations
+# These are additional patterns not in CATEGORY_KEYWORDS above
+EXPANDED_KEYWORDS = [
+    # Bò (beef dishes) → Lẩu & Nướng category
+    ("lau-nuong", [
+        "bò bít tết", "bò né", "bò tơ", "bò lá lốt", "bê thui",
+        "bò tùng xẻo", "dê ", "dê tươi", "dê phố", "dê vàng",
+        "heo quay", "vịt quay", "roast duck", "thui"
+    ]),
+    # Bột chiên & snacks → Chè & Tráng miệng (street snacks)
+    ("che-trang-mieng", [
+        "bột chiên", "há cảo", "donut", "cake", "sweet", "brunch",
+        "cream", "chuối", "paoli", "dừng chân", "sầu riêng"
+    ]),
+    # Riêu, bún cá → Bún
+    ("bun", [
+        "riêu", "bún cá", "bun bo", "bun ca", "bún riêu", "bún bò"
+    ]),
+    # Mi ga (without diacritics) → Hủ tiếu & Mì
+    ("hu-tieu-mi", [
+        "mi ga", "mi quang", "mi gia",
+        "izakaya", "sushi ", "sashimi"
+    ]),
+    # Chao (without diacritics) / porridge → Cháo
+    ("chao", [
+        "chao suon", "porridge", "congee", "frog porridge"
+    ]),
+    # Ốc with different patterns
+    ("oc-hai-san", [
+        "link ốc", "bé ốc", "ốc khánh", "cá lóc", "cá kèo",
+        "vua chả cá"
+    ]),
+    # Chicken dishes → Món quốc tế (Korean fried chicken, etc.)
+    ("mon-quoc-te", [
+        "chicken", "gà rán", "jeju", "dookki", "topokki", "tokbokki",
+        "gaucho", "burger", "taco ", "tandoor", "halal",
+        "izakaya ", "kamura"
+    ]),
+    # Xôi (without diacritics)
+    ("xoi", [
+        "xoi ga", "sticky rice"
+    ]),
+    # Gỏi cuốn & nem
+    ("goi-cuon-nem", [
+        "nem chua", "cuốn sài gòn", "cuốn cao thắng", "hang cuon",
+        "bếp cuốn"
+    ]),
+    # Café (variant spellings)
+    ("cafe", [
+        "café", "garden", "running bean", "sofé"
+    ]),
+    # Nhà hàng / general dining
+    ("nha-hang", [
+        "quán ăn", "food street", "street food", "market", "buffet",
+        "cuisine", "recipe", "bếp ", "tiệm ăn", "quán mộc",
+        "quán nhà", "hẻm quán", "deck saigon", "square one",
+        "quince", "opera", "strand", "sole saigon", "oryz",
+        "dim tu tac", "food connexion", "quán ba tròn",
+        "hoa viên", "hàng dương", "quán hợp lực",
+        "quán ông tiên", "quán cô béo", "quán a cường",
+        "wagon wheel", "điểm tâm", "on the upper",
+        "latest recipe", "dalat corner", "cloud nine",
+        "ghiền quán", "mủn quán", "tam anh quán",
+        "madame lam", "bếp hà nội", "bếp huế", "góc huế",
+        "huế thương", "naked flavors", "cửu long quán",
+        "tiệm vịt", "trần quang ký", "vịt quay",
+        "sesan", "quán sở", "broken rice",
+        "ben nghe", "ben thanh"
+    ]),
+    # Nuoc uong
+    ("nuoc-uong", [
+        "tiger sugar", "tigersugar", "gong cha", "trà",
+        "mê trà", "me tra", "royaltea"
+    ]),
+    # Kem
+    ("kem-gelato", [
+        "kem ", "glacier", "roseice", "i love cream", "i love kem"
+    ]),
+    # Special: pet cafe
+    ("cafe", [
+        "pet me", "pet coffee", "mèo"
+    ]),
+    # Cơm (more)
+    ("com", [
+        "broken rice", "huyen broken"
+    ]),
+]
+
+
+def _first_match(name: str, table) -> Optional[str]:
+    name_lower = name.lower()
+    for cat_slug, keywords in table:
+        for kw in keywords:
+            if kw in name_lower:
+                return cat_slug
+    return None
+
+
+def match_category(name: str) -> Optional[str]:
+    """Match a location name to a category slug using keyword matching."""
+    return _first_match(name, CATEGORY_KEYWORDS)
+
+
+def match_expanded(name: str) -> Optional[str]:
+    """Try expanded keyword matching."""
+    return _first_match(name, EXPANDED_KEYWORDS)
@@ -0,0 +1,128 @@
+"""
+Rule-based collection matching criteria used by populate-collection-locations.py.
+
+Kept apart from the script (which connects to Supabase at import time) so the
+rules can be loaded by benchmarks and other tools without credentials.
+"""
+
+# Each collection has a set of criteria to match locations.
+# Fields: category_slugs, tag_slugs, name_keywords, price_ranges,
+#          min_rating, districts, opening_hours_filter, limit
+
+COLLECTION_RULES = {
+    # 1: Sài Gòn Không Ngủ — late-night food
+    "saigon-khong-ngu": {
+        "tag_slugs": ["an-khuya"],
+        "name_keywords": ["đêm", "khuya", "24h", "24 giờ", "midnight"],
+        "limit": 20,
+    },
+    # 2: Bữa Sáng Nạp Năng Lượng — breakfast spots
+    "bua-sang-nap-nang-luong": {
+        "tag_slugs": ["an-sang"],
+        "category_slugs": ["pho", "bun", "banh-mi", "xoi", "banh-cuon", "chao", "hu-tieu-mi"],
+        "name_keywords": ["sáng", "breakfast", "phở", "bún", "bánh mì", "xôi", "bánh cuốn", "cháo", "hủ tiếu"],
+        "limit": 20,
+    },
+    # 3: Cơm Trưa Văn Phòng "Chất Lừ" — office lunch
+    "com-trua-van-phong-chat-lu": {
+        "tag_slugs": ["an-trua"],
+        "category_slugs": ["com"],
+        "name_keywords": ["cơm", "trưa", "lunch", "cơm tấm", "cơm văn phòng", "cơm gà"],
+        "limit": 20,
+    },
+    # 4: Bữa Tối Chill Chill — dinner chill
+    "bua-toi-chill-chill": {
+        "tag_slugs": ["an-toi"],
+        "name_keywords": ["tối", "dinner", "nướng", "lẩu", "BBQ"],
+        "price_ranges": ["$$", "$$$"],
+        "limit": 20,
+    },
+    # 5: Vỉa Hè Tinh Hoa — premium street food
+    "via-he-tinh-hoa": {
+        "tag_slugs": ["quan-via-he", "binh-dan"],
+        "name_keywords": ["vỉa hè", "hẻm", "lề đường"],
+        "price_ranges": ["$", "$$"],
+        "min_rating": 4.0,
+        "limit": 20,
+    },
+    # 6: Rooftop Lộng Gió, View Bạc Tỷ — rooftop / views
+    "rooftop-long-gio-view-bac-ty": {
+        "tag_slugs": ["view-dep", "sang-trong"],
+        "name_keywords": ["rooftop", "sky", "terrace", "tầng thượng", "view"],
+        "price_ranges": ["$$$", "$$$$"],
+        "limit": 15,
+    },
+    # 7: Xanh Mướt Mắt - Cafe Sân Vườn — garden cafes
+    "xanh-muot-mat-cafe-san-vuon": {
+        "category_slugs": ["cafe"],
+        "name_keywords": ["sân vườn", "garden", "xanh", "cây", "vườn", "green", "terrace"],
+        "limit": 15,
+    },
+    # 8: Check-in Sống Ảo Triệu Like — instagrammable
+    "check-in-song-ao-trieu-like": {
+        "tag_slugs": ["song-ao", "view-dep"],
+        "name_keywords": ["sống ảo", "check-in", "Instagram", "decor", "art", "concept"],
+        "limit": 20,
+    },
+    # 9: Góc Riêng Cho Hai Người — date night
+    "goc-rieng-cho-hai-nguoi": {
+        "tag_slugs": ["phu-hop-hen-ho", "co-phong-rieng"],
+        "name_keywords": ["hẹn hò", "date", "romantic", "couple", "riêng tư"],
+        "price_ranges": ["$$", "$$$", "$$$$"],
+        "limit": 15,
+    },
+    # 10: Họp Nhóm Càng Đông Càng Vui — group gatherings
+    "hop-nhom-cang-dong-cang-vui": {
+        "tag_slugs": ["phu-hop-nhom-ban"],
+        "category_slugs": ["lau-nuong", "nhau-bia"],
+        "name_keywords": ["lẩu", "nướng", "BBQ", "buffet", "nhậu", "bia"],
+        "limit": 20,
+    },
+    # 11: Workstation Lý Tưởng — work cafes
+    "workstation-ly-tuong": {
+        "tag_slugs": ["co-wifi", "co-may-lanh"],
+        "category_slugs": ["cafe"],
+        "name_keywords": ["workspace", "coworking", "work", "cafe", "cà phê", "coffee"],
+        "limit": 15,
+    },
+    # 12: Một Mình Vẫn Chill — solo dining
+    "mot-minh-van-chill": {
+        "category_slugs": ["cafe", "pho", "bun", "com", "banh-mi", "hu-tieu-mi"],
+        "price_ranges": ["$", "$$"],
+        "name_keywords": ["quán nhỏ", "một mình"],
+        "min_rating": 4.0,
+        "limit": 15,
+    },
+    # 13: Finedining
+    "finedining": {
+        "tag_slugs": ["sang-trong"],
+        "category_slugs": ["nha-hang", "mon-quoc-te"],
+        "name_keywords": ["fine dining", "restaurant", "nhà hàng", "steak", "wine", "lounge"],
+        "price_ranges": ["$$$", "$$$$"],
+        "limit": 15,
+    },
+    # 14: Thưởng Thức Âm Nhạc Live — live music venues
+    "thuong-thuc-am-nhac-live": {
+        "name_keywords": ["live", "music", "acoustic", "jazz", "bar", "pub", "lounge", "nhạc sống"],
+        "category_slugs": ["nhau-bia"],
+        "limit": 15,
+    },
+    # 15: Cuối Tuần Cùng Gia Đình — family weekend
+    "cuoi-tuan-cung-gia-dinh": {
+        "tag_slugs": ["phu-hop-gia-dinh", "co-cho-dau-xe"],
+        "name_keywords": ["gia đình", "family", "buffet", "nhà hàng"],
+        "limit": 20,
+    },
+    # 16: "Boss" Đi Cùng, "Sen" Vui Vẻ (Pet-Friendly)
+    "boss-di-cung-sen-vui-ve-pet-friendly": {
+        "tag_slugs": ["pet-friendly"],
+        "name_keywords": ["pet", "dog", "cat", "thú cưng"],
+        "limit": 15,
+    },
+    # Michelin collections removed — data was not authentic (no verified Michelin locations in DB)
+}
+
+
+def all_rule_keywords():
+    """Every name_keyword used by any rule — the store's keyword vocabulary."""
+    return [kw for rules in COLLECTION_RULES.values() for kw in rules.get("name_keywords", [])]
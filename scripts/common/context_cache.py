@@ -0,0 +1,227 @@
+"""
+Explicit Gemini context caching for prompt prefixes shared by many calls.
+
+    prefix = {"systemInstruction": {"parts": [{"text": instructions}]}}
+    data = gemini.generate(GEMINI_MODELS, body, prefix=prefix)
+
+For the model and API key a call ends up on (a cache belongs to one model
+and to the key's project), gemini.generate() looks up a cachedContents entry
+holding `prefix`, creating it on first use, and sends only `body` plus
+"cachedContent": name. Entries live for GEMINI_CACHE_TTL seconds (default
+3600). One that is close to expiring while still in use gets its TTL
+extended, and everything the run created is deleted at exit.
+GEMINI_CONTEXT_CACHE=0 turns caching off.
+
+Prefixes estimated (common.prompt_context.estimate_tokens) below
+MIN_CACHE_TOKENS, the API's minimum cacheable size, are sent inline without
+trying: a create call would only come back 400. So is a prefix the API
+refuses to cache anyway (any other 400), for the rest of the run. Either way
+it is logged once per prefix, and being first in the request it can still
+hit Gemini's implicit prefix cache.
+Transient failures are retried after a minute. A call whose cache has
+disappeared (404) drops the entry and is retried with a new one.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+
+from common import telemetry
+from common.endpoints import gemini_cache_url
+from common.prompt_context import estimate_tokens
+
+TTL = int(os.environ.get("GEMINI_CACHE_TTL", "3600"))
+MIN_CACHE_TOKENS = int(os.environ.get("GEMINI_CACHE_MIN_TOKENS", "1024"))
+RETRY_AFTER_FAILURE = 60.0
+
+
+@dataclass
+class Entry:
+    name: str | None      # None: send the prefix inline until `expires`
+    expires: float        # monotonic
+    api_key: str = ""
+
+
+def merge(prefix: dict, body: dict) -> dict:
+    """body with prefix inlined (prefix contents go first)."""
+    merged = {**prefix, **body}
+    if "contents" in prefix:
+        merged["contents"] = prefix["contents"] + body.get("contents", [])
+    return merged
+
+
+def prefix_tokens(prefix: dict) -> int:
+    """Estimated tokens of the text in a prefix's systemInstruction and contents."""
+    contents = [prefix.get("systemInstruction") or {}] + prefix.get("contents", [])
+    return sum(estimate_tokens(part.get("text", "")) for content in contents for part in content.get("parts", []))
+
+
+def is_stale(resp) -> bool:
+    """Whether a generateContent error says the cachedContent is gone."""
+    return resp.status_code in (400, 403, 404) and "cachedcontent" in resp.text.lower()
+
+
+class ContextCache:
+    def __init__(self, ttl: int = TTL, min_tokens: int = MIN_CACHE_TOKENS):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.margin = max(60.0, ttl * 0.1)
+        self._entries: dict[tuple, Entry] = {}
+        self._locks: dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._cleanup_registered = False
+        self._cacheable: dict[str, bool] = {}   # prefix digest -> big enough to cache
+        self._warned: set[str] = set()
+        self.stats = {"created": 0, "hits": 0, "extended": 0, "inline": 0, "expired": 0}
+
+    @staticmethod
+    def _ident(model: str, api_key: str, prefix: dict) -> tuple:
+        digest = hashlib.sha256(json.dumps(prefix, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        return model, api_key, digest
+
+    def name_for(self, model: str, api_key: str, prefix: dict) -> str | None:
+        """The cache name holding prefix for this model and key, or None to send it inline."""
+        ident = self._ident(model, api_key, prefix)
+        if not self._big_enough(ident[2], prefix):
+            self._count("inline")
+            return None
+        with self._lock:
+            lock = self._locks.setdefault(ident, threading.Lock())
+        # One thread creates or extends an entry; the others wait and reuse it
+        with lock:
+            entry = self._entries.get(ident)
+            now = time.monotonic()
+            if entry and entry.name is None and entry.expires > now:
+                self._count("inline")
+                return None
+            if entry and entry.name and entry.expires - now > self.margin:
+                self._count("hits")
+                return entry.name
+            if entry and entry.name and entry.expires > now and self._extend(entry):
+                self._count("extended")
+                return entry.name
+            entry = self._create(model, api_key, prefix, ident[2])
+            self._entries[ident] = entry
+            return entry.name
+
+    def invalidate(self, model: str, api_key: str, prefix: dict):
+        with self._lock:
+            if self._entries.pop(self._ident(model, api_key, prefix), None):
+                self.stats["expired"] += 1
+
+    def _big_enough(self, digest: str, prefix: dict) -> bool:
+        with self._lock:
+            known = self._cacheable.get(digest)
+        if known is not None:
+            return known
+        tokens = prefix_tokens(prefix)
+        big = tokens >= self.min_tokens
+        with self._lock:
+            self._cacheable[digest] = big
+        if not big:
+            self._warn(digest, f"  Gemini cache: prefix is ~{tokens} tokens, under the {self.min_tokens}-token "
+                               f"minimum; sending it inline")
+        return big
+
+    def _warn(self, digest: str, message: str):
+        """Print message the first time for this prefix only (not per model and key)."""
+        with self._lock:
+            if digest in self._warned:
+                return
+            self._warned.add(digest)
+        print(message)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _create(self, model: str, api_key: str, prefix: dict, digest: str) -> Entry:
+        body = {**prefix, "model": f"models/{model}", "ttl": f"{self.ttl}s", "displayName": f"prefix-{digest[:12]}"}
+        try:
+            resp = requests.post(gemini_cache_url(api_key), json=body, timeout=60)
+        except requests.exceptions.RequestException as e:
+            print(f"  Gemini cache: could not create ({type(e).__name__}), sending the prefix inline for now")
+            return Entry(None, time.monotonic() + RETRY_AFTER_FAILURE)
+        if resp.status_code == 200:
+            self._count("created")
+            self._register_cleanup()
+            return Entry(resp.json()["name"], time.monotonic() + self.ttl, api_key)
+        if 400 <= resp.status_code < 500 and resp.status_code != 429:
+            self._warn(digest, f"  Gemini cache: {model} won't cache this prefix "
+                               f"({resp.status_code}: {resp.text[:200]}), sending it inline")
+            self._count("inline")
+            return Entry(None, math.inf)
+        print(f"  Gemini cache: create failed ({resp.status_code}), sending the prefix inline for now")
+        self._count("inline")
+        return Entry(None, time.monotonic() + RETRY_AFTER_FAILURE)
+
+    def _extend(self, entry: Entry) -> bool:
+        try:
+            resp = requests.patch(f"{gemini_cache_url(entry.api_key, entry.name)}&updateMask=ttl",
+                                  json={"ttl": f"{self.ttl}s"}, timeout=30)
+        except requests.exceptions.RequestException:
+            return False
+        if resp.status_code != 200:
+            return False
+        entry.expires = time.monotonic() + self.ttl
+        return True
+
+    def _register_cleanup(self):
+        with self._lock:
+            if not self._cleanup_registered:
+                self._cleanup_registered = True
+                atexit.register(self.delete_all)
+
+    @telemetry.instrument("gemini.cache_cleanup")
+    def delete_all(self):
+        """Delete every cache this run created (they would otherwise be billed until their TTL ends)."""
+        with self._lock:
+            entries = [e for e in self._entries.values() if e.name]
+            self._entries.clear()
+        for entry in entries:
+            try:
+                requests.delete(gemini_cache_url(entry.api_key, entry.name), timeout=10)
+            except requests.exceptions.RequestException:
+                pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+_cache: ContextCache | None = None
+_registry_lock = threading.Lock()
+
+
+def cache() -> ContextCache | None:
+    """The process-wide cache, or None when GEMINI_CONTEXT_CACHE=0."""
+    global _cache
+    if os.environ.get("GEMINI_CONTEXT_CACHE", "1") == "0":
+        return None
+    with _registry_lock:
+        if _cache is None:
+            _cache = ContextCache()
+        return _cache
+
+
+def apply(model: str, api_key: str, prefix: dict | None, body: dict) -> dict:
+    """The request to send: body referencing a cache of prefix when there is one, else with it inline."""
+    if not prefix:
+        return body
+    shared = cache()
+    name = shared.name_for(model, api_key, prefix) if shared else None
+    return {**body, "cachedContent": name} if name else merge(prefix, body)
+
+
+def snapshot() -> dict:
+    with _registry_lock:
+        return _cache.snapshot() if _cache else {}
@@ -0,0 +1,51 @@
+"""
+Base URLs for the external APIs the scripts call.
+
+Set MOCK_API_URL (e.g. http://127.0.0.1:8787, see scripts/mock-api-server.py)
+to point Gemini, PostgREST, Storage and the Management API at the local mock
+server instead of the live services:
+
+  python3 scripts/mock-api-server.py --seed fixtures.json &
+  export MOCK_API_URL="http://127.0.0.1:8787"
+  export GEMINI_API_KEY=mock SUPABASE_SERVICE_ROLE_KEY=mock SUPABASE_ACCESS_TOKEN=mock
+  python3 scripts/generate-blog-covers.py --limit 20
+
+With MOCK_API_URL set, SUPABASE_URL is ignored (and need not be exported).
+"""
+
+import os
+
+MOCK_API_URL = os.environ.get("MOCK_API_URL", "").rstrip("/")
+
+GEMINI_API_BASE = MOCK_API_URL or "https://generativelanguage.googleapis.com"
+MGMT_API_BASE = MOCK_API_URL or "https://api.supabase.com"
+DEFAULT_PROJECT_REF = "wsysphytctpgbzoatuzw"
+
+
+def supabase_url(default: str = None) -> str:
+    """Project URL for /rest/v1 and /storage/v1.
+
+    Falls back to `default`, then to SUPABASE_URL (KeyError when unset, like
+    the scripts' own os.environ["SUPABASE_URL"]).
+    """
+    if MOCK_API_URL:
+        return MOCK_API_URL
+    if default is not None:
+        return default
+    return os.environ["SUPABASE_URL"]
+
+
+def gemini_url(model: str, api_key: str, method: str = "generateContent") -> str:
+    """URL for a Gemini model method (generateContent, streamGenerateContent...)."""
+    return f"{GEMINI_API_BASE}/v1beta/models/{model}:{method}?key={api_key}"
+
+
+def gemini_cache_url(api_key: str, name: str = "cachedContents") -> str:
+    """URL for the cachedContents collection, or one cache by its "cachedContents/..." name."""
+    return f"{GEMINI_API_BASE}/v1beta/{name}?key={api_key}"
+
+
+def mgmt_query_url(project_ref: str = None) -> str:
+    """Management API endpoint that runs raw SQL."""
+    ref = project_ref or os.environ.get("SUPABASE_PROJECT_REF", DEFAULT_PROJECT_REF)
+    return f"{MGMT_API_BASE}/v1/projects/{ref}/database/query"
@@ -0,0 +1,37 @@
+"""
+Environment variables, validated when a command runs instead of at import.
+
+Scripts read settings with os.environ.get() at module level so that --help,
+--dry-run and `python -m scripts list` work without credentials, then check
+what the chosen mode actually needs once the arguments are parsed:
+
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", *([] if args.dry_run else ["GEMINI_API_KEY"]))
+
+SUPABASE_URL counts as set while MOCK_API_URL points the scripts at the mock,
+and GEMINI_API_KEY while a key pool is configured (see common/key_pool.py).
+"""
+
+import os
+import sys
+
+# Variables that count as set when one of these is set instead
+ALTERNATIVES = {
+    "SUPABASE_URL": ("MOCK_API_URL",),
+    "GEMINI_API_KEY": ("GEMINI_API_KEYS", "GEMINI_API_KEYS_FILE"),
+}
+
+
+def missing(*names: str) -> list[str]:
+    """The names in `names` that aren't set (or are empty)."""
+    return [
+        name for name in names
+        if not os.environ.get(name) and not any(os.environ.get(alt) for alt in ALTERNATIVES.get(name, ()))
+    ]
+
+
+def require(*names: str):
+    """Exit with an error listing every missing variable."""
+    absent = missing(*names)
+    if absent:
+        print(f"ERROR: Missing required environment variables: {', '.join(absent)}")
+        sys.exit(1)
@@ -0,0 +1,169 @@
+"""
+Shared Gemini generateContent client for the generators.
+
+    GEMINI_MODELS = model_cascade.cascade("image")
+    ...
+    data = gemini.generate(GEMINI_MODELS, payload, timeout=120)
+    if data is None:
+        return None
+
+Each call goes to the first healthy model of its cascade
+(common/model_cascade.py), falling back down the list on 503s and timeouts.
+An answer slower than the model's latency SLO is still returned; later calls
+skip that model for a while.
+
+Every call in the process goes through the "gemini" AdaptiveLimiter
+(common/throttle.py): 429/503 shrink the allowed concurrency and pause all
+workers until Retry-After has passed (unless another model or key can take
+the load), 500s and network errors are retried with jittered exponential
+backoff, and other 4xx give up at once.
+
+Keys come from the "gemini" KeyPool (common/key_pool.py): a 429 rests only
+the key that got it while others are usable, and invalid or exhausted keys
+are dropped and the call retried on another.
+
+A shared `prefix` is sent as a context cache reference when the model will
+cache it (common/context_cache.py), inline otherwise.
+
+Successful responses are recorded in common/gemini_usage.py. Failures are
+printed in the scripts' usual "  Gemini error (...)" style and return None.
+"""
+
+from __future__ import annotations
+
+import time
+
+import requests
+
+from common import context_cache, gemini_usage, key_pool, model_cascade, telemetry, throttle
+from common.endpoints import gemini_url
+
+MAX_ATTEMPTS = 5
+THROTTLED = {429, 503}
+
+
+def prompt_text(body: dict) -> str:
+    contents = [body.get("systemInstruction") or {}] + body.get("contents", [])
+    return "".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+
+
+def generate(models: model_cascade.ModelCascade, body: dict, *, prefix: dict = None, timeout: float = 120,
+             attempts: int = MAX_ATTEMPTS) -> dict | None:
+    """POST body to the first healthy model's generateContent; returns the parsed response or None.
+
+    `prefix` (systemInstruction and/or leading contents) is shared by many
+    calls and goes through common/context_cache.py.
+    """
+    limiter = throttle.limiter("gemini")
+    keys = key_pool.pool("gemini")
+    for attempt in range(attempts):
+        model = models.pick()
+        retry = f"(attempt {attempt + 1}/{attempts}, {model.name})"
+        try:
+            with limiter.slot() as slot, keys.lease() as lease:
+                payload = context_cache.apply(model.name, lease.key, prefix, body)
+                start = time.perf_counter()
+                try:
+                    resp = requests.post(gemini_url(model.name, lease.key), json=payload, timeout=timeout)
+                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                    # A timeout usually means the model is saturated; back off like a 503
+                    models.failed(model)
+                    lease.failed()
+                    if models.available():
+                        slot.failed()
+                    else:
+                        slot.throttled()
+                    print(f"  Gemini {type(e).__name__} {retry}, backing off...")
+                    continue
+                if "cachedContent" in payload and context_cache.is_stale(resp):
+                    slot.failed()
+                    context_cache.invalidate(model.name, lease.key, prefix)
+                    continue
+                reason = key_pool.sideline_reason(resp)
+                if reason:
+                    # Not the service's fault: drop the key and retry on another one
+                    slot.failed()
+                    lease.sideline(reason)
+                    continue
+                if resp.status_code in THROTTLED:
+                    wait = throttle.retry_after(resp)
+                    telemetry.count("gemini.throttled")
+                    # With other keys to use, a 429 is that key's quota, not the model's load
+                    key_limited = resp.status_code == 429 and keys.usable() > 1
+                    if resp.status_code == 429:
+                        lease.throttled(wait)
+                    else:
+                        lease.failed()
+                    if not key_limited:
+                        models.failed(model, wait)
+                    # Another key or model can take the load: leave the shared limit alone
+                    if key_limited or models.available():
+                        slot.failed()
+                    else:
+                        slot.throttled(wait)
+                    hint = f"retry after {wait:.0f}s" if wait is not None else "backing off"
+                    print(f"  Gemini {resp.status_code} on key {lease.label} {retry}, {hint}...")
+                    continue
+                if resp.status_code == 200:
+                    try:
+                        data = resp.json()
+                    except ValueError:
+                        slot.failed()
+                        print(f"  Gemini returned invalid JSON: {resp.text[:300]}")
+                        return None
+                    latency = time.perf_counter() - start
+                    models.succeeded(model, latency)
+                    gemini_usage.record(model.name, data, latency, prompt_text(prefix or {}) + prompt_text(body))
+                    return data
+                slot.failed()
+                lease.failed()
+                if resp.status_code < 500:
+                    print(f"  Gemini error ({resp.status_code}): {resp.text[:300]}")
+                    return None
+        except key_pool.NoKeysLeft as e:
+            print(f"  Gemini: {e}")
+            return None
+        # Other 5xx: retry this call only, without pausing everyone else
+        wait = throttle.backoff(attempt) * limiter.time_scale
+        print(f"  Gemini server error ({resp.status_code}) {retry}, retrying in {wait:.0f}s...")
+        time.sleep(wait)
+    print(f"  Gemini gave up after {attempts} attempts")
+    return None
+
+
+def print_keys(data: dict):
+    for name, p in data.items():
+        if len(p["keys"]) < 2:
+            continue
+        print(f"\n{name} keys ({p['strategy']}):")
+        for k in p["keys"]:
+            status = f"sidelined: {k['sidelined']}" if k["sidelined"] else "ok"
+            print(f"  {k['key']:8s} {k['calls']:6d} calls {k['ok']:6d} ok {k['throttled']:5d} throttled  {status}")
+
+
+def print_models(data: dict):
+    for name, models in data.items():
+        print(f"\n{name} models:")
+        for model, m in models.items():
+            slo = f"{m['slo']:g}s" if m["slo"] else "—"
+            latency = f"{m['latency_seconds']:.1f}s" if m["latency_seconds"] is not None else "—"
+            print(f"  {model:32s} {m['calls']:6d} calls {m['ok']:6d} ok {m['failed']:5d} failed "
+                  f"{m['over_slo']:4d} over SLO {slo:>6s}  ~{latency}")
+
+
+def print_context_cache(data: dict):
+    if data:
+        print(f"\ncontext cache: {data['created']} created, {data['hits']} hits, {data['extended']} extended, "
+              f"{data['expired']} expired, {data['inline']} sent inline")
+
+
+def print_concurrency(data: dict):
+    for name, s in data.items():
+        print(f"\n{name} concurrency: limit {s['limit']:g} (range {s['min_limit']:g}–{s['max_limit']:g}), "
+              f"{s['throttled']} throttled, {s['decreases']} decreases, {s['waited_seconds']:.0f}s waiting for a slot")
+
+
+telemetry.register_section("concurrency", throttle.snapshot, print_concurrency)
+telemetry.register_section("api_keys", key_pool.snapshot, print_keys)
+telemetry.register_section("models", model_cascade.snapshot, print_models)
+telemetry.register_section("context_cache", context_cache.snapshot, print_context_cache)
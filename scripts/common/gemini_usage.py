@@ -0,0 +1,163 @@
+"""
+Per-call Gemini usage accounting: tokens, images, latency and model.
+
+    start = time.perf_counter()
+    resp = requests.post(url, json=payload, timeout=120)
+    ...
+    data = resp.json()
+    gemini_usage.record("gemini-2.5-flash-image", data, time.perf_counter() - start, prompt)
+
+    with gemini_usage.context(topic=post["slug"], template=scene_key):
+        generate_image(prompt)
+
+Each successful call is tagged with the innermost context's topic and template
+(contexts nest, inner values win, and they are per thread so --workers keeps
+them apart). After telemetry.start_run() the run report gains a "gemini"
+section with totals per model, template and topic, the summary prints the
+most expensive templates, and every call is appended to
+scripts/reports/<script>-<timestamp>.gemini.jsonl as it happens.
+scripts/gemini-usage-report.py aggregates those files across runs.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from common import telemetry
+
+TOKEN_FIELDS = ("prompt_tokens", "output_tokens", "thoughts_tokens", "cached_tokens", "total_tokens")
+_USAGE_KEYS = {
+    "promptTokenCount": "prompt_tokens",
+    "candidatesTokenCount": "output_tokens",
+    "thoughtsTokenCount": "thoughts_tokens",
+    "cachedContentTokenCount": "cached_tokens",
+    "totalTokenCount": "total_tokens",
+}
+
+_lock = threading.Lock()
+_local = threading.local()
+_calls: list[dict] = []
+_export = None
+
+
+def _tags() -> dict:
+    if not hasattr(_local, "tags"):
+        _local.tags = {}
+    return _local.tags
+
+
+@contextmanager
+def context(**tags):
+    """Tag Gemini calls made inside the block (topic=..., template=...)."""
+    saved = dict(_tags())
+    _tags().update({k: v for k, v in tags.items() if v is not None})
+    try:
+        yield
+    finally:
+        _local.tags = saved
+
+
+def usage_of(data: dict) -> dict:
+    """Token counts, image count and finish reason from a generateContent response."""
+    usage = data.get("usageMetadata") or {}
+    candidates = data.get("candidates") or [{}]
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return {
+        **{field: int(usage.get(key) or 0) for key, field in _USAGE_KEYS.items()},
+        "images": sum(1 for p in parts if (p.get("inlineData") or {}).get("mimeType", "").startswith("image/")),
+        "finish_reason": candidates[0].get("finishReason"),
+    }
+
+
+def record(model: str, data: dict, latency: float, prompt: str = None) -> dict:
+    """Record one successful call and return its usage row."""
+    tags = _tags()
+    row = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "script": telemetry.run_info().get("script"),
+        "model": model,
+        "topic": tags.get("topic"),
+        "template": tags.get("template"),
+        **usage_of(data),
+        "prompt_chars": len(prompt) if prompt is not None else None,
+        "latency_seconds": round(latency, 3),
+    }
+    with _lock:
+        _calls.append(row)
+        _append(row)
+    return row
+
+
+def _append(row: dict):
+    global _export
+    if _export is None:
+        if not telemetry.reporting():
+            return
+        path = telemetry.run_path(".gemini.jsonl")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _export = open(path, "a", encoding="utf-8")
+        except OSError as e:
+            print(f"Could not open Gemini usage export: {e}")
+            _export = False
+            return
+    if _export:
+        _export.write(json.dumps(row, ensure_ascii=False) + "\n")
+        _export.flush()
+
+
+# ─── Aggregation ─────────────────────────────────────────────────────────────
+
+def aggregate(rows: list[dict], key) -> dict[str, dict]:
+    """Sum usage over rows grouped by key(row); adds mean latency and prompt size."""
+    groups: dict[str, dict] = defaultdict(lambda: {"calls": 0, "images": 0, "latency_seconds": 0.0,
+                                                    **{f: 0 for f in TOKEN_FIELDS}})
+    for row in rows:
+        g = groups[key(row) or "—"]
+        g["calls"] += 1
+        g["images"] += row["images"]
+        g["latency_seconds"] += row["latency_seconds"]
+        for f in TOKEN_FIELDS:
+            g[f] += row.get(f) or 0
+    for g in groups.values():
+        g["latency_seconds"] = round(g["latency_seconds"], 3)
+        g["mean_latency_seconds"] = round(g["latency_seconds"] / g["calls"], 3)
+        g["mean_prompt_tokens"] = round(g["prompt_tokens"] / g["calls"], 1)
+    return dict(sorted(groups.items(), key=lambda item: -item[1]["total_tokens"]))
+
+
+def summary() -> dict:
+    with _lock:
+        rows = list(_calls)
+    if not rows:
+        return {}
+    return {
+        "calls": len(rows),
+        "totals": aggregate(rows, lambda row: "all")["all"],
+        "by_model": aggregate(rows, lambda row: row["model"]),
+        "by_template": aggregate(rows, lambda row: row["template"]),
+        "by_topic": aggregate(rows, lambda row: row["topic"]),
+    }
+
+
+def print_table(title: str, groups: dict[str, dict], limit: int = 10):
+    print(f"\n{title:32s} {'calls':>6s} {'prompt tok':>11s} {'output tok':>11s} {'images':>7s} {'avg prompt':>11s} {'avg s':>7s}")
+    for name, g in list(groups.items())[:limit]:
+        print(f"{str(name)[:32]:32s} {g['calls']:6d} {g['prompt_tokens']:11,d} {g['output_tokens']:11,d} "
+              f"{g['images']:7d} {g['mean_prompt_tokens']:11,.0f} {g['mean_latency_seconds']:7.2f}")
+    if len(groups) > limit:
+        print(f"  ... {len(groups) - limit} more")
+
+
+def print_summary(data: dict):
+    print_table("gemini model", data["by_model"])
+    if set(data["by_template"]) != {"—"}:
+        print_table("gemini template", data["by_template"])
+
+
+telemetry.register_section("gemini", summary, print_summary)
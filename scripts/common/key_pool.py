@@ -0,0 +1,233 @@
+"""
+Pool of API keys shared by every worker thread in a run.
+
+    GEMINI_API_KEYS="key1,key2,key3"                  # or
+    GEMINI_API_KEYS_FILE=~/.config/gemini-keys.txt    # one key per line, # comments
+
+Without either, the pool holds GEMINI_API_KEY alone and calls behave as they
+did with a single key. Each call leases a key:
+
+    with key_pool.pool("gemini").lease() as lease:
+        resp = requests.post(gemini_url(model, lease.key), ...)
+        if resp.status_code == 429:
+            lease.throttled(throttle.retry_after(resp))
+
+By default the key with the fewest calls in flight (then the fewest in the
+last minute) is chosen; GEMINI_KEY_STRATEGY=round-robin rotates instead. A
+key is skipped while it is
+
+- over its budget of GEMINI_KEY_RPM requests per minute (0 = no budget),
+- cooling down after a 429, for Retry-After or a jittered backoff,
+- sidelined for the rest of the run: rejected as invalid (400 API_KEY_INVALID,
+  401, 403) or out of daily quota.
+
+When no key is free the caller waits for the first one to free up; once
+every key is sidelined, lease() raises NoKeysLeft.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from common import throttle
+
+STRATEGIES = ("least-loaded", "round-robin")
+WINDOW = 60.0
+
+
+class NoKeysLeft(RuntimeError):
+    pass
+
+
+def load_keys(name: str) -> list[str]:
+    """Keys from <NAME>_API_KEYS, else <NAME>_API_KEYS_FILE, else <NAME>_API_KEY."""
+    prefix = name.upper()
+    raw = os.environ.get(f"{prefix}_API_KEYS", "")
+    path = os.environ.get(f"{prefix}_API_KEYS_FILE", "")
+    if not raw and path:
+        with open(os.path.expanduser(path), encoding="utf-8") as f:
+            raw = ",".join(line.split("#", 1)[0] for line in f)
+    keys = [k.strip() for k in raw.split(",") if k.strip()]
+    if not keys and os.environ.get(f"{prefix}_API_KEY"):
+        keys = [os.environ[f"{prefix}_API_KEY"]]
+    return list(dict.fromkeys(keys))
+
+
+def sideline_reason(resp) -> str | None:
+    """Why a rejection means this key is unusable for the rest of the run, if it does."""
+    if resp.status_code in (401, 403):
+        return f"rejected ({resp.status_code})"
+    try:
+        error = resp.json().get("error", {})
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(error, dict):
+        return None
+    details = [d for d in error.get("details", []) if isinstance(d, dict)]
+    if resp.status_code == 400:
+        if any(d.get("reason") == "API_KEY_INVALID" for d in details) or "API key not valid" in error.get("message", ""):
+            return "invalid key"
+    if resp.status_code == 429:
+        quota_ids = [v.get("quotaId", "") for d in details for v in d.get("violations", [])]
+        if any("PerDay" in q for q in quota_ids):
+            return "daily quota exhausted"
+    return None
+
+
+class Key:
+    def __init__(self, value: str, rpm: int):
+        self.value = value
+        self.label = f"…{value[-4:]}"
+        self.rpm = rpm
+        self.window: deque[float] = deque()  # monotonic send times in the last minute
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_throttles = 0
+        self.sidelined: str | None = None
+        self.stats = {"calls": 0, "ok": 0, "throttled": 0}
+
+    def ready_at(self, now: float) -> float:
+        """When this key can next be sent (now if it is free)."""
+        while self.window and now - self.window[0] >= WINDOW:
+            self.window.popleft()
+        ready = max(now, self.cooldown_until)
+        if self.rpm and len(self.window) >= self.rpm:
+            ready = max(ready, self.window[0] + WINDOW)
+        return ready
+
+
+class Lease:
+    def __init__(self, key: Key):
+        self.key = key.value
+        self.label = key.label
+        self._key = key
+        self.outcome = "ok"
+        self.wait = None
+        self.reason = None
+
+    def throttled(self, retry_after: float | None = None):
+        """This key got a 429; rest it for retry_after (or a backoff)."""
+        self.outcome = "throttled"
+        self.wait = retry_after
+
+    def sideline(self, reason: str):
+        """This key is invalid or out of quota; stop using it."""
+        self.outcome = "sidelined"
+        self.reason = reason
+
+    def failed(self):
+        """The call failed for a reason that says nothing about the key."""
+        self.outcome = "failed"
+
+
+class KeyPool:
+    def __init__(self, name: str, keys: list[str], rpm: int = 0, strategy: str = "least-loaded"):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"{name} key strategy must be one of {', '.join(STRATEGIES)}, got {strategy!r}")
+        self.name = name
+        self.keys = [Key(k, rpm) for k in keys]
+        self.strategy = strategy
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def usable(self) -> int:
+        with self._cond:
+            return sum(not k.sidelined for k in self.keys)
+
+    def _pick(self, ready: list[Key]) -> Key:
+        if self.strategy == "round-robin":
+            order = self.keys[self._next:] + self.keys[:self._next]
+            key = next(k for k in order if k in ready)
+            self._next = (self.keys.index(key) + 1) % len(self.keys)
+            return key
+        return min(ready, key=lambda k: (k.in_flight, len(k.window)))
+
+    def acquire(self) -> Lease:
+        with self._cond:
+            while True:
+                usable = [k for k in self.keys if not k.sidelined]
+                if not usable:
+                    reasons = ", ".join(f"{k.label} {k.sidelined}" for k in self.keys) or "none configured"
+                    raise NoKeysLeft(f"no usable {self.name} API keys left ({reasons})")
+                now = time.monotonic()
+                ready = [k for k in usable if k.ready_at(now) <= now]
+                if ready:
+                    break
+                self._cond.wait(min(k.ready_at(now) for k in usable) - now)
+            key = self._pick(ready)
+            key.in_flight += 1
+            key.window.append(now)
+            key.stats["calls"] += 1
+            return Lease(key)
+
+    def release(self, lease: Lease):
+        key = lease._key
+        with self._cond:
+            key.in_flight -= 1
+            if lease.outcome == "ok":
+                key.stats["ok"] += 1
+                key.consecutive_throttles = 0
+            elif lease.outcome == "throttled":
+                key.stats["throttled"] += 1
+                key.consecutive_throttles += 1
+                wait = lease.wait if lease.wait is not None else throttle.backoff(key.consecutive_throttles - 1)
+                key.cooldown_until = max(key.cooldown_until, time.monotonic() + wait * throttle.TIME_SCALE)
+            elif lease.outcome == "sidelined" and not key.sidelined:
+                key.sidelined = lease.reason
+                print(f"  {self.name} key {key.label} sidelined: {lease.reason} "
+                      f"({sum(not k.sidelined for k in self.keys)}/{len(self.keys)} keys left)")
+            self._cond.notify_all()
+
+    @contextmanager
+    def lease(self):
+        lease = self.acquire()
+        try:
+            yield lease
+        except BaseException:
+            lease.failed()
+            raise
+        finally:
+            self.release(lease)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "strategy": self.strategy,
+                "keys": [{"key": k.label, **k.stats, "sidelined": k.sidelined} for k in self.keys],
+            }
+
+
+_pools: dict[str, KeyPool] = {}
+_registry_lock = threading.Lock()
+
+
+def pool(name: str) -> KeyPool:
+    """The process-wide key pool for `name` (loaded from the environment on first use)."""
+    with _registry_lock:
+        if name not in _pools:
+            prefix = name.upper()
+            _pools[name] = KeyPool(
+                name,
+                load_keys(name),
+                rpm=int(os.environ.get(f"{prefix}_KEY_RPM", "0")),
+                strategy=os.environ.get(f"{prefix}_KEY_STRATEGY", "least-loaded"),
+            )
+        return _pools[name]
+
+
+def reset():
+    """Forget every pool (and its budgets and cooldowns); the next call reloads the keys."""
+    with _registry_lock:
+        _pools.clear()
+
+
+def snapshot() -> dict:
+    with _registry_lock:
+        return {name: p.snapshot() for name, p in _pools.items()}
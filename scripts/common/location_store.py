@@ -0,0 +1,221 @@
+"""
+Compact in-memory store of the location fields the collection matching rules
+read (populate-collection-locations.py).
+
+Instead of one PostgREST dict per location plus dict[id, set[str]] maps for
+categories and tags, every field is a column in a flat array:
+
+  ids          16-byte UUIDs in one bytearray, kept sorted for bisect lookups
+  rating       array('d') — google_rating, falling back to average_rating
+  price/district  small ints into interned string tables
+  categories/tags membership bitsets over interned slugs (Python ints, so
+                  there is no cap on the number of distinct slugs)
+  name/desc hits  bitsets of which rule keywords occur in the lowercased
+                  name / description, computed once at ingest
+
+Descriptions and names are lowercased and scanned once when a row is added and
+never kept, so a location costs well under 100 bytes regardless of how long
+its description is.
+"""
+
+from __future__ import annotations
+
+import uuid
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterable
+
+MASK_BITS = 64
+
+
+class _Interner:
+    """Maps strings to small ints; index 0 is reserved for None/empty."""
+
+    def __init__(self, limit: int | None = None):
+        self.limit = limit
+        self.values: list[str | None] = [None]
+        self.index: dict[str, int] = {}
+
+    def get(self, value: str | None) -> int:
+        if not value:
+            return 0
+        idx = self.index.get(value)
+        if idx is None:
+            idx = len(self.values)
+            if self.limit is not None and idx >= self.limit:
+                raise ValueError(f"more than {self.limit - 1} distinct values interned")
+            self.index[value] = idx
+            self.values.append(value)
+        return idx
+
+
+class _SortedIds:
+    """Sequence view over the packed UUID column, for bisect."""
+
+    def __init__(self, packed: bytearray):
+        self.packed = packed
+
+    def __len__(self):
+        return len(self.packed) // 16
+
+    def __getitem__(self, i):
+        return self.packed[i * 16:(i + 1) * 16]
+
+
+class LocationStore:
+    def __init__(self, keywords: Iterable[str]):
+        # Keyword vocabulary: every name_keyword any rule might ask about.
+        self.keywords = sorted({kw.lower() for kw in keywords})
+        self.keyword_index = {kw: i for i, kw in enumerate(self.keywords)}
+        self.words = max(1, (len(self.keywords) + MASK_BITS - 1) // MASK_BITS)
+
+        self.ids = bytearray()
+        self.rating = array("d")
+        self.price = array("B")
+        self.district = array("H")
+        # Python ints, unbounded: a row with no slugs is the shared 0 object
+        self.categories: list[int] = []
+        self.tags: list[int] = []
+        self.name_hits = array("Q")
+        self.desc_hits = array("Q")
+
+        self.prices = _Interner(256)
+        self.districts = _Interner(65536)
+        # Bit i of a membership mask is slug index i + 1 (index 0 is "none").
+        self.category_slugs = _Interner()
+        self.tag_slugs = _Interner()
+
+    def __len__(self):
+        return len(self.ids) // 16
+
+    # ─── Ingest ──────────────────────────────────────────────────────────
+
+    def add(self, loc: dict) -> None:
+        """Append one PostgREST location row. Rows must arrive ordered by id."""
+        packed = uuid.UUID(loc["id"]).bytes
+        if self.ids and packed <= self.ids[-16:]:
+            raise ValueError("locations must be added in ascending id order")
+        self.ids += packed
+        self.rating.append(float(loc.get("google_rating") or loc.get("average_rating") or 0))
+        self.price.append(self.prices.get(loc.get("price_range")))
+        self.district.append(self.districts.get(loc.get("district")))
+        self.categories.append(0)
+        self.tags.append(0)
+        self.name_hits.extend(self._hits((loc.get("name") or "").lower()))
+        self.desc_hits.extend(self._hits((loc.get("description") or "").lower()))
+
+    def _hits(self, text: str) -> list[int]:
+        words = [0] * self.words
+        if text:
+            for i, kw in enumerate(self.keywords):
+                if kw in text:
+                    words[i // MASK_BITS] |= 1 << (i % MASK_BITS)
+        return words
+
+    def row_of(self, location_id: str) -> int | None:
+        packed = uuid.UUID(location_id).bytes
+        view = _SortedIds(self.ids)
+        row = bisect_left(view, packed)
+        if row < len(view) and view[row] == packed:
+            return row
+        return None
+
+    def add_category(self, location_id: str, slug: str) -> bool:
+        row = self.row_of(location_id)
+        if row is None:
+            return False
+        self.categories[row] |= 1 << (self.category_slugs.get(slug) - 1)
+        return True
+
+    def add_tag(self, location_id: str, slug: str) -> bool:
+        row = self.row_of(location_id)
+        if row is None:
+            return False
+        self.tags[row] |= 1 << (self.tag_slugs.get(slug) - 1)
+        return True
+
+    # ─── Read ────────────────────────────────────────────────────────────
+
+    def location_id(self, row: int) -> str:
+        return str(uuid.UUID(bytes=bytes(self.ids[row * 16:(row + 1) * 16])))
+
+    def category_assignments(self) -> int:
+        return sum(mask.bit_count() for mask in self.categories)
+
+    def tag_assignments(self) -> int:
+        return sum(mask.bit_count() for mask in self.tags)
+
+    def slug_mask(self, interner: _Interner, slugs: Iterable[str]) -> int:
+        mask = 0
+        for slug in slugs:
+            idx = interner.index.get(slug)
+            if idx:
+                mask |= 1 << (idx - 1)
+        return mask
+
+    def keyword_masks(self, keywords: Iterable[str]) -> list[tuple[int, list[int]]]:
+        """Group a rule's keywords into (multiplicity, per-word bitmask) pairs.
+
+        A keyword listed twice in a rule scores twice, as in the dict-based
+        matcher this replaces.
+        """
+        by_count: dict[int, list[int]] = {}
+        for kw, count in Counter(kw.lower() for kw in keywords).items():
+            idx = self.keyword_index.get(kw)
+            if idx is None:
+                raise KeyError(f"keyword {kw!r} was not in the store's vocabulary")
+            words = by_count.setdefault(count, [0] * self.words)
+            words[idx // MASK_BITS] |= 1 << (idx % MASK_BITS)
+        return sorted(by_count.items())
+
+
+def match_locations(store: LocationStore, rules: dict) -> list[int]:
+    """Score and match locations to a collection based on rules.
+
+    Returns store row indices, best first. Scoring is unchanged from the
+    original dict version: +3 per matching category, +5 per matching tag,
+    +2 / +1 per keyword found in the name / description, +1 for a matching
+    price range; min_rating and districts are hard filters.
+    """
+    rule_cats = store.slug_mask(store.category_slugs, rules.get("category_slugs", []))
+    rule_tags = store.slug_mask(store.tag_slugs, rules.get("tag_slugs", []))
+    keyword_masks = store.keyword_masks(rules.get("name_keywords", []))
+    price_ranges = {store.prices.index[p] for p in rules.get("price_ranges", []) if p in store.prices.index}
+    wants_price = bool(rules.get("price_ranges"))
+    min_rating = rules.get("min_rating", 0)
+    districts = {store.districts.index[d] for d in rules.get("districts", []) if d in store.districts.index}
+    wants_district = bool(rules.get("districts"))
+    limit = rules.get("limit", 15)
+
+    words = store.words
+    rating = store.rating
+    name_hits = store.name_hits
+    desc_hits = store.desc_hits
+
+    scored = []
+    for row in range(len(store)):
+        if min_rating > 0 and rating[row] < min_rating:
+            continue
+        if wants_district and store.district[row] not in districts:
+            continue
+
+        score = (store.categories[row] & rule_cats).bit_count() * 3
+        score += (store.tags[row] & rule_tags).bit_count() * 5
+
+        base = row * words
+        for count, mask in keyword_masks:
+            for w in range(words):
+                if mask[w]:
+                    score += 2 * count * (name_hits[base + w] & mask[w]).bit_count()
+                    score += count * (desc_hits[base + w] & mask[w]).bit_count()
+
+        if wants_price and store.price[row] in price_ranges:
+            score += 1
+
+        if score > 0:
+            scored.append((score, rating[row], row))
+
+    # Sort by score desc, then rating desc
+    scored.sort(key=lambda x: (-x[0], -x[1]))
+    return [item[2] for item in scored[:limit]]
@@ -0,0 +1,892 @@
+"""
+In-process stand-in for the APIs the scripts call, for load tests and
+benchmarks that must not burn Gemini quota or touch the live project.
+
+Implemented surface (enough for the scripts in scripts/, not full fidelity):
+
+  Gemini       POST /v1beta/models/{model}:generateContent
+               POST /v1beta/models/{model}:streamGenerateContent[?alt=sse]
+               Image models (name contains "image", or responseModalities
+               includes IMAGE) answer with an inlineData PNG; text models
+               with an HTML article that links the place slugs found in the
+               prompt (a JSON outline of them when responseMimeType is
+               application/json). Every response carries usageMetadata.
+               POST /v1beta/cachedContents, GET/PATCH/DELETE /v1beta/cachedContents/{id}
+               Context caches (ttl/expireTime, updateMask=ttl); requests with
+               "cachedContent" get the cached prefix prepended and report
+               cachedContentTokenCount, or 404 once it has expired.
+  PostgREST    GET/POST/PATCH/DELETE /rest/v1/{table}
+               select, eq/neq/gt/gte/lt/lte/like/ilike/is/in/cs (+ not.),
+               order, limit/offset, Range + Content-Range, Prefer
+               return=/count=exact/resolution=merge-duplicates|ignore-duplicates,
+               on_conflict. POST /rest/v1/rpc/{fn} answers from fixtures.
+  Storage      POST/PUT /storage/v1/object/{bucket}/{path} (x-upsert),
+               GET/HEAD /storage/v1/object[/public]/{bucket}/{path},
+               DELETE /storage/v1/object/{bucket} {"prefixes": [...]},
+               POST /storage/v1/object/list/{bucket}
+  Management   POST /v1/projects/{ref}/database/query
+               Answers from SQL fixtures (first regex that matches the query);
+               otherwise returns the first LIMIT rows of the table named after
+               FROM. Statements other than SELECT/WITH return [].
+  Control      GET /__mock/stats, POST /__mock/reset
+
+Each service ("gemini", "rest", "storage", "sql") has a Policy: a latency
+distribution, random 429/5xx injection, a requests-per-minute limit and a
+total quota. Limits are tracked per API key, so a key pool can be exercised.
+A single Gemini model can be given its own policy as "gemini/<model>" (e.g.
+--error-rate gemini/gemini-3-flash-preview=0.5) to degrade just that model.
+"""
+
+from __future__ import annotations
+
+import base64
+import fnmatch
+import json
+import math
+import random
+import re
+import struct
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict, deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+SERVICES = ("gemini", "rest", "storage", "sql")
+INT_ID_TABLES = {"collections", "categories", "tags"}
+
+LOREM_VI = (
+    "Sài Gòn buổi sáng thức dậy bằng tiếng xe máy và mùi cà phê phin. "
+    "Quán nhỏ nằm sâu trong hẻm, bàn ghế nhựa thấp, chủ quán niềm nở. "
+    "Nước dùng ngọt thanh, thịt mềm, rau thơm tươi rói ăn kèm chanh ớt. "
+    "Giá cả phải chăng, phục vụ nhanh, đông khách nhất vào giờ trưa. "
+).split()
+
+
+# ─── Latency ─────────────────────────────────────────────────────────────────
+
+@dataclass
+class Latency:
+    """Latency distribution in seconds.
+
+    Spec strings: "0", "fixed:0.2", "uniform:0.1,0.5", "normal:1.0,0.2",
+    "lognormal:MEDIAN,SIGMA" (e.g. lognormal:8,0.5 for image generation).
+    """
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, _, args = spec.partition(":")
+        if not args:
+            return cls("fixed", float(kind))
+        values = [float(v) for v in args.split(",")]
+        if kind == "fixed":
+            return cls("fixed", values[0])
+        if kind in ("uniform", "normal", "lognormal"):
+            return cls(kind, values[0], values[1] if len(values) > 1 else 0.0)
+        raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.a, self.b))
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        return self.a
+
+
+@dataclass
+class Policy:
+    latency: Latency = field(default_factory=Latency)
+    error_rate: float = 0.0       # share of requests answered 500/503
+    throttle_rate: float = 0.0    # share of requests answered 429
+    rpm: int = 0                  # per-key requests per minute (0 = unlimited)
+    quota: int = 0                # per-key total requests (0 = unlimited)
+    retry_after: float = 0.0      # Retry-After on injected 429s (0 = none)
+
+
+# ─── State ───────────────────────────────────────────────────────────────────
+
+class MockState:
+    """Tables, objects, fixtures, policies and counters shared by all handlers."""
+
+    def __init__(
+        self,
+        seed: dict = None,
+        policies: dict = None,
+        *,
+        image_size: int = 256,
+        article_words: int = 1200,
+        max_body_bytes: int = 0,
+        cache_min_tokens: int = 0,
+        random_seed: int = None,
+    ):
+        self.lock = threading.RLock()
+        self.reseed(seed)
+        self.policies = {s: Policy() for s in SERVICES}
+        self.policies.update(policies or {})
+        self.image_size = image_size
+        self.article_words = article_words
+        self.max_body_bytes = max_body_bytes
+        self.cache_min_tokens = cache_min_tokens
+        self.cached_contents: dict[str, dict] = {}
+        self.rng = random.Random(random_seed)
+        self._windows: dict[tuple[str, str], deque] = defaultdict(deque)
+        self._used: dict[tuple[str, str], int] = defaultdict(int)
+        self._png_cache: dict[int, bytes] = {}
+        self.reset_stats()
+
+    def reseed(self, seed: dict = None):
+        """Replace tables, fixtures and stored objects with a fresh seed."""
+        seed = seed or {}
+        with self.lock:
+            self.tables: dict[str, list[dict]] = {t: [dict(r) for r in rows] for t, rows in seed.get("tables", {}).items()}
+            self.rpc: dict[str, list] = dict(seed.get("rpc", {}))
+            self.sql_fixtures = [(re.compile(f["match"], re.I | re.S), f["rows"]) for f in seed.get("sql", [])]
+            self.objects: dict[tuple[str, str], dict] = {}
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {
+                s: {
+                    "requests": 0,
+                    "status": defaultdict(int),
+                    "injected_429": 0,
+                    "injected_5xx": 0,
+                    "quota_rejected": 0,
+                    "latency_total": 0.0,
+                    "bytes_in": 0,
+                    "bytes_out": 0,
+                    "per_key": defaultdict(int),
+                    "tokens": defaultdict(int),
+                }
+                for s in SERVICES
+            }
+            self._windows.clear()
+            self._used.clear()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return json.loads(json.dumps(self.stats))
+
+    def policy_name(self, service: str, model: str = None) -> str:
+        """The policy that governs a request: "gemini/<model>" when one is set, else the service's."""
+        if model and f"{service}/{model}" in self.policies:
+            return f"{service}/{model}"
+        return service
+
+    # Faults and quotas — returns (status, retry_after, reason, quota_id) or None.
+    def admit(self, service: str, key: str, name: str = None):
+        name = name or service
+        policy = self.policies[name]
+        now = time.monotonic()
+        with self.lock:
+            if policy.quota and self._used[(name, key)] >= policy.quota:
+                self.stats[service]["quota_rejected"] += 1
+                return 429, 0.0, "Quota exceeded for this API key.", "GenerateRequestsPerDayPerProjectPerModel"
+            window = self._windows[(name, key)]
+            if policy.rpm:
+                while window and now - window[0] >= 60:
+                    window.popleft()
+                if len(window) >= policy.rpm:
+                    self.stats[service]["quota_rejected"] += 1
+                    return (429, max(0.0, 60 - (now - window[0])), "Requests per minute limit exceeded.",
+                            "GenerateRequestsPerMinutePerProjectPerModel")
+            roll = self.rng.random()
+            if roll < policy.throttle_rate:
+                self.stats[service]["injected_429"] += 1
+                return 429, policy.retry_after, "Resource has been exhausted (e.g. check quota).", None
+            if roll < policy.throttle_rate + policy.error_rate:
+                self.stats[service]["injected_5xx"] += 1
+                return self.rng.choice((500, 503)), 0.0, "The model is overloaded. Please try again later.", None
+            window.append(now)
+            self._used[(name, key)] += 1
+        return None
+
+    def delay(self, service: str, name: str = None) -> float:
+        with self.lock:
+            seconds = self.policies[name or service].latency.sample(self.rng)
+        if seconds > 0:
+            time.sleep(seconds)
+        return seconds
+
+    def png(self) -> bytes:
+        """A valid, incompressible RGB PNG of image_size² pixels (cached)."""
+        size = self.image_size
+        if size not in self._png_cache:
+            rng = random.Random(size)
+            raw = b"".join(b"\x00" + rng.randbytes(size * 3) for _ in range(size))
+
+            def chunk(tag: bytes, data: bytes) -> bytes:
+                return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+            self._png_cache[size] = (
+                b"\x89PNG\r\n\x1a\n"
+                + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(raw, 0))
+                + chunk(b"IEND", b"")
+            )
+        return self._png_cache[size]
+
+
+# ─── PostgREST emulation ─────────────────────────────────────────────────────
+
+def _coerce(value: str, like):
+    """Convert a query-string value to the type of the stored column value."""
+    if isinstance(like, bool):
+        return value.lower() == "true"
+    if isinstance(like, int):
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+    if isinstance(like, float):
+        return float(value)
+    return value
+
+
+def _like(pattern: str, value, case_insensitive: bool) -> bool:
+    if value is None:
+        return False
+    glob = pattern.replace("*", "%").replace("%", "*")
+    text = str(value)
+    if case_insensitive:
+        return fnmatch.fnmatchcase(text.lower(), glob.lower())
+    return fnmatch.fnmatchcase(text, glob)
+
+
+def _split_list(body: str) -> list[str]:
+    return [v.strip().strip('"') for v in body.strip("(){}").split(",") if v.strip()]
+
+
+def _test(row: dict, column: str, expr: str) -> bool:
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, arg = expr.partition(".")
+    value = row.get(column)
+    if op == "is":
+        result = value is None if arg == "null" else value is (arg == "true")
+    elif op == "in":
+        result = value is not None and value in [_coerce(v, value) for v in _split_list(arg)]
+    elif op == "cs":
+        result = isinstance(value, list) and set(_split_list(arg)) <= {str(v) for v in value}
+    elif op in ("like", "ilike"):
+        result = _like(arg, value, op == "ilike")
+    elif value is None:
+        result = False
+    else:
+        other = _coerce(arg, value)
+        result = {
+            "eq": value == other,
+            "neq": value != other,
+            "gt": value > other,
+            "gte": value >= other,
+            "lt": value < other,
+            "lte": value <= other,
+        }.get(op, False)
+    return not result if negate else result
+
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def filter_rows(rows: list[dict], params: list[tuple[str, str]]) -> list[dict]:
+    filters = [(k, v) for k, v in params if k not in RESERVED_PARAMS]
+    return [r for r in rows if all(_test(r, k, v) for k, v in filters)]
+
+
+def order_rows(rows: list[dict], order: str) -> list[dict]:
+    for term in reversed([t for t in order.split(",") if t]):
+        column, *mods = term.split(".")
+        desc = "desc" in mods
+        nulls_first = "nullsfirst" in mods if ("nullsfirst" in mods or "nullslast" in mods) else desc
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=lambda r: r[column], reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def project(rows: list[dict], select: str) -> list[dict]:
+    columns = [c.strip() for c in select.split(",") if c.strip() and "(" not in c]
+    if not columns or "*" in columns:
+        return [dict(r) for r in rows]
+    return [{c: r.get(c) for c in columns} for r in rows]
+
+
+def request_text(request: dict) -> str:
+    """All prompt text in a generateContent / cachedContents body."""
+    contents = [request.get("systemInstruction") or {}] + request.get("contents", [])
+    return " ".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+
+
+def prompt_slugs(prompt: str) -> list[str]:
+    """Place slugs in a prompt: "/place/<slug>" links, or the slug column of a tab-separated location table."""
+    slugs = re.findall(r"/place/([a-z0-9-]+)", prompt) + re.findall(r"^[^\t\n]+\t([a-z0-9-]+)\t", prompt, re.M)
+    return list(dict.fromkeys(s for s in slugs if s != "slug"))
+
+
+def parse_ttl(ttl) -> float:
+    """"3600s" -> 3600.0 (the API's default TTL is one hour)."""
+    return float(str(ttl).rstrip("s")) if ttl else 3600.0
+
+
+def cache_resource(cache: dict) -> dict:
+    def stamp(t: float) -> str:
+        return datetime.fromtimestamp(t, timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+    return {
+        "name": cache["name"],
+        "model": cache["model"],
+        "displayName": cache["displayName"],
+        "createTime": stamp(cache["created"]),
+        "expireTime": stamp(cache["expires"]),
+        "usageMetadata": {"totalTokenCount": cache["tokens"]},
+    }
+
+
+# ─── HTTP handler ────────────────────────────────────────────────────────────
+
+GEMINI_PATH = re.compile(r"^/v1(?:beta)?/models/([^/:]+):(generateContent|streamGenerateContent)$")
+CACHE_PATH = re.compile(r"^/v1(?:beta)?/cachedContents(?:/([^/]+))?$")
+SQL_PATH = re.compile(r"^/v1/projects/[^/]+/database/query$")
+ERROR_STATUS = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state
+
+    def log_message(self, format, *args):  # noqa: A002 — BaseHTTPRequestHandler signature
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_HEAD(self):
+        self._dispatch("HEAD")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    # ── plumbing ──
+
+    def _dispatch(self, method: str):
+        try:  # raw (non-percent-encoded) UTF-8 in the request line arrives as latin-1
+            raw_path = self.path.encode("latin-1").decode("utf-8")
+        except UnicodeError:
+            raw_path = self.path
+        parts = urlsplit(raw_path)
+        path = unquote(parts.path)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if path.startswith("/__mock/"):
+            return self._control(method, path)
+
+        if GEMINI_PATH.match(path) or CACHE_PATH.match(path):
+            service = "gemini"
+            key = dict(params).get("key") or self.headers.get("x-goog-api-key", "")
+        elif path.startswith("/rest/v1/"):
+            service = "rest"
+            key = self.headers.get("apikey", "")
+        elif path.startswith("/storage/v1/"):
+            service = "storage"
+            key = self.headers.get("Authorization", "")
+        elif SQL_PATH.match(path):
+            service = "sql"
+            key = self.headers.get("Authorization", "")
+        else:
+            return self._json(404, {"message": f"No mock route for {method} {path}"})
+
+        state = self.state
+        with state.lock:
+            stats = state.stats[service]
+            stats["requests"] += 1
+            stats["bytes_in"] += len(body)
+            stats["per_key"][key[-8:]] += 1
+
+        gemini_match = GEMINI_PATH.match(path) if service == "gemini" else None
+        policy = state.policy_name(service, gemini_match.group(1) if gemini_match else None)
+
+        # Rejections come back immediately, like the real 429s do
+        rejection = state.admit(service, key, policy)
+        if rejection:
+            status, retry_after, message, quota_id = rejection
+            headers = {"Retry-After": f"{math.ceil(retry_after)}"} if retry_after else {}
+            return self._error(service, status, message, headers, quota_id)
+
+        waited = state.delay(service, policy)
+        with state.lock:
+            stats["latency_total"] += waited
+
+        if service == "rest" and state.max_body_bytes and len(body) > state.max_body_bytes:
+            return self._error(service, 413, "Payload Too Large")
+
+        try:
+            if service == "gemini" and CACHE_PATH.match(path):
+                self._cached_content(method, CACHE_PATH.match(path).group(1), params, body)
+            elif service == "gemini":
+                model, method_name = GEMINI_PATH.match(path).groups()
+                self._gemini(model, method_name, params, body)
+            elif service == "rest":
+                self._rest(method, path[len("/rest/v1/"):], params, body)
+            elif service == "storage":
+                self._storage(method, path[len("/storage/v1/"):], body)
+            else:
+                self._sql(body)
+        except (ValueError, KeyError, TypeError) as e:
+            self._json(400, {"message": f"Mock could not handle request: {e}"}, service)
+
+    def _send(self, status: int, payload: bytes, content_type: str, service: str = None, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+        if service:
+            with self.state.lock:
+                self.state.stats[service]["status"][str(status)] += 1
+                self.state.stats[service]["bytes_out"] += len(payload)
+
+    def _json(self, status: int, data, service: str = None, headers: dict = None):
+        payload = json.dumps(data, ensure_ascii=False, default=str).encode()
+        self._send(status, payload, "application/json; charset=utf-8", service, headers)
+
+    def _error(self, service: str, status: int, message: str, headers: dict = None, quota_id: str = None):
+        if service == "gemini":
+            error = {"code": status, "message": message, "status": ERROR_STATUS.get(status, "FAILED_PRECONDITION")}
+            details = []
+            if quota_id:
+                details.append({
+                    "@type": "type.googleapis.com/google.rpc.QuotaFailure",
+                    "violations": [{"quotaMetric": "generativelanguage.googleapis.com/generate_requests",
+                                    "quotaId": quota_id}],
+                })
+            if headers and "Retry-After" in headers:
+                details.append({
+                    "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                    "retryDelay": f"{headers['Retry-After']}s",
+                })
+            if details:
+                error["details"] = details
+            body = {"error": error}
+        elif service == "storage":
+            body = {"statusCode": str(status), "error": ERROR_STATUS.get(status, "Error"), "message": message}
+        else:
+            body = {"code": str(status), "message": message}
+        self._json(status, body, service, headers)
+
+    def _control(self, method: str, path: str):
+        if path == "/__mock/stats" and method == "GET":
+            return self._json(200, self.state.snapshot())
+        if path == "/__mock/reset" and method == "POST":
+            self.state.reset_stats()
+            return self._json(200, {"ok": True})
+        self._json(404, {"message": f"Unknown control route {path}"})
+
+    # ── Gemini ──
+
+    def _gemini(self, model: str, method_name: str, params, body: bytes):
+        state = self.state
+        request = json.loads(body or b"{}")
+        prompt = request_text(request)
+        cached_tokens = 0
+        if request.get("cachedContent"):
+            with state.lock:
+                cache = state.cached_contents.get(request["cachedContent"])
+                if cache and cache["expires"] <= time.time():
+                    del state.cached_contents[request["cachedContent"]]
+                    cache = None
+            if not cache:
+                return self._error("gemini", 404, "CachedContent not found (or permission denied)")
+            if cache["model"] != f"models/{model}":
+                return self._error("gemini", 400, f"Model {model} does not match the cached content's {cache['model']}")
+            prompt = cache["text"] + " " + prompt
+            cached_tokens = cache["tokens"]
+        config = request.get("generationConfig", {})
+        wants_image = "image" in model or "IMAGE" in config.get("responseModalities", [])
+
+        if wants_image:
+            text = "Here is your illustration."
+        elif config.get("responseMimeType") == "application/json":
+            text = self._outline(prompt)
+        else:
+            text = self._article(prompt, config)
+        prompt_tokens = max(1, len(prompt) // 4)
+        output_tokens = max(1, len(text) // 4) + (1290 if wants_image else 0)
+        usage = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        }
+        if cached_tokens:
+            usage["cachedContentTokenCount"] = cached_tokens
+        with state.lock:
+            tokens = state.stats["gemini"]["tokens"]
+            tokens["prompt"] += prompt_tokens
+            tokens["cached"] += cached_tokens
+            tokens["candidates"] += output_tokens
+            tokens["images"] += 1 if wants_image else 0
+
+        parts = [{"text": text}]
+        if wants_image:
+            parts.append({"inlineData": {"mimeType": "image/png", "data": base64.b64encode(state.png()).decode()}})
+
+        def response(chunk_parts, final):
+            candidate = {"content": {"role": "model", "parts": chunk_parts}, "index": 0}
+            if final:
+                candidate["finishReason"] = "STOP"
+            return {"candidates": [candidate], "usageMetadata": usage, "modelVersion": model}
+
+        if method_name == "generateContent":
+            return self._json(200, response(parts, True), "gemini")
+
+        # streamGenerateContent: text in ~4 chunks, image (if any) in the last one
+        step = max(1, math.ceil(len(text) / 4))
+        chunks = [[{"text": text[i:i + step]}] for i in range(0, len(text), step)] or [[{"text": ""}]]
+        if wants_image:
+            chunks[-1].append(parts[1])
+        events = [response(c, i == len(chunks) - 1) for i, c in enumerate(chunks)]
+        if dict(params).get("alt") == "sse":
+            payload = "".join(f"data: {json.dumps(e, ensure_ascii=False)}\r\n\r\n" for e in events).encode()
+            return self._send(200, payload, "text/event-stream; charset=utf-8", "gemini")
+        self._json(200, events, "gemini")
+
+    def _cached_content(self, method: str, cache_id: str, params, body: bytes):
+        state = self.state
+        now = time.time()
+        if cache_id is None:
+            if method != "POST":
+                return self._error("gemini", 405, f"{method} not supported on cachedContents")
+            request = json.loads(body or b"{}")
+            if not request.get("model"):
+                return self._error("gemini", 400, "model is required")
+            text = request_text(request)
+            tokens = max(1, len(text) // 4)
+            if tokens < state.cache_min_tokens:
+                return self._error("gemini", 400, f"Cached content is too small. total_token_count={tokens}, "
+                                                  f"min_total_token_count={state.cache_min_tokens}")
+            name = f"cachedContents/{uuid.uuid4().hex[:16]}"
+            cache = {"name": name, "model": request["model"], "displayName": request.get("displayName", ""),
+                     "text": text, "tokens": tokens, "created": now, "expires": now + parse_ttl(request.get("ttl"))}
+            with state.lock:
+                state.cached_contents[name] = cache
+            return self._json(200, cache_resource(cache), "gemini")
+
+        name = f"cachedContents/{cache_id}"
+        with state.lock:
+            cache = state.cached_contents.get(name)
+            if cache and cache["expires"] <= now:
+                del state.cached_contents[name]
+                cache = None
+            if not cache:
+                return self._error("gemini", 404, "CachedContent not found (or permission denied)")
+            if method == "DELETE":
+                del state.cached_contents[name]
+                return self._json(200, {}, "gemini")
+            if method == "PATCH":
+                request = json.loads(body or b"{}")
+                if "ttl" in request:
+                    cache["expires"] = now + parse_ttl(request["ttl"])
+                elif "expireTime" in request:
+                    cache["expires"] = datetime.fromisoformat(request["expireTime"].replace("Z", "+00:00")).timestamp()
+            return self._json(200, cache_resource(cache), "gemini")
+
+    def _outline(self, prompt: str) -> str:
+        """JSON outline: the prompt's place slugs in sections of three."""
+        slugs = prompt_slugs(prompt)
+        groups = [slugs[i:i + 3] for i in range(0, len(slugs), 3)] or [[]]
+        return json.dumps({"sections": [
+            {"heading": f"Nhóm quán {i + 1}", "slugs": group, "brief": "Giới thiệu các quán trong nhóm."}
+            for i, group in enumerate(groups)
+        ]}, ensure_ascii=False)
+
+    def _article(self, prompt: str, config: dict) -> str:
+        """Deterministic-length HTML that links every place slug in the prompt."""
+        rng = random.Random(zlib.crc32(prompt.encode()))
+        words = min(self.state.article_words, int(config.get("maxOutputTokens", 8192) * 0.75))
+        slugs = prompt_slugs(prompt)
+        sections = max(1, len(slugs)) if slugs else 4
+        per_section = max(20, words // sections)
+        html = []
+        for i in range(sections):
+            title = f"Quán số {i + 1}" if slugs else f"Phần {i + 1}"
+            html.append(f"<h2>{title}</h2>")
+            paragraph = " ".join(rng.choice(LOREM_VI) for _ in range(per_section))
+            if slugs:
+                paragraph += f' <a href="/place/{slugs[i]}">Xem chi tiết</a>'
+            html.append(f"<p>{paragraph}</p>")
+        return "\n".join(html)
+
+    # ── PostgREST ──
+
+    def _rest(self, method: str, resource: str, params, body: bytes):
+        state = self.state
+        prefer = self.headers.get("Prefer", "")
+        representation = "return=representation" in prefer
+
+        if resource.startswith("rpc/"):
+            return self._json(200, state.rpc.get(resource[4:], []), "rest")
+
+        table = resource
+        query = dict(params)
+        with state.lock:
+            rows = state.tables.setdefault(table, [])
+
+            if method in ("GET", "HEAD"):
+                matched = order_rows(filter_rows(rows, params), query.get("order", ""))
+                total = len(matched)
+                start = int(query.get("offset", 0))
+                end = start + int(query["limit"]) - 1 if "limit" in query else total - 1
+                range_header = self.headers.get("Range")
+                if range_header and "-" in range_header:
+                    lo, hi = range_header.split("-", 1)
+                    start, end = int(lo or 0), int(hi) if hi else total - 1
+                page = project(matched[start:end + 1], query.get("select", "*"))
+                count = str(total) if "count=exact" in prefer else "*"
+                content_range = f"{start}-{start + len(page) - 1}/{count}" if page else f"*/{count}"
+                return self._json(200, page, "rest", {"Content-Range": content_range})
+
+            if method == "POST":
+                incoming = json.loads(body or b"[]")
+                incoming = incoming if isinstance(incoming, list) else [incoming]
+                keys = [c for c in query.get("on_conflict", "id").split(",") if c]
+                merge = "resolution=merge-duplicates" in prefer
+                ignore = "resolution=ignore-duplicates" in prefer
+                index = {tuple(r.get(k) for k in keys): r for r in rows}
+                written = []
+                for item in incoming:
+                    key = tuple(item.get(k) for k in keys)
+                    existing = index.get(key) if all(v is not None for v in key) else None
+                    if existing is not None:
+                        if merge:
+                            existing.update(item)
+                            written.append(existing)
+                        elif not ignore:
+                            return self._json(409, {
+                                "code": "23505",
+                                "message": f'duplicate key value violates unique constraint "{table}_pkey"',
+                                "details": f"Key ({', '.join(keys)})=({', '.join(map(str, key))}) already exists.",
+                            }, "rest")
+                        continue
+                    row = self._new_row(table, rows, item)
+                    rows.append(row)
+                    index[tuple(row.get(k) for k in keys)] = row
+                    written.append(row)
+                return self._json(201, [dict(r) for r in written] if representation else [], "rest")
+
+            if method == "PATCH":
+                changes = json.loads(body or b"{}")
+                matched = filter_rows(rows, params)
+                for row in matched:
+                    row.update(changes)
+                if representation:
+                    return self._json(200, [dict(r) for r in matched], "rest")
+                return self._send(204, b"", "application/json", "rest")
+
+            if method == "DELETE":
+                doomed = filter_rows(rows, params)
+                ids = {id(r) for r in doomed}
+                state.tables[table] = [r for r in rows if id(r) not in ids]
+                if representation:
+                    return self._json(200, doomed, "rest")
+                return self._send(204, b"", "application/json", "rest")
+
+        self._json(405, {"message": f"{method} not supported"}, "rest")
+
+    @staticmethod
+    def _new_row(table: str, rows: list[dict], item: dict) -> dict:
+        row = dict(item)
+        if row.get("id") is None and (table in INT_ID_TABLES or any(isinstance(r.get("id"), int) for r in rows[:1])):
+            row["id"] = max((r["id"] for r in rows if isinstance(r.get("id"), int)), default=0) + 1
+        elif row.get("id") is None and table not in ("location_categories", "location_tags", "collection_locations"):
+            row["id"] = str(uuid.uuid4())
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        return row
+
+    # ── Storage ──
+
+    def _storage(self, method: str, resource: str, body: bytes):
+        state = self.state
+        if not resource.startswith("object/"):
+            return self._json(404, {"message": f"Unknown storage route {resource}"}, "storage")
+        resource = resource[len("object/"):]
+
+        if method == "POST" and resource.startswith("list/"):
+            bucket = resource[len("list/"):]
+            options = json.loads(body or b"{}")
+            prefix = options.get("prefix", "").strip("/")
+            offset, limit = int(options.get("offset", 0)), int(options.get("limit", 100))
+            with state.lock:
+                names = sorted(
+                    path for (b, path) in state.objects
+                    if b == bucket and (not prefix or path.startswith(prefix + "/"))
+                )
+                listing = [
+                    {
+                        "name": path[len(prefix) + 1:] if prefix else path,
+                        "id": state.objects[(bucket, path)]["id"],
+                        "created_at": state.objects[(bucket, path)]["created_at"],
+                        "metadata": {
+                            "size": len(state.objects[(bucket, path)]["data"]),
+                            "mimetype": state.objects[(bucket, path)]["content_type"],
+                            "cacheControl": state.objects[(bucket, path)]["cache_control"],
+                        },
+                    }
+                    for path in names[offset:offset + limit]
+                ]
+            return self._json(200, listing, "storage")
+
+        if method == "DELETE" and "/" not in resource:
+            prefixes = json.loads(body or b"{}").get("prefixes", [])
+            with state.lock:
+                removed = [p for p in prefixes if state.objects.pop((resource, p), None) is not None]
+            return self._json(200, [{"name": p} for p in removed], "storage")
+
+        public = resource.startswith("public/")
+        if public:
+            resource = resource[len("public/"):]
+        bucket, _, path = resource.partition("/")
+
+        if method in ("POST", "PUT"):
+            upsert = self.headers.get("x-upsert", "false").lower() == "true" or method == "PUT"
+            with state.lock:
+                if (bucket, path) in state.objects and not upsert:
+                    return self._json(400, {"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"}, "storage")
+                state.objects[(bucket, path)] = {
+                    "id": str(uuid.uuid4()),
+                    "data": body,
+                    "content_type": self.headers.get("Content-Type", "application/octet-stream"),
+                    "cache_control": self.headers.get("cache-control", "max-age=3600"),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                }
+            return self._json(200, {"Key": f"{bucket}/{path}"}, "storage")
+
+        if method in ("GET", "HEAD"):
+            obj = state.objects.get((bucket, path))
+            if obj is None:
+                return self._json(404, {"statusCode": "404", "error": "not_found", "message": "Object not found"}, "storage")
+            return self._send(200, obj["data"], obj["content_type"], "storage", {"Cache-Control": obj["cache_control"]})
+
+        self._json(405, {"message": f"{method} not supported"}, "storage")
+
+    # ── Management API SQL ──
+
+    def _sql(self, body: bytes):
+        state = self.state
+        query = json.loads(body or b"{}").get("query", "")
+        for pattern, rows in state.sql_fixtures:
+            if pattern.search(query):
+                return self._json(201, rows, "sql")
+        statement = query.lstrip().split(None, 1)[0].upper() if query.strip() else ""
+        if statement not in ("SELECT", "WITH"):
+            return self._json(201, [], "sql")
+        table = re.search(r"\bFROM\s+(?:public\.)?(\w+)", query, re.I)
+        limit = re.search(r"\bLIMIT\s+(\d+)", query, re.I)
+        with state.lock:
+            rows = state.tables.get(table.group(1), []) if table else []
+            rows = rows[:int(limit.group(1))] if limit else rows
+            self._json(201, [dict(r) for r in rows], "sql")
+
+
+# ─── Server ──────────────────────────────────────────────────────────────────
+
+class MockServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer bound to a MockState; start() runs it in a thread."""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, state: MockState, host: str = "127.0.0.1", port: int = 0, verbose: bool = False):
+        super().__init__((host, port), MockHandler)
+        self.state = state
+        self.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # Clients that hit their timeout hang up before the reply is written
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def parse_service_option(values: list[str], convert) -> dict:
+    """["gemini=0.05", "rest=0.01"] -> {"gemini": 0.05, "rest": 0.01}; "all=" applies to every service.
+
+    "gemini/<model>=..." targets one Gemini model.
+    """
+    result = {}
+    for value in values or []:
+        service, sep, raw = value.partition("=")
+        if not sep:
+            raise ValueError(f"Expected SERVICE=VALUE, got {value!r}")
+        targets = SERVICES if service == "all" else (service,)
+        for target in targets:
+            if target not in SERVICES and not (target.startswith("gemini/") and len(target) > len("gemini/")):
+                raise ValueError(f"Unknown service {target!r} (one of {', '.join(SERVICES)}, gemini/<model>, all)")
+            result[target] = convert(raw)
+    return result
+
+
+def build_policies(latency=None, error_rate=None, throttle_rate=None, rpm=None, quota=None, retry_after=None) -> dict:
+    """Assemble per-service Policies from SERVICE=VALUE option lists."""
+    options = {
+        "latency": parse_service_option(latency, Latency.parse),
+        "error_rate": parse_service_option(error_rate, float),
+        "throttle_rate": parse_service_option(throttle_rate, float),
+        "rpm": parse_service_option(rpm, int),
+        "quota": parse_service_option(quota, int),
+        "retry_after": parse_service_option(retry_after, float),
+    }
+    policies = {}
+    for service in SERVICES:
+        policies[service] = Policy(**{name: values[service] for name, values in options.items() if service in values})
+    # Per-model policies start from the gemini one and override what they set
+    models = {target for values in options.values() for target in values if "/" in target}
+    for target in sorted(models):
+        overrides = {name: values[target] for name, values in options.items() if target in values}
+        policies[target] = replace(policies["gemini"], **overrides)
+    return policies
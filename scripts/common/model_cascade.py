@@ -0,0 +1,143 @@
+"""
+Ordered Gemini model lists with per-model latency budgets and health.
+
+    GEMINI_MODELS = model_cascade.cascade("text")
+    data = gemini.generate(GEMINI_MODELS, body, timeout=300)
+
+A cascade is written "model[:slo_seconds],...", first choice first, and can
+be overridden per run with GEMINI_<NAME>_MODELS (GEMINI_TEXT_MODELS,
+GEMINI_IMAGE_MODELS). A model's SLO is a latency target, not a timeout:
+every request waits up to the caller's timeout, and an answer that arrives
+after the SLO is still used, it only counts against the model's health.
+
+Health is shared by every call in the run. A 503, a timeout, an answer slower
+than the SLO or (with a single API key) a 429 takes the model out of rotation
+for Retry-After or a backoff that grows with its consecutive failures. Calls
+start from the first model in rotation, so while the preview model is
+degraded they go straight to the fallback instead of failing on it first. A
+success puts the model back.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from common import throttle
+
+DEFAULTS = {
+    "text": "gemini-3-flash-preview:180,gemini-2.5-flash",
+    "image": "gemini-2.5-flash-image",
+}
+LATENCY_EWMA = 0.2
+
+
+@dataclass
+class Model:
+    name: str
+    slo: float | None = None
+    down_until: float = 0.0     # monotonic
+    failures: int = 0           # consecutive
+    latency: float | None = None
+    stats: dict = field(default_factory=lambda: {"calls": 0, "ok": 0, "failed": 0, "over_slo": 0})
+
+
+def parse(spec: str) -> list[Model]:
+    """"a:180,b" -> [Model("a", 180.0), Model("b")]."""
+    models = []
+    for item in spec.split(","):
+        name, _, slo = item.strip().partition(":")
+        if not name:
+            continue
+        try:
+            models.append(Model(name, float(slo) if slo else None))
+        except ValueError:
+            raise ValueError(f"Bad model SLO in {item.strip()!r} (expected model:seconds)")
+    if not models:
+        raise ValueError(f"No models in {spec!r}")
+    return models
+
+
+class ModelCascade:
+    def __init__(self, name: str, models: list[Model]):
+        self.name = name
+        self.models = models
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return " → ".join(m.name + (f" ({m.slo:g}s)" if m.slo else "") for m in self.models)
+
+    def pick(self) -> Model:
+        """The first model in rotation, or the one back soonest when all are down."""
+        with self._lock:
+            now = time.monotonic()
+            model = next((m for m in self.models if m.down_until <= now), None)
+            model = model or min(self.models, key=lambda m: m.down_until)
+            model.stats["calls"] += 1
+            return model
+
+    def available(self) -> bool:
+        """Whether any model is in rotation right now."""
+        with self._lock:
+            now = time.monotonic()
+            return any(m.down_until <= now for m in self.models)
+
+    def succeeded(self, model: Model, latency: float):
+        with self._lock:
+            model.latency = latency if model.latency is None else (
+                LATENCY_EWMA * latency + (1 - LATENCY_EWMA) * model.latency)
+            if model.slo and latency > model.slo:
+                model.stats["over_slo"] += 1
+                self._down(model, None)
+                return
+            model.stats["ok"] += 1
+            model.failures = 0
+            model.down_until = 0.0
+
+    def failed(self, model: Model, retry_after: float | None = None):
+        """A load failure (429/503/timeout): rest the model for retry_after or a backoff."""
+        with self._lock:
+            model.stats["failed"] += 1
+            self._down(model, retry_after)
+
+    def _down(self, model: Model, retry_after: float | None):
+        model.failures += 1
+        wait = retry_after if retry_after is not None else throttle.backoff(model.failures - 1)
+        model.down_until = max(model.down_until, time.monotonic() + wait * throttle.TIME_SCALE)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                m.name: {**m.stats, "slo": m.slo,
+                         "latency_seconds": round(m.latency, 2) if m.latency is not None else None}
+                for m in self.models
+            }
+
+
+_cascades: dict[str, ModelCascade] = {}
+_registry_lock = threading.Lock()
+
+
+def cascade(name: str, default: str = None) -> ModelCascade:
+    """The process-wide cascade `name`, from GEMINI_<NAME>_MODELS or the default spec."""
+    with _registry_lock:
+        if name not in _cascades:
+            spec = os.environ.get(f"GEMINI_{name.upper()}_MODELS") or default or DEFAULTS[name]
+            _cascades[name] = ModelCascade(name, parse(spec))
+        return _cascades[name]
+
+
+def reset():
+    """Forget every cascade's health; the next call starts from the first model."""
+    with _registry_lock:
+        for c in _cascades.values():
+            with c._lock:
+                for m in c.models:
+                    m.down_until, m.failures = 0.0, 0
+
+
+def snapshot() -> dict:
+    with _registry_lock:
+        return {name: c.snapshot() for name, c in _cascades.items()}
@@ -0,0 +1,146 @@
+"""
+Near-duplicate check of new article topics against already-published posts,
+run before any Gemini call is spent on them.
+
+    index = near_duplicates.PostIndex(posts)   # slug, title, tags, related_location_slugs
+    match = index.similar_topic(topic["title"], topic["tags"])
+    ...
+    match = index.similar_locations(location_slugs)
+
+Two signals, each cheap enough to check every topic in milliseconds:
+
+- Title and tags: cosine similarity of the titles' character n-grams
+  (common.text.char_ngrams), weighted by IDF over the published titles so
+  the boilerplate every topic family shares ("…: Top quán ngon nhất 2026")
+  counts for little, together with the Jaccard overlap of the tags. Both
+  have to be high: "Ăn gì ở Quận 1" and "Ăn gì ở Quận 3" have near-identical
+  titles but different district tags.
+- Locations: Jaccard overlap of the place slugs a post links. Candidates come
+  from MinHash signatures bucketed by LSH band, so a lookup only compares
+  against posts likely to be above the threshold; their exact overlap is
+  then computed from the stored sets.
+
+A topic reworded from an existing post usually passes the first check but
+picks the same top-rated locations, which the second catches once its
+location query has run.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import threading
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from common.text import char_ngrams, fold
+
+TITLE_THRESHOLD = 0.8      # cosine of IDF-weighted title n-grams
+TAG_THRESHOLD = 0.75       # Jaccard of folded tags, required alongside the title
+LOCATION_THRESHOLD = 0.6   # Jaccard of linked place slugs
+NUM_PERM = 64
+BANDS = 16                 # 4 rows per band: pairs above ~0.5 Jaccard almost always share one
+MIN_LOCATIONS = 3          # smaller sets overlap by chance
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20261019)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(NUM_PERM)]
+
+
+@dataclass
+class Match:
+    slug: str
+    title: str
+    reason: str     # "title" or "locations"
+    score: float
+
+    def __str__(self):
+        return f"{self.reason} {self.score:.2f} vs /blog/{self.slug}"
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def minhash(items: set[str]) -> tuple[int, ...]:
+    """MinHash signature of a set of strings (NUM_PERM universal hash permutations)."""
+    hashes = [zlib.crc32(item.encode()) for item in items]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def _bands(signature: tuple[int, ...]) -> list[tuple]:
+    rows = NUM_PERM // BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(BANDS)]
+
+
+@dataclass
+class _Post:
+    slug: str
+    title: str
+    tags: frozenset
+    grams: Counter
+    locations: frozenset
+
+
+class PostIndex:
+    def __init__(self, posts: list[dict] = ()):
+        self._posts: list[_Post] = []
+        self._buckets: dict[tuple, list[int]] = defaultdict(list)
+        self._doc_freq: Counter = Counter()
+        self._vectors: list[tuple[dict, float]] | None = None
+        self._lock = threading.Lock()
+        for post in posts:
+            self.add(post.get("slug", ""), post.get("title", ""), post.get("tags"),
+                     post.get("related_location_slugs"))
+
+    def __len__(self):
+        return len(self._posts)
+
+    def add(self, slug: str, title: str, tags: list = None, location_slugs: list = None):
+        """Index a post (also call it for posts published during the run)."""
+        grams = Counter(char_ngrams(title or ""))
+        locations = frozenset(s for s in location_slugs or [] if s)
+        with self._lock:
+            self._posts.append(_Post(slug, title, frozenset(fold(t) for t in tags or []), grams, locations))
+            self._doc_freq.update(grams.keys())
+            self._vectors = None
+            if len(locations) >= MIN_LOCATIONS:
+                for band in _bands(minhash(locations)):
+                    self._buckets[band].append(len(self._posts) - 1)
+
+    def _weigh(self, grams: Counter) -> tuple[dict, float]:
+        n = len(self._posts)
+        vector = {g: c * (math.log((1 + n) / (1 + self._doc_freq[g])) + 1) for g, c in grams.items()}
+        return vector, math.sqrt(sum(w * w for w in vector.values())) or 1.0
+
+    def similar_topic(self, title: str, tags: list = None) -> Match | None:
+        """The published post whose title and tags are closest to this topic's, if over both thresholds."""
+        tags = frozenset(fold(t) for t in tags or [])
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = [self._weigh(p.grams) for p in self._posts]
+            query, norm = self._weigh(Counter(char_ngrams(title)))
+            best = None
+            for post, (vector, post_norm) in zip(self._posts, self._vectors):
+                if tags and post.tags and jaccard(tags, post.tags) < TAG_THRESHOLD:
+                    continue
+                score = sum(w * vector.get(g, 0.0) for g, w in query.items()) / (norm * post_norm)
+                if score >= TITLE_THRESHOLD and (best is None or score > best.score):
+                    best = Match(post.slug, post.title, "title", score)
+            return best
+
+    def similar_locations(self, location_slugs: list) -> Match | None:
+        """The published post linking most of the same places, if over LOCATION_THRESHOLD."""
+        locations = frozenset(s for s in location_slugs if s)
+        if len(locations) < MIN_LOCATIONS:
+            return None
+        with self._lock:
+            candidates = {i for band in _bands(minhash(locations)) for i in self._buckets.get(band, ())}
+            best = None
+            for i in candidates:
+                post = self._posts[i]
+                score = jaccard(locations, post.locations)
+                if score >= LOCATION_THRESHOLD and (best is None or score > best.score):
+                    best = Match(post.slug, post.title, "locations", score)
+            return best
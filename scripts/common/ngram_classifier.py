@@ -0,0 +1,105 @@
+"""
+Nearest-centroid classifier over character n-grams, used to categorize the
+locations that keyword matching leaves behind.
+
+Names are folded (common.text.fold), split into character n-grams, weighted
+by TF-IDF and L2-normalized into a sparse matrix. Each category is represented
+by the normalized mean vector of its already-categorized locations, so scoring
+every unmatched name against every category is a single sparse matrix
+product.
+
+Requires numpy + scipy (pip install numpy scipy).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+
+from common.text import char_ngrams
+
+
+@dataclass
+class Prediction:
+    label: str
+    score: float   # cosine similarity to the winning centroid
+    margin: float  # gap to the runner-up centroid
+
+
+class NgramCentroidClassifier:
+    def __init__(self, n_min: int = 2, n_max: int = 4):
+        self.n_min = n_min
+        self.n_max = n_max
+        self.vocab: dict[str, int] = {}
+        self.idf: np.ndarray | None = None
+        self.labels: list[str] = []
+        self.centroids: sparse.csr_matrix | None = None
+
+    def _counts(self, names: list[str], grow_vocab: bool) -> sparse.csr_matrix:
+        rows, cols = [], []
+        for row, name in enumerate(names):
+            for gram in char_ngrams(name, self.n_min, self.n_max):
+                col = self.vocab.get(gram)
+                if col is None:
+                    if not grow_vocab:
+                        continue
+                    col = self.vocab[gram] = len(self.vocab)
+                rows.append(row)
+                cols.append(col)
+        data = np.ones(len(rows), dtype=np.float32)
+        # Duplicate (row, col) pairs are summed into n-gram counts.
+        return sparse.csr_matrix((data, (rows, cols)), shape=(len(names), len(self.vocab)))
+
+    def _weigh(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        weighted = counts.multiply(self.idf).tocsr()
+        return _normalize_rows(weighted)
+
+    def fit(self, names: list[str], labels: list[str]) -> "NgramCentroidClassifier":
+        if not names:
+            raise ValueError("fit() needs at least one labelled name")
+        self.vocab = {}
+        counts = self._counts(names, grow_vocab=True)
+
+        doc_freq = np.asarray((counts > 0).sum(axis=0)).ravel()
+        n_docs = counts.shape[0]
+        self.idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+        vectors = self._weigh(counts)
+
+        self.labels = sorted(set(labels))
+        label_index = {label: i for i, label in enumerate(self.labels)}
+        membership = sparse.csr_matrix(
+            (np.ones(len(labels), dtype=np.float32),
+             ([label_index[label] for label in labels], list(range(len(labels))))),
+            shape=(len(self.labels), len(labels)),
+        )
+        self.centroids = _normalize_rows(membership @ vectors)
+        return self
+
+    def predict(self, names: list[str]) -> list[Prediction]:
+        if self.centroids is None:
+            raise RuntimeError("fit() must be called before predict()")
+        if not names:
+            return []
+        vectors = self._weigh(self._counts(names, grow_vocab=False))
+        scores = (vectors @ self.centroids.T).toarray()
+
+        if scores.shape[1] > 1:
+            top2 = np.partition(scores, -2, axis=1)[:, -2:]
+            runner_up = top2.min(axis=1)
+        else:
+            runner_up = np.zeros(scores.shape[0], dtype=scores.dtype)
+        best = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(names)), best]
+
+        return [
+            Prediction(self.labels[b], float(s), float(s - r))
+            for b, s, r in zip(best, best_score, runner_up)
+        ]
+
+
+def _normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
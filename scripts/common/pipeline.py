@@ -0,0 +1,33 @@
+"""
+Run a per-item generator step over many items, optionally in parallel.
+
+The generators used to loop over their items one at a time with a fixed
+time.sleep() between them. run_items() keeps that behaviour for workers=1
+(same order, same pacing) and fans out over a thread pool otherwise; the
+pacing delay then applies per worker, so N workers make at most N requests
+per delay window.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def run_items(items: Iterable[T], fn: Callable[[T], R], *, workers: int = 1, delay: float = 0.0) -> list[R]:
+    """Call fn(item) for every item and return the results in input order."""
+    items = list(items)
+
+    def paced(item: T) -> R:
+        try:
+            return fn(item)
+        finally:
+            if delay > 0:
+                time.sleep(delay)
+
+    if workers <= 1:
+        return [paced(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(paced, items))
@@ -0,0 +1,216 @@
+"""
+Single-pass analysis of a post's HTML, stored alongside it so pages don't
+re-parse `content` on every render.
+
+    analysis = post_html.analyze(content)
+    post_data["content"] = analysis.content      # headings now carry id=""
+    post_data["toc"] = analysis.toc              # [{"level": 2, "text": ..., "anchor": ...}]
+
+One html.parser pass collects
+
+- toc: every <h2>/<h3> with its text and anchor. Headings without an id
+  (or with an empty one) get one (the folded heading text, deduplicated
+  with -2, -3…), spliced into `content` from the offsets recorded during
+  the same pass; an empty id="" is replaced in place.
+- excerpt: the plain text of the first paragraphs, cut at a word boundary
+  to EXCERPT_CHARS.
+- word_count: words in text nodes outside <script>/<style>; a word split
+  by an inline tag ("<b>Phở</b>Hòa") counts once.
+- place_slugs: /place/<slug> link targets, in order of first appearance.
+- images: {src, alt} of every <img>.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+
+from common.text import fold
+
+EXCERPT_CHARS = 300
+TOC_LEVELS = {"h2": 2, "h3": 3}
+WORDS_PER_MINUTE = 200
+MIN_READING_TIME = 3
+
+# Tags that end a word: text on either side of them is never one word
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption", "figure",
+    "footer", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "img", "li", "main", "nav", "ol", "p",
+    "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+SKIP_TAGS = {"script", "style"}
+PLACE_HREF = re.compile(r"^(?:https?://[^/]+)?/place/([a-z0-9-]+)/?(?:[?#].*)?$")
+_NON_ANCHOR = re.compile(r"[^a-z0-9]+")
+# One attribute of a start tag, as html.parser tokenizes them
+_ATTR = re.compile(r'''[\s/]+([^\s/>][^\s/=>]*)(?:\s*=\s*(?:'[^']*'|"[^"]*"|(?!['"])[^>\s]*))?''')
+
+
+@dataclass
+class PostAnalysis:
+    content: str
+    toc: list[dict] = field(default_factory=list)
+    excerpt: str = ""
+    word_count: int = 0
+    place_slugs: list[str] = field(default_factory=list)
+    images: list[dict] = field(default_factory=list)
+
+    @property
+    def reading_time(self) -> int:
+        """Minutes, at WORDS_PER_MINUTE and never under MIN_READING_TIME."""
+        return max(MIN_READING_TIME, math.ceil(self.word_count / WORDS_PER_MINUTE))
+
+
+def anchor_for(text: str) -> str:
+    """Heading text as an id: "Phở Hòa Pasteur" -> "pho-hoa-pasteur"."""
+    return _NON_ANCHOR.sub("-", fold(text)).strip("-") or "muc"
+
+
+def cut_excerpt(text: str, limit: int = EXCERPT_CHARS) -> str:
+    if len(text) <= limit:
+        return text
+    cut = text[:limit + 1].rsplit(" ", 1)[0] if " " in text[:limit + 1] else text[:limit]
+    return cut.rstrip(" ,.;:—-") + "…"
+
+
+class _Analyzer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.words = 0
+        self.in_word = False
+        self.skip = 0
+        self.headings: list[dict] = []      # level, text, id and where the start tag is
+        self.heading = None
+        self.paragraph: list[str] | None = None
+        self.paragraphs: list[str] = []
+        self.excerpt_chars = 0
+        self.place_slugs: dict[str, None] = {}
+        self.images: list[dict] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip += 1
+        if tag in BLOCK_TAGS:
+            self.in_word = False
+            if self.paragraph is not None:
+                self.paragraph.append(" ")
+        attrs = dict(attrs)
+        if tag in TOC_LEVELS and self.heading is None:
+            line, col = self.getpos()
+            self.heading = {"level": TOC_LEVELS[tag], "parts": [], "id": (attrs.get("id") or "").strip(),
+                            "pos": (line, col), "tag": self.get_starttag_text() or ""}
+        elif tag == "p" and self.excerpt_chars < EXCERPT_CHARS and self.heading is None:
+            self.paragraph = []
+        elif tag == "a":
+            match = PLACE_HREF.match(attrs.get("href") or "")
+            if match:
+                self.place_slugs.setdefault(match.group(1))
+        elif tag == "img" and attrs.get("src"):
+            self.images.append({"src": attrs["src"], "alt": attrs.get("alt") or ""})
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in TOC_LEVELS or tag == "p":
+            # <h2/> or <p/> never gets an end tag: a word break, not a heading or paragraph
+            self.in_word = False
+            if self.paragraph is not None:
+                self.paragraph.append(" ")
+            return
+        self.handle_starttag(tag, attrs)
+        if tag in SKIP_TAGS:
+            self.skip -= 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self.skip:
+            self.skip -= 1
+        if tag in BLOCK_TAGS:
+            self.in_word = False
+        if tag in TOC_LEVELS and self.heading is not None:
+            self.heading["text"] = " ".join("".join(self.heading.pop("parts")).split())
+            self.headings.append(self.heading)
+            self.heading = None
+        elif tag == "p" and self.paragraph is not None:
+            text = " ".join("".join(self.paragraph).split())
+            if text:
+                self.paragraphs.append(text)
+                self.excerpt_chars += len(text) + 1
+            self.paragraph = None
+
+    def handle_data(self, data):
+        if self.skip:
+            return
+        if self.heading is not None:
+            self.heading["parts"].append(data)
+        if self.paragraph is not None:
+            self.paragraph.append(data)
+        tokens = data.split()
+        if not tokens:
+            if data:
+                self.in_word = False
+            return
+        self.words += len(tokens)
+        if self.in_word and not data[0].isspace():
+            self.words -= 1
+        self.in_word = not data[-1].isspace()
+
+
+def _offsets(html: str) -> list[int]:
+    """Offset of the start of each (1-based) line, for HTMLParser.getpos()."""
+    starts = [0, 0]
+    for match in re.finditer("\n", html):
+        starts.append(match.end())
+    return starts
+
+
+def _id_span(tag: str) -> tuple[int, int] | None:
+    """Where the id attribute (leading whitespace included) sits in a start tag's text."""
+    name_end = re.match(r"<[^\s/>]+", tag).end()
+    for attr in _ATTR.finditer(tag, name_end):
+        if attr.group(1).lower() == "id":
+            return attr.span()
+    return None
+
+
+def analyze(html: str) -> PostAnalysis:
+    """Everything a post page needs from `html`, in one parse."""
+    parser = _Analyzer()
+    parser.feed(html or "")
+    parser.close()
+
+    # Explicit ids first, so a generated anchor never repeats one that comes later
+    toc, used, inserts = [], {h["id"] for h in parser.headings if h["id"]}, []
+    line_starts = None
+    for heading in parser.headings:
+        anchor = heading["id"]
+        if not anchor:
+            base = anchor = anchor_for(heading["text"])
+            n = 2
+            while anchor in used:
+                anchor, n = f"{base}-{n}", n + 1
+            line_starts = line_starts or _offsets(html)
+            line, col = heading["pos"]
+            start, tag = line_starts[line] + col, heading["tag"]
+            span = _id_span(tag)
+            if span:
+                # An empty id="": replace it rather than add a second id
+                inserts.append((start + span[0], start + span[1], f' id="{anchor}"'))
+            else:
+                # Insert right before the start tag's closing ">" (or "/>")
+                end = start + len(tag) - 1
+                end -= html[end - 1] == "/"
+                inserts.append((end, end, f' id="{anchor}"'))
+            used.add(anchor)
+        toc.append({"level": heading["level"], "text": heading["text"], "anchor": anchor})
+
+    content = html or ""
+    for begin, end, text in reversed(inserts):
+        content = content[:begin] + text + content[end:]
+
+    return PostAnalysis(
+        content=content,
+        toc=toc,
+        excerpt=cut_excerpt(" ".join(parser.paragraphs)),
+        word_count=parser.words,
+        place_slugs=list(parser.place_slugs),
+        images=parser.images,
+    )
@@ -0,0 +1,263 @@
+"""
+Opt-in CPU and memory profiling for the scripts.
+
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
+    args = parser.parse_args()
+    telemetry.start_run("populate-collection-locations", profile=args.profile)
+
+    with profiling.phase("fetch"):
+        ...
+
+--profile (or SCRIPT_PROFILE=1, for cron) turns it on. Every phase gets its
+own cProfile profiler and wall clock, the lines whose live allocations grew
+the most while it ran (nested phases included) and the traced-memory peak;
+code outside any phase is booked to "other". Nested phases pause the
+enclosing one's CPU profile and clock. Each phase entry also costs two
+tracemalloc snapshots, which are left out of the reported times. Only the thread that called
+start_run() is CPU-profiled, so profile generators with --workers 1.
+
+At exit, scripts/reports/<script>-<timestamp>.profile/ (or under
+SCRIPT_REPORT_DIR) holds:
+
+  <phase>.pstats      python -m pstats / snakeviz
+  <phase>.collapsed   folded stacks for flamegraph.pl, speedscope, inferno
+  summary.json        wall/CPU time, top functions, top allocators, peak RSS
+
+When profiling is off, phase() hands back one shared no-op context manager.
+"""
+
+from __future__ import annotations
+
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+HELP = "profile CPU and memory per phase into scripts/reports (or set SCRIPT_PROFILE=1)"
+TRACE_FRAMES = 1  # allocations are grouped by line, deeper tracebacks only cost time
+TOP_N = 20
+MAX_STACK_DEPTH = 120
+
+_NULL = nullcontext()
+_NOISE = {tracemalloc.__file__, __file__}
+_session: _Session | None = None
+
+
+def requested(flag: bool = False) -> bool:
+    return flag or os.environ.get("SCRIPT_PROFILE", "") not in ("", "0")
+
+
+def enabled() -> bool:
+    return _session is not None
+
+
+def phase(name: str):
+    """Profile the block as `name`; a no-op unless profiling was started."""
+    if _session is None or threading.get_ident() != _session.thread:
+        return _NULL
+    return _session.run_phase(name)
+
+
+def peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+# ─── Session ─────────────────────────────────────────────────────────────────
+
+class _Phase:
+    def __init__(self, name: str):
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.entries = 0
+        self.wall = 0.0
+        self.traced_peak = 0
+        self.allocations: Counter = Counter()
+
+
+class _Session:
+    def __init__(self, script: str, directory: str):
+        self.script = script
+        self.directory = directory
+        self.thread = threading.get_ident()
+        self.phases: dict[str, _Phase] = {}
+        # [phase, running traced peak, resumed at] for every active phase, innermost last
+        self.stack: list[list] = []
+        self._root = self.run_phase("other")
+        self._finished = False
+
+    @staticmethod
+    def _live_by_line() -> Counter:
+        """Traced bytes currently alive, per allocating line (profiler noise dropped)."""
+        live = Counter()
+        for stat in tracemalloc.take_snapshot().statistics("lineno"):
+            frame = stat.traceback[0]
+            if frame.filename not in _NOISE and not frame.filename.startswith("<frozen importlib"):
+                live[f"{frame.filename}:{frame.lineno}"] = stat.size
+        return live
+
+    @contextmanager
+    def run_phase(self, name: str):
+        current = self.phases.setdefault(name, _Phase(name))
+        outer = self.stack[-1] if self.stack else None
+        if outer:
+            outer[0].profile.disable()
+            outer[0].wall += time.perf_counter() - outer[2]
+            outer[1] = max(outer[1], tracemalloc.get_traced_memory()[1])
+        before = self._live_by_line()
+        tracemalloc.reset_peak()
+        frame = [current, 0, time.perf_counter()]
+        self.stack.append(frame)
+        current.profile.enable()
+        try:
+            yield
+        finally:
+            current.profile.disable()
+            current.wall += time.perf_counter() - frame[2]
+            current.entries += 1
+            self.stack.pop()
+            peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+            current.traced_peak = max(current.traced_peak, peak)
+            current.allocations.update(self._live_by_line() - before)
+            if outer:
+                outer[1] = max(outer[1], peak)
+                tracemalloc.reset_peak()
+                outer[2] = time.perf_counter()
+                outer[0].profile.enable()
+
+    def finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        self._root.__exit__(None, None, None)
+        tracemalloc.stop()
+        self.write()
+
+    # ─── Output ──────────────────────────────────────────────────────────
+
+    def write(self):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(self.directory, f"{self.script}-{stamp}.profile")
+        summary = {
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "peak_rss_bytes": peak_rss_bytes(),
+            "phases": {},
+        }
+        try:
+            os.makedirs(path, exist_ok=True)
+            for name, ph in self.phases.items():
+                try:
+                    stats = pstats.Stats(ph.profile)
+                except TypeError:  # phase never ran any Python code
+                    continue
+                ph.profile.dump_stats(os.path.join(path, f"{name}.pstats"))
+                with open(os.path.join(path, f"{name}.collapsed"), "w", encoding="utf-8") as f:
+                    for stack, micros in sorted(collapsed_stacks(stats).items()):
+                        f.write(f"{stack} {micros}\n")
+                summary["phases"][name] = phase_summary(ph, stats)
+            with open(os.path.join(path, "summary.json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"Could not write profile: {e}")
+            return
+        print_summary(summary)
+        print(f"Profile: {path}")
+
+
+def start(script: str, directory: str):
+    """Start profiling this process; output is written at exit."""
+    global _session
+    if _session is not None:
+        return
+    tracemalloc.start(TRACE_FRAMES)
+    _session = _Session(script, directory)
+    _session._root.__enter__()
+    atexit.register(_session.finish)
+
+
+# ─── Reporting ───────────────────────────────────────────────────────────────
+
+def _label(func: tuple) -> str:
+    filename, line, name = func
+    label = name if not line else f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(";", ",")
+
+
+def collapsed_stacks(stats: pstats.Stats) -> dict[str, int]:
+    """Fold cProfile data into flame-graph stacks ("a;b;c" -> microseconds).
+
+    cProfile keeps caller->callee edges, not whole stacks, so a function's
+    own time is split across its call paths in proportion to each edge's
+    share of its cumulative time.
+    """
+    raw = stats.stats
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller in callers:
+            callees[caller].append(func)
+
+    folded: Counter = Counter()
+
+    def visit(func, path: tuple, on_path: frozenset, share: float):
+        _, _, tottime, cumtime, _ = raw[func]
+        path = path + (_label(func),)
+        micros = int(tottime * share * 1e6)
+        if micros:
+            folded[";".join(path)] += micros
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for callee in callees[func]:
+            if callee in on_path:
+                continue
+            callee_cum = raw[callee][3]
+            edge_cum = raw[callee][4][func][3]
+            child_share = share * edge_cum / callee_cum if callee_cum else 0.0
+            # Skip paths that can't add up to a microsecond
+            if callee_cum * child_share >= 1e-6:
+                visit(callee, path, on_path | {callee}, child_share)
+
+    for func, (_, _, _, _, callers) in raw.items():
+        if not callers:
+            visit(func, (), frozenset({func}), 1.0)
+    return dict(folded)
+
+
+def phase_summary(ph: _Phase, stats: pstats.Stats) -> dict:
+    top = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:TOP_N]
+    return {
+        "entries": ph.entries,
+        "wall_seconds": round(ph.wall, 4),
+        "cpu_seconds": round(stats.total_tt, 4),
+        "traced_peak_bytes": ph.traced_peak,
+        "top_functions": [
+            {"function": _label(func), "calls": nc, "tottime": round(tt, 4), "cumtime": round(ct, 4)}
+            for func, (_, nc, tt, ct, _) in top
+        ],
+        "top_allocations": [
+            {"where": where, "bytes": size} for where, size in ph.allocations.most_common(TOP_N)
+        ],
+    }
+
+
+def print_summary(summary: dict):
+    phases = summary["phases"]
+    print(f"\n{'phase':12s} {'wall s':>8s} {'cpu s':>8s} {'traced MB':>10s}  hottest function")
+    for name, p in sorted(phases.items(), key=lambda item: -item[1]["wall_seconds"]):
+        hottest = p["top_functions"][0]["function"] if p["top_functions"] else "—"
+        print(f"{name:12s} {p['wall_seconds']:8.2f} {p['cpu_seconds']:8.2f} "
+              f"{p['traced_peak_bytes'] / 1e6:10.1f}  {hottest}")
+    if summary["peak_rss_bytes"]:
+        print(f"Peak RSS: {summary['peak_rss_bytes'] / 1e6:.1f} MB")
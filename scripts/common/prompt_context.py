@@ -0,0 +1,175 @@
+"""
+Compact location context for article prompts, and a prompt token estimate.
+
+    context = prompt_context.encode(locations, max_tokens=1500)
+    prompt = build_prompt(topic, context.text)
+    prompt_context.estimate_tokens(prompt)
+
+encode() writes one tab-separated row per location under a single legend
+line, instead of a multi-line Markdown block with Vietnamese labels per
+location:
+
+    Cột: tên | slug (link /place/<slug>) | quận | địa chỉ | rating/số review | giá | nhận xét
+    Giá: $ dưới 50k, $$ 50k-200k, $$$ 200k-500k, $$$$ trên 500k
+    Quận (khi viết dùng tên, không dùng mã): A=Quận 1, B=Bình Thạnh
+    Phở Hòa	pho-hoa	A	260C Pasteur	4.5/1200	$$	Nước dùng đậm đà...
+
+Districts that repeat enough to pay for a legend entry are listed once and
+referenced by a letter code, which cannot be mistaken for a real district
+abbreviation ("Q2" would read as Quận 2) and copied into the article; the
+rest stay spelled out in the rows. The column is dropped when every location
+shares one district, and a district already at the end of the address isn't
+repeated. Review summaries get what is left of the token
+budget, split evenly and cut at a word boundary, rather than a flat 150
+characters; when even the bare rows don't fit, the lowest rows (the SQL
+orders by rating) are dropped, down to MIN_ROWS.
+
+estimate_tokens() is a rough count for Gemini's SentencePiece vocabulary:
+about one token per Vietnamese syllable or short English word, one per
+digit and punctuation mark. It is meant for budgeting, not billing; compare
+it with the prompt_tokens in the .gemini.jsonl exports.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+PRICE_LABELS = {"$": "dưới 50k", "$$": "50k-200k", "$$$": "200k-500k", "$$$$": "trên 500k"}
+COLUMNS = ("tên", "slug (link /place/<slug>)", "quận", "địa chỉ", "rating/số review", "giá", "nhận xét")
+SUMMARY_TOKENS = 48       # per location when there is no budget
+MIN_SUMMARY_TOKENS = 8    # below this a summary says nothing; drop it
+MIN_ROWS = 3              # kept even over budget, or there is nothing to write about
+MIN_CODE_SAVING = 4       # tokens a district code must save, net of its legend entry
+
+_PIECES = re.compile(r"\d|[^\W\d_]+|[^\w\s]")
+_FIELD_BREAKS = re.compile(r"[\t\r\n]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count of `text`."""
+    return sum(1 + (len(p) - 1) // 8 if p[0].isalpha() else 1 for p in _PIECES.findall(text or ""))
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """`text` cut at a word boundary to about max_tokens, with "…" if anything was cut."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    words, used = [], 0
+    for word in text.split():
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens - 1:
+            break
+        words.append(word)
+        used += cost
+    return " ".join(words).rstrip(",.;:") + "…" if words else ""
+
+
+@dataclass
+class Context:
+    text: str
+    tokens: int
+    rows: int
+    dropped: int          # locations left out to fit the budget
+    summaries_cut: int    # review summaries shortened or left out
+
+
+def _field(value) -> str:
+    return _FIELD_BREAKS.sub(" ", str(value or "")).strip()
+
+
+def _address(loc: dict) -> str:
+    address, district = _field(loc.get("address")), _field(loc.get("district"))
+    if district and address.lower().rstrip(" ,.").endswith(district.lower()):
+        address = address.rstrip(" ,.")[: -len(district)].rstrip(" ,")
+    return address
+
+
+def _rating(loc: dict) -> str:
+    if not loc.get("google_rating"):
+        return ""
+    count = loc.get("google_review_count")
+    return f"{loc['google_rating']}/{count}" if count else str(loc["google_rating"])
+
+
+def _code(i: int) -> str:
+    """0 -> "A", 25 -> "Z", 26 -> "AA": never a real abbreviation like Q1 or TĐ."""
+    code = ""
+    i += 1
+    while i:
+        i, rest = divmod(i - 1, 26)
+        code = chr(ord("A") + rest) + code
+    return code
+
+
+def _district_codes(districts: list[str]) -> dict[str, str]:
+    """Codes for the districts (in row order) that repeat enough to be worth one."""
+    codes = {}
+    for district, count in Counter(districts).items():
+        code = _code(len(codes))
+        saving = count * (estimate_tokens(district) - estimate_tokens(code)) - estimate_tokens(f"{code}={district}, ")
+        if saving >= MIN_CODE_SAVING:
+            codes[district] = code
+    return codes
+
+
+def encode(locations: list[dict], max_tokens: int = None) -> Context:
+    """Locations as a legend plus TSV rows, fitted to max_tokens (None = no budget)."""
+    located = [_field(loc.get("district")) for loc in locations if loc.get("district")]
+    districts = list(dict.fromkeys(located))
+    codes = _district_codes(located) if len(districts) > 1 else {}
+
+    columns = [c for c in COLUMNS if len(districts) > 1 or c != "quận"]
+    legend = ["Cột: " + " | ".join(columns)]
+    if any(loc.get("price_range") in PRICE_LABELS for loc in locations):
+        legend.append("Giá: " + ", ".join(f"{code} {label}" for code, label in PRICE_LABELS.items()))
+    if codes:
+        legend.append("Quận (khi viết dùng tên, không dùng mã): " + ", ".join(f"{code}={d}" for d, code in codes.items()))
+    if len(districts) == 1:
+        legend.append(f"Tất cả ở {districts[0]}")
+
+    rows = []
+    for loc in locations:
+        rows.append([
+            _field(loc.get("name")),
+            _field(loc.get("slug")),
+            codes.get(_field(loc.get("district")), _field(loc.get("district"))),
+            _address(loc),
+            _rating(loc),
+            _field(loc.get("price_range")),
+        ])
+    summaries = [_field(loc.get("google_review_summary")) for loc in locations]
+    if len(districts) <= 1:
+        for row in rows:
+            del row[2]
+
+    def render(count: int, summary_tokens: int) -> list[str]:
+        lines = []
+        for row, summary in zip(rows[:count], summaries[:count]):
+            note = trim_to_tokens(summary, summary_tokens) if summary_tokens >= MIN_SUMMARY_TOKENS else ""
+            lines.append("\t".join(row + [note]).rstrip("\t"))
+        return lines
+
+    count = len(rows)
+    if max_tokens is None:
+        lines = render(count, SUMMARY_TOKENS)
+    else:
+        fixed = estimate_tokens("\n".join(legend)) + 1
+        bare = [estimate_tokens("\t".join(row)) + 1 for row in rows]
+        while count > MIN_ROWS and fixed + sum(bare[:count]) > max_tokens:
+            count -= 1
+        with_summary = sum(1 for s in summaries[:count] if s)
+        spare = max_tokens - fixed - sum(bare[:count])
+        share = min(SUMMARY_TOKENS, spare // with_summary - 1) if with_summary and spare > 0 else 0
+        lines = render(count, share)
+        # Word-boundary trimming can land a little over; shrink the share until it fits
+        while share >= MIN_SUMMARY_TOKENS and estimate_tokens("\n".join(legend + lines)) > max_tokens:
+            share -= math.ceil(share / 8)
+            lines = render(count, share)
+
+    text = "\n".join(legend + lines)
+    kept = summaries[:count]
+    cut = sum(1 for s, line in zip(kept, lines) if s and not line.endswith(s)) + sum(1 for s in summaries[count:] if s)
+    return Context(text, estimate_tokens(text), count, len(rows) - count, cut)
@@ -0,0 +1,127 @@
+"""
+Related posts by TF-IDF cosine similarity, computed offline.
+
+Each post becomes one sparse row over a shared vocabulary of
+
+- words of the diacritic-folded title (weight TITLE_WEIGHT), tags
+  (TAG_WEIGHT) and body text,
+- "@<slug>" terms for the locations it links or lists (LOCATION_WEIGHT), so
+  posts about the same places score as related even with different wording,
+
+weighted by sublinear TF × smoothed IDF and L2-normalized. Neighbours come
+from X[block] @ X.T over blocks of BLOCK_ROWS rows: each block's scores are a
+dense BLOCK_ROWS × N array at most, so memory stays flat however many posts
+there are, and the top K of each row is an argpartition.
+
+Requires numpy + scipy (pip install numpy scipy).
+"""
+
+from __future__ import annotations
+
+import html
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+
+from common.text import fold
+
+TITLE_WEIGHT = 3.0
+TAG_WEIGHT = 2.0
+LOCATION_WEIGHT = 2.0
+BLOCK_ROWS = 512
+MIN_WORD_LEN = 2
+
+_TAGS = re.compile(r"<[^>]+>")
+_WORDS = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class Neighbour:
+    post: int       # row index
+    score: float
+
+
+def unique(neighbours: list[Neighbour]) -> list[Neighbour]:
+    """neighbours without repeated posts, keeping each post's first (best, if sorted) entry."""
+    seen = set()
+    return [n for n in neighbours if n.post not in seen and not seen.add(n.post)]
+
+
+def terms(post: dict) -> Counter:
+    """Weighted term counts of a post (title, tags, body words and @location terms)."""
+    counts = Counter()
+
+    def add(text: str, weight: float):
+        for word in _WORDS.findall(fold(text)):
+            if len(word) >= MIN_WORD_LEN:
+                counts[word] += weight
+
+    add(post.get("title") or "", TITLE_WEIGHT)
+    for tag in post.get("tags") or []:
+        add(tag, TAG_WEIGHT)
+    add(html.unescape(_TAGS.sub(" ", post.get("content") or "")), 1.0)
+    locations = set(post.get("place_slugs") or []) | set(post.get("related_location_slugs") or [])
+    for slug in locations:
+        counts[f"@{slug}"] += LOCATION_WEIGHT
+    return counts
+
+
+def tfidf_matrix(posts: list[dict]) -> sparse.csr_matrix:
+    """One L2-normalized TF-IDF row per post."""
+    vocab: dict[str, int] = {}
+    rows, cols, data = [], [], []
+    for row, post in enumerate(posts):
+        for term, count in terms(post).items():
+            rows.append(row)
+            cols.append(vocab.setdefault(term, len(vocab)))
+            data.append(1.0 + math.log(count))
+    counts = sparse.csr_matrix((np.array(data, dtype=np.float32), (rows, cols)), shape=(len(posts), len(vocab)))
+
+    doc_freq = np.bincount(counts.indices, minlength=len(vocab))
+    idf = (np.log((1 + len(posts)) / (1 + doc_freq)) + 1).astype(np.float32)
+    weighted = counts.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return (sparse.diags(1.0 / norms) @ weighted).tocsr()
+
+
+def incoming(matrix: sparse.csr_matrix, new_rows: list[int], k: int,
+             min_score: float = 0.0) -> dict[int, list[Neighbour]]:
+    """For every other post, the (up to k) best of `new_rows` it is similar to, best first.
+
+    Similarity is symmetric, so this is the column view of the new rows'
+    scores: the posts whose neighbour lists the new posts may enter.
+    """
+    new = set(new_rows)
+    candidates: dict[int, list[Neighbour]] = {}
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(new_rows), BLOCK_ROWS):
+        block = new_rows[start:start + BLOCK_ROWS]
+        scores = (matrix[block] @ transposed).toarray()
+        for i, j in zip(*np.nonzero(scores > min_score)):
+            if j not in new:
+                candidates.setdefault(int(j), []).append(Neighbour(block[i], float(scores[i, j])))
+    return {j: sorted(c, key=lambda n: -n.score)[:k] for j, c in candidates.items()}
+
+
+def top_k(matrix: sparse.csr_matrix, rows: list[int], k: int, min_score: float = 0.0) -> dict[int, list[Neighbour]]:
+    """The k most similar other posts of each of `rows`, best first."""
+    result = {}
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(rows), BLOCK_ROWS):
+        block = rows[start:start + BLOCK_ROWS]
+        scores = (matrix[block] @ transposed).toarray()
+        scores[np.arange(len(block)), block] = -1.0   # a post is not its own neighbour
+        count = min(k, scores.shape[1] - 1)
+        if count <= 0:
+            result.update({row: [] for row in block})
+            continue
+        best = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+        for i, row in enumerate(block):
+            order = best[i][np.argsort(-scores[i, best[i]])]
+            result[row] = [Neighbour(int(j), float(scores[i, j])) for j in order if scores[i, j] > min_score]
+    return result
@@ -0,0 +1,18 @@
+"""
+Import the hyphenated scripts in scripts/ (e.g. generate-blog-covers.py) as
+modules, so benchmarks and harnesses can call their functions directly.
+"""
+
+import importlib.util
+import os
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_script(filename: str):
+    """Execute scripts/<filename> as a fresh module and return it (main() is not run)."""
+    name = filename.removesuffix(".py").replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,98 @@
+"""
+Diacritic-insensitive inverted index for client-side site search, split into
+small static shards.
+
+    files = search_index.build(docs)     # {"docs.json": b"...", "ph.json": b"...", ...}
+
+Every document's searchable text is folded with common.text.fold ("Cơm tấm"
+-> "com tam") and split into [a-z0-9] tokens. Each token maps to the sorted
+ids of the documents containing it; ids are assigned in the order `docs` is
+given (most important first), so a posting list read front to back is
+already ranked, and it is stored delta-encoded ([3, 7, 8] -> [3, 4, 1]).
+
+Tokens are sharded by their first SHARD_PREFIX characters: a query token
+"pho" needs only ph.json, and prefix matches ("pho" -> "phong", "phoi")
+are a scan of that one shard's keys. Tokens shorter than SHARD_PREFIX go
+in a shard named after themselves. The frontend reader is
+src/utils/searchIndex.ts; both sides must fold and tokenize the same way.
+
+    docs.json   {"v": 1, "docs": [[kind, slug, title, subtitle], ...]}
+    <prefix>.json  {"v": 1, "tokens": {"pho": [3, 4, 1], ...}}
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from common.text import fold
+
+FORMAT_VERSION = 1
+SHARD_PREFIX = 2
+KINDS = {"location": "l", "collection": "c", "post": "p"}
+
+_TOKENS = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class Doc:
+    kind: str           # "location", "collection" or "post"
+    slug: str
+    title: str
+    subtitle: str = ""
+    text: list[str] = field(default_factory=list)   # searchable besides the title
+
+
+def tokens(text: str) -> list[str]:
+    """Folded search tokens: "Phở Hòa (Q.1)" -> ["pho", "hoa", "q", "1"]."""
+    return _TOKENS.findall(fold(text))
+
+
+def shard_of(token: str) -> str:
+    return token[:SHARD_PREFIX]
+
+
+def _json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def build(docs: list[Doc]) -> dict[str, bytes]:
+    """docs.json plus one <prefix>.json per shard, as bytes ready to upload."""
+    postings: dict[str, list[int]] = defaultdict(list)
+    for doc_id, doc in enumerate(docs):
+        for token in dict.fromkeys(t for text in [doc.title, *doc.text] for t in tokens(text)):
+            postings[token].append(doc_id)
+
+    shards: dict[str, dict[str, list[int]]] = defaultdict(dict)
+    for token in sorted(postings):
+        ids = postings[token]
+        shards[shard_of(token)][token] = [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+
+    files = {"docs.json": _json({"v": FORMAT_VERSION, "docs": [
+        [KINDS[d.kind], d.slug, d.title, d.subtitle] for d in docs
+    ]})}
+    for prefix, entries in shards.items():
+        files[f"{prefix}.json"] = _json({"v": FORMAT_VERSION, "tokens": entries})
+    return files
+
+
+def version(files: dict[str, bytes]) -> str:
+    """Content hash of a build: unchanged data gives the same version (and the same URLs)."""
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(name.encode() + b"\0" + files[name] + b"\0")
+    return digest.hexdigest()[:12]
+
+
+def manifest(files: dict[str, bytes], build_version: str, built_at: str, counts: dict) -> bytes:
+    return _json({
+        "v": FORMAT_VERSION,
+        "version": build_version,
+        "built_at": built_at,
+        "shard_prefix": SHARD_PREFIX,
+        "shards": sorted(name[:-5] for name in files if name != "docs.json"),
+        "counts": counts,
+    })
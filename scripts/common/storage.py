@@ -0,0 +1,139 @@
+"""
+Supabase Storage uploads under content-hashed, immutable keys.
+
+    store = storage.Bucket(SUPABASE_URL, SERVICE_ROLE_KEY, "location-images")
+    url = store.upload_image("blog-covers", slug, image_bytes)
+    # ... point the row at url (one UPDATE), then
+    store.prune_versions("blog-covers", slug, keep=[url, previous_url])
+
+upload_image() names the object <folder>/<slug>-<sha256[:12]>.<ext>, so the
+bytes behind a URL never change and it is served with IMMUTABLE: CDN edges
+and browsers keep it for a year, and a regenerated image is simply a new URL.
+Callers switch the database pointer only after the upload succeeded, and
+prune only after the switch. Pruning keeps the version the row pointed at
+before it: ISR/CDN-cached pages and HTML already in browsers still reference
+that URL, so it must stay servable. Only versions older than the previous one
+are deleted (the same current + previous policy as build-search-index.py).
+
+Images are re-encoded to WebP when Pillow is installed (pip install Pillow)
+and uploaded in their original format otherwise.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import re
+import time
+from typing import Iterable
+
+import requests
+
+from common import telemetry
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+WEBP_QUALITY = 85
+HASH_LENGTH = 12
+LIST_PAGE = 1000
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def to_webp(image_bytes: bytes) -> tuple[bytes, str, str]:
+    """(data, extension, content type): WebP if Pillow can convert it, else the input as-is."""
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            out = io.BytesIO()
+            img.save(out, "WEBP", quality=WEBP_QUALITY, method=6)
+        return out.getvalue(), "webp", "image/webp"
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"  WebP conversion failed ({type(e).__name__}: {e}), uploading the original")
+    if image_bytes.startswith(b"\xff\xd8"):
+        return image_bytes, "jpg", "image/jpeg"
+    return image_bytes, "png", "image/png"
+
+
+class Bucket:
+    def __init__(self, base_url: str, service_key: str, bucket: str, *, retries: int = 3, timeout: float = 60):
+        self.base_url = base_url
+        self.bucket = bucket
+        self.retries = retries
+        self.timeout = timeout
+        self.headers = {"apikey": service_key, "Authorization": f"Bearer {service_key}"}
+
+    def public_url(self, path: str) -> str:
+        return f"{self.base_url}/storage/v1/object/public/{self.bucket}/{path}"
+
+    def path_of(self, url: str) -> str | None:
+        """The object path behind one of this bucket's public URLs, or None for any other URL."""
+        prefix = self.public_url("")
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+    @telemetry.instrument("storage.upload", ok=lambda result: result is not None)
+    def upload(self, path: str, data: bytes, content_type: str, cache_control: str = IMMUTABLE) -> str | None:
+        """Upload (or overwrite) one object. Returns its public URL or None."""
+        headers = {**self.headers, "Content-Type": content_type, "cache-control": cache_control, "x-upsert": "true"}
+        url = f"{self.base_url}/storage/v1/object/{self.bucket}/{path}"
+        for attempt in range(self.retries):
+            try:
+                resp = requests.post(url, headers=headers, data=data, timeout=self.timeout)
+                if resp.status_code in (200, 201):
+                    return self.public_url(path)
+                print(f"  Upload error {path} ({resp.status_code}): {resp.text[:300]}")
+            except requests.RequestException as e:
+                print(f"  Upload exception {path}: {e}")
+            if attempt < self.retries - 1:
+                time.sleep(2 ** attempt)
+        return None
+
+    def upload_image(self, folder: str, slug: str, image_bytes: bytes) -> str | None:
+        """Upload an image as <folder>/<slug>-<hash>.<ext> with IMMUTABLE. Returns its public URL or None."""
+        data, ext, content_type = to_webp(image_bytes)
+        return self.upload(f"{folder}/{slug}-{content_hash(data)}.{ext}", data, content_type)
+
+    @telemetry.instrument("storage.list")
+    def list_folder(self, prefix: str, search: str = "") -> list[str]:
+        """Names under prefix/ (just below it on Supabase, anywhere below on the mock)."""
+        names, offset = [], 0
+        while True:
+            body = {"prefix": prefix, "limit": LIST_PAGE, "offset": offset}
+            if search:
+                body["search"] = search
+            resp = requests.post(f"{self.base_url}/storage/v1/object/list/{self.bucket}",
+                                 headers=self.headers, json=body, timeout=30)
+            if resp.status_code != 200:
+                print(f"  List error {prefix} ({resp.status_code}): {resp.text[:300]}")
+                return names
+            page = resp.json()
+            names += [entry["name"] for entry in page]
+            if len(page) < LIST_PAGE:
+                return names
+            offset += LIST_PAGE
+
+    @telemetry.instrument("storage.delete", ok=bool)
+    def delete(self, paths: list[str]) -> bool:
+        resp = requests.delete(f"{self.base_url}/storage/v1/object/{self.bucket}",
+                               headers=self.headers, json={"prefixes": paths}, timeout=30)
+        if resp.status_code != 200:
+            print(f"  Delete error ({resp.status_code}): {resp.text[:300]}")
+            return False
+        return True
+
+    def prune_versions(self, folder: str, slug: str, keep: Iterable[str | None]) -> int:
+        """Delete the slug's versions (and its old fixed-name <slug>.png) in folder, except `keep`.
+
+        `keep` holds public URLs still in use: the one the database now points
+        at and the one it pointed at before. Returns the number deleted.
+        """
+        version = re.compile(rf"{re.escape(slug)}(-[0-9a-f]{{{HASH_LENGTH}}})?\.(webp|png|jpg)")
+        kept = {self.path_of(url) for url in keep if url}
+        stale = [f"{folder}/{name}" for name in self.list_folder(folder, search=slug)
+                 if version.fullmatch(name) and f"{folder}/{name}" not in kept]
+        if stale and self.delete(stale):
+            return len(stale)
+        return 0
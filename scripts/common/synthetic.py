@@ -0,0 +1,167 @@
+"""
+Synthetic Vietnamese catalogue data for benchmarks and load tests.
+
+Names, districts, prices, ratings, descriptions and category/tag memberships
+follow skewed (Zipf-like) distributions similar to the real catalogue: a few
+dish types (phở, cơm tấm, cà phê...) dominate, most names carry diacritics, and
+a tail of foreign/brand names matches no keyword at all.
+
+Everything is generated lazily from a seeded random.Random, so 1M locations
+can be streamed without holding them in memory, and runs are reproducible.
+"""
+
+from __future__ import annotations
+
+import random
+import uuid
+from itertools import accumulate
+from typing import Iterator
+
+from common.category_keywords import CATEGORY_KEYWORDS, match_category
+
+DISH_PREFIXES = [
+    "Phở", "Cơm tấm", "Cà phê", "Bún bò Huế", "Bánh mì", "Quán", "Trà sữa", "Ốc",
+    "Lẩu", "Hủ tiếu", "Bún riêu", "Chè", "Bánh xèo", "Nhà hàng", "Cơm gà", "Bánh cuốn",
+    "Cháo lòng", "Xôi", "Gỏi cuốn", "Bún chả", "Mì Quảng", "Bánh canh cua", "Nướng",
+    "Bia", "Kem", "Bò kít kít", "Dimsum", "Vịt quay", "Bánh tráng trộn", "Sinh tố",
+]
+FOREIGN_NAMES = [
+    "The Coffee House", "Pizza 4P's", "Sushi Hokkaido", "Tokyo Deli", "Gogi House",
+    "Highlands Coffee", "KFC", "Marou Chocolate", "The Workshop", "Saigon Outcast",
+    "Koh Thai", "Little Bear", "Olivia's Prime", "Secret Garden", "Chill Skybar",
+]
+PROPER_NAMES = [
+    "Hòa", "Thìn", "Lệ", "Ba Ghiền", "Cô Giang", "Bà Năm", "Út Út", "Chú Hỏa", "Hai Lúa",
+    "Thanh Niên", "Ông Tạ", "Dì Ba", "Anh Tư", "Cô Liên", "Chị Thông", "Hoàng", "Phượng",
+    "Đức", "Nguyễn", "Trần", "Lê Văn", "Sáu Nhỏ", "Bảy Hiền", "Tám Lùn", "Mười Khó",
+]
+SUFFIXES = [
+    "", "", "", "", " 24h", " Đêm", " Sài Gòn", " - Chi nhánh 2", " Gia Truyền",
+    " Sân Vườn", " Rooftop", " Khuya", " Bình Dân", " Garden", " & Bar",
+]
+DISTRICTS = [
+    "Quận 1", "Quận 3", "Bình Thạnh", "Quận 5", "Quận 10", "Phú Nhuận", "Quận 7",
+    "Gò Vấp", "Thủ Đức", "Quận 4", "Tân Bình", "Quận 8", "Quận 6", "Quận 11",
+    "Tân Phú", "Bình Tân", "Quận 12", "Nhà Bè", "Bình Chánh", "Hóc Môn", "Củ Chi", "Cần Giờ",
+]
+PRICE_RANGES = ["$", "$$", "$$$", "$$$$", None]
+PRICE_WEIGHTS = [40, 38, 14, 4, 4]
+DESCRIPTION_PHRASES = [
+    "Quán mở cửa đến khuya, đông khách sau 10 giờ tối.",
+    "Món ăn sáng quen thuộc của dân văn phòng.",
+    "Không gian sân vườn xanh mát, view đẹp để sống ảo.",
+    "Giá bình dân, phục vụ nhanh, phù hợp ăn trưa.",
+    "Nước dùng đậm đà, ninh xương nhiều giờ.",
+    "Có máy lạnh, wifi mạnh, thích hợp làm việc.",
+    "Quán lâu đời, hơn 30 năm tuổi trong hẻm nhỏ.",
+    "Phù hợp nhóm bạn, có lẩu và nướng BBQ.",
+    "Không gian lãng mạn cho buổi hẹn hò.",
+    "Nằm trên tầng thượng, nhìn ra sông Sài Gòn.",
+    "Pet-friendly, mang boss theo thoải mái.",
+    "Nhạc sống acoustic mỗi tối cuối tuần.",
+]
+TAG_SLUGS = [
+    "an-sang", "an-trua", "an-toi", "an-khuya", "an-vat", "binh-dan", "sang-trong",
+    "quan-via-he", "co-wifi", "co-may-lanh", "co-phong-rieng", "phu-hop-gia-dinh",
+    "phu-hop-hen-ho", "phu-hop-nhom-ban", "co-giao-hang", "co-cho-dau-xe", "view-dep",
+    "song-ao", "quan-cu-lau-nam", "pet-friendly",
+]
+CATEGORY_SLUGS = [slug for slug, _ in CATEGORY_KEYWORDS]
+
+POST_TITLES = [
+    "Ăn gì ở {district}: Top quán ngon nhất 2026",
+    "{dish} Sài Gòn: Những quán ngon nhất bạn không thể bỏ lỡ",
+    "Top 10 quán {dish_lower} view đẹp cho ngày cuối tuần",
+    "Một ngày ăn sạch {district} với 200k",
+    "Chuyện {dish_lower} và những con hẻm Sài Gòn",
+]
+POST_CATEGORIES = ["guide", "listicle", "culture", "tips", "budget"]
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> list[float]:
+    return list(accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+_DISH_CUM = _zipf_weights(len(DISH_PREFIXES))
+_DISTRICT_CUM = _zipf_weights(len(DISTRICTS), 0.8)
+_TAG_CUM = _zipf_weights(len(TAG_SLUGS), 0.7)
+_PRICE_CUM = list(accumulate(PRICE_WEIGHTS))
+
+
+def location_name(rng: random.Random) -> str:
+    if rng.random() < 0.08:
+        return rng.choice(FOREIGN_NAMES) + rng.choice(SUFFIXES)
+    dish = rng.choices(DISH_PREFIXES, cum_weights=_DISH_CUM)[0]
+    return f"{dish} {rng.choice(PROPER_NAMES)}{rng.choice(SUFFIXES)}"
+
+
+def location_names(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [location_name(rng) for _ in range(n)]
+
+
+def locations(n: int, seed: int = 0) -> Iterator[dict]:
+    """Yield n PostgREST-shaped location rows in ascending id order.
+
+    Each row also carries "category_slugs" and "tag_slugs" lists (the
+    junction-table memberships) so callers can fill stores or fixtures.
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        name = location_name(rng)
+        rating = round(min(5.0, max(1.0, rng.gauss(4.2, 0.4))), 1) if rng.random() < 0.9 else None
+        categories = []
+        matched = match_category(name)
+        if matched and rng.random() < 0.9:
+            categories.append(matched)
+        if rng.random() < 0.1:
+            categories.append(rng.choice(CATEGORY_SLUGS))
+        yield {
+            # Counter in the high bits keeps ids ascending, random low bits keep them unique-looking
+            "id": str(uuid.UUID(int=(i + 1) << 80 | rng.getrandbits(80))),
+            "name": name,
+            "slug": f"loc-{i}",
+            "address": f"{rng.randint(1, 450)}{rng.choice(['', '/12', '/3A', 'B'])} {rng.choice(PROPER_NAMES)}",
+            "district": rng.choices(DISTRICTS, cum_weights=_DISTRICT_CUM)[0],
+            "price_range": rng.choices(PRICE_RANGES, cum_weights=_PRICE_CUM)[0],
+            "google_rating": rating,
+            "average_rating": rating,
+            "google_review_count": int(rng.lognormvariate(4.5, 1.3)) if rating else 0,
+            "google_review_summary": " ".join(rng.sample(DESCRIPTION_PHRASES, 2)),
+            "description": " ".join(rng.sample(DESCRIPTION_PHRASES, rng.randint(1, 3))),
+            "status": "published",
+            "category_slugs": list(dict.fromkeys(categories)),
+            "tag_slugs": list(dict.fromkeys(rng.choices(TAG_SLUGS, cum_weights=_TAG_CUM, k=rng.randint(0, 4)))),
+        }
+
+
+def posts(n: int, seed: int = 0) -> Iterator[dict]:
+    """Yield n blog post stubs (title, slug, category, tags)."""
+    rng = random.Random(seed)
+    for i in range(n):
+        dish = rng.choices(DISH_PREFIXES, cum_weights=_DISH_CUM)[0]
+        district = rng.choices(DISTRICTS, cum_weights=_DISTRICT_CUM)[0]
+        title = rng.choice(POST_TITLES).format(dish=dish, dish_lower=dish.lower(), district=district)
+        yield {
+            "id": str(uuid.UUID(int=(i + 1) << 80 | rng.getrandbits(80))),
+            "title": title,
+            "slug": f"post-{i}",
+            "category": rng.choice(POST_CATEGORIES),
+            "tags": [district.lower(), dish.lower(), "sài gòn"][: rng.randint(1, 3)],
+            "status": "published",
+            "cover_image_url": None,
+        }
+
+
+def article_html(words: int, rng: random.Random, slugs: list[str] = ()) -> str:
+    """HTML article body of roughly `words` words with h2 sections and /place/ links."""
+    vocab = " ".join(DESCRIPTION_PHRASES).split()
+    sections = max(1, len(slugs) or words // 200)
+    per_section = max(10, words // sections)
+    html = []
+    for i in range(sections):
+        html.append(f"<h2>Phần {i + 1}</h2>")
+        body = " ".join(rng.choice(vocab) for _ in range(per_section))
+        link = f' <a href="/place/{slugs[i]}">Xem chi tiết</a>' if slugs else ""
+        html.append(f"<p>{body}{link}</p>")
+    return "\n".join(html)
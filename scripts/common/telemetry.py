@@ -0,0 +1,329 @@
+"""
+Lightweight spans, counters and per-run JSON reports for the scripts.
+
+    from common import telemetry
+
+    @telemetry.instrument("gemini.generate_image", ok=lambda image: image is not None)
+    def generate_image(prompt): ...
+
+    with telemetry.span("match"):
+        ...
+    telemetry.count("posts.skipped")
+
+    def main():
+        telemetry.start_run("generate-blog-covers")
+
+Spans record a latency histogram, error classes (exception names, "failed"
+when the ok predicate rejects the return value, http_429 / http_5xx ...) and
+the bytes sent/received by any `requests` call made while the span is the
+innermost active one on its thread. start_run() turns on that HTTP accounting
+and writes scripts/reports/<script>-<timestamp>.json at exit, plus a short
+stage table on stdout.
+
+  SCRIPT_REPORT_DIR   where reports go (default scripts/reports)
+  SCRIPT_REPORT=0     don't write a report
+
+start_run(script, profile=True) or SCRIPT_PROFILE=1 also turns on the
+per-phase CPU/memory profiler in common/profiling.py.
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60, 120, float("inf"))
+MAX_SAMPLES = 10_000
+
+
+class StageStats:
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples: list[float] = []
+        self.errors: Counter = Counter()
+        self.http_status: Counter = Counter()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def observe(self, seconds: float, error: str | None):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        # Reservoir sample keeps percentiles honest on long runs with bounded memory
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            j = random.randrange(self.count)
+            if j < MAX_SAMPLES:
+                self.samples[j] = seconds
+        if error:
+            self.failures += 1
+            self.errors[error] += 1
+
+    def percentile(self, q: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * q / 100)))]
+
+    def to_dict(self, wall: float) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.failures,
+            "error_classes": dict(self.errors),
+            "total_seconds": round(self.total, 4),
+            "mean_seconds": round(self.total / self.count, 4) if self.count else None,
+            "min_seconds": round(self.min, 4) if self.count else None,
+            "max_seconds": round(self.max, 4),
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95),
+            "p99_seconds": self.percentile(99),
+            "histogram": {("+inf" if b == float("inf") else f"le_{b:g}"): n for b, n in zip(BUCKETS, self.buckets)},
+            "per_minute": round(self.count / wall * 60, 3) if wall else None,
+            "http_requests": self.requests,
+            "http_status": dict(self.http_status),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+
+_lock = threading.RLock()
+_local = threading.local()
+_stages: dict[str, StageStats] = {}
+_counters: Counter = Counter()
+_run: dict = {}
+_sections: dict[str, tuple[Callable[[], object], Callable[[object], None] | None]] = {}
+
+
+def _stage(name: str) -> StageStats:
+    stats = _stages.get(name)
+    if stats is None:
+        with _lock:
+            stats = _stages.setdefault(name, StageStats())
+    return stats
+
+
+def _stack() -> list[str]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_stage() -> str | None:
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+# ─── Public API ──────────────────────────────────────────────────────────────
+
+@contextmanager
+def span(name: str):
+    """Time the block under `name`; exceptions are recorded by class and re-raised."""
+    stack = _stack()
+    stack.append(name)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        stack.pop()
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _stage(name).observe(elapsed, error)
+
+
+def instrument(name: str, ok: Callable[[object], bool] = None):
+    """Decorator: run the function inside span(name); a result failing `ok` counts as an error."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            stack = _stack()
+            stack.append(name)
+            start = time.perf_counter()
+            error = None
+            try:
+                result = fn(*args, **kwargs)
+                if ok is not None and not ok(result):
+                    error = "failed"
+                return result
+            except BaseException as e:
+                error = type(e).__name__
+                raise
+            finally:
+                stack.pop()
+                elapsed = time.perf_counter() - start
+                with _lock:
+                    _stage(name).observe(elapsed, error)
+
+        return wrapper
+
+    return decorate
+
+
+def count(name: str, n: int = 1):
+    with _lock:
+        _counters[name] += n
+
+
+def record_http(status: int | None, sent: int, received: int, error: str | None = None):
+    """Attribute one HTTP exchange to the innermost active span (or "http.unattributed")."""
+    with _lock:
+        stats = _stage(current_stage() or "http.unattributed")
+        stats.requests += 1
+        stats.bytes_sent += sent
+        stats.bytes_received += received
+        if status is not None:
+            stats.http_status[str(status)] += 1
+            if status == 429:
+                stats.errors["http_429"] += 1
+            elif status >= 400:
+                stats.errors[f"http_{status // 100}xx"] += 1
+        if error:
+            stats.errors[error] += 1
+
+
+def _patch_requests():
+    try:
+        import requests
+    except ImportError:
+        return
+    session_cls = requests.sessions.Session
+    if getattr(session_cls.send, "_telemetry", False):
+        return
+    original = session_cls.send
+
+    def send(self, request, **kwargs):
+        body = request.body or b""
+        sent = len(body.encode() if isinstance(body, str) else body)
+        try:
+            response = original(self, request, **kwargs)
+        except requests.RequestException as e:
+            record_http(None, sent, 0, type(e).__name__)
+            raise
+        if kwargs.get("stream"):
+            received = int(response.headers.get("Content-Length") or 0)
+        else:
+            received = len(response.content)
+        record_http(response.status_code, sent, received)
+        return response
+
+    send._telemetry = True
+    session_cls.send = send
+
+
+def report_dir() -> str:
+    return os.environ.get("SCRIPT_REPORT_DIR") or os.path.join(SCRIPTS_DIR, "reports")
+
+
+def run_path(suffix: str) -> str | None:
+    """scripts/reports/<script>-<start timestamp><suffix> for this run, or None before start_run()."""
+    if not _run:
+        return None
+    return os.path.join(report_dir(), f"{_run['script']}-{_run['_stamp']}{suffix}")
+
+
+def run_info() -> dict:
+    """script, argv and started_at of the current run ({} before start_run())."""
+    return {k: v for k, v in _run.items() if not k.startswith("_")}
+
+
+def reporting() -> bool:
+    """True once start_run() has been called and reports aren't disabled."""
+    return bool(_run) and os.environ.get("SCRIPT_REPORT", "1") != "0"
+
+
+def register_section(name: str, build: Callable[[], object], show: Callable[[object], None] = None):
+    """Add build()'s result to the run report under `name`; show(value) prints it after the stage table."""
+    _sections[name] = (build, show)
+
+
+def start_run(script: str, profile: bool = False):
+    """Enable HTTP accounting and write a JSON report for this run at exit."""
+    if _run:
+        return
+    _run.update({
+        "script": script,
+        "argv": sys.argv[1:],
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "_t0": time.perf_counter(),
+        "_stamp": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+    })
+    _patch_requests()
+    if reporting():
+        atexit.register(_write_report)
+    from common import profiling
+    if profiling.requested(profile):
+        profiling.start(script, report_dir())
+
+
+def report() -> dict:
+    """Snapshot of everything recorded so far."""
+    wall = time.perf_counter() - _run["_t0"] if _run else 0.0
+    with _lock:
+        stages = {name: stats.to_dict(wall) for name, stats in sorted(_stages.items())}
+        counters = dict(_counters)
+    return {
+        **run_info(),
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "wall_seconds": round(wall, 3),
+        "stages": stages,
+        "counters": counters,
+        "bytes_sent": sum(s["bytes_sent"] for s in stages.values()),
+        "bytes_received": sum(s["bytes_received"] for s in stages.values()),
+        **{name: build() for name, (build, _) in _sections.items()},
+    }
+
+
+def print_summary(data: dict):
+    stages = data["stages"]
+    if not stages:
+        return
+    print(f"\n{'stage':32s} {'count':>6s} {'err':>5s} {'total s':>9s} {'p50 s':>7s} {'p95 s':>7s} {'MB out':>7s} {'MB in':>7s}")
+    for name, s in sorted(stages.items(), key=lambda item: -item[1]["total_seconds"]):
+        p50 = f"{s['p50_seconds']:.2f}" if s["p50_seconds"] is not None else "—"
+        p95 = f"{s['p95_seconds']:.2f}" if s["p95_seconds"] is not None else "—"
+        print(f"{name:32s} {s['count']:6d} {s['errors']:5d} {s['total_seconds']:9.1f} {p50:>7s} {p95:>7s} "
+              f"{s['bytes_sent'] / 1e6:7.2f} {s['bytes_received'] / 1e6:7.2f}")
+    for name, (_, show) in _sections.items():
+        if show and data.get(name):
+            show(data[name])
+
+
+def _write_report():
+    data = report()
+    path = run_path(".json")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    except OSError as e:
+        print(f"Could not write run report: {e}")
+        return
+    print_summary(data)
+    print(f"Run report: {path}")
@@ -0,0 +1,29 @@
+"""
+Vietnamese text normalization shared by the matching scripts.
+"""
+
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics ("Phở Hòa" -> "pho hoa").
+
+    Same folding as slugify() in generate-blog-articles.py: đ/Đ are mapped by
+    hand because NFD doesn't decompose them.
+    """
+    text = (text or "").lower().replace("đ", "d")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def char_ngrams(text: str, n_min: int = 2, n_max: int = 4) -> list[str]:
+    """Character n-grams of the folded text, padded so word edges count."""
+    padded = f" {fold(text)} "
+    grams = []
+    for n in range(n_min, n_max + 1):
+        grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
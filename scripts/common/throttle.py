@@ -0,0 +1,177 @@
+"""
+AIMD concurrency limiter shared by every worker thread in a run.
+
+    limiter = throttle.limiter("gemini")
+    with limiter.slot() as slot:
+        resp = requests.post(...)
+        if resp.status_code in (429, 503):
+            slot.throttled(throttle.retry_after(resp))
+
+The limiter allows `limit` calls in flight at once. Each success raises the
+limit by 1/limit (about +1 per round of calls, up to max_limit); a 429/503
+halves it, once per congestion episode, so a burst of rejections from calls
+that were already in flight only counts once. A throttle also pauses new
+calls for everyone until Retry-After (or an exponential backoff) has passed.
+Waiters then wake with random jitter instead of stampeding together.
+
+GEMINI_MAX_CONCURRENCY caps the "gemini" limiter (default 8). --workers still
+bounds how many threads can ask for a slot.
+"""
+
+from __future__ import annotations
+
+import email.utils
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 120.0
+WAKE_JITTER = 1.0
+TIME_SCALE = 1.0  # the pipeline benchmark shrinks every wait
+
+
+def retry_after(resp) -> float | None:
+    """Seconds to wait from a Retry-After header or a Google RetryInfo detail, if any."""
+    header = resp.headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(header)
+                return max(0.0, when.timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    try:
+        details = resp.json().get("error", {}).get("details", [])
+    except ValueError:
+        return None
+    for detail in details:
+        delay = str(detail.get("retryDelay", ""))
+        if delay.endswith("s"):
+            try:
+                return max(0.0, float(delay[:-1]))
+            except ValueError:
+                pass
+    return None
+
+
+def backoff(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class Slot:
+    def __init__(self, limiter: AdaptiveLimiter, epoch: int):
+        self.limiter = limiter
+        self.epoch = epoch
+        self.outcome = "ok"
+        self.wait = 0.0
+
+    def throttled(self, retry_after: float | None = None):
+        """The call was rejected for load (429/503); retry_after from the response if given."""
+        self.outcome = "throttled"
+        self.wait = retry_after
+
+    def failed(self):
+        """The call failed for another reason; leaves the limit alone."""
+        self.outcome = "failed"
+
+
+class AdaptiveLimiter:
+    def __init__(self, name: str, max_limit: int = 8, initial: float = 2.0, min_limit: float = 1.0,
+                 decrease: float = 0.5):
+        self.name = name
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease = decrease
+        self.limit = min(float(initial), max_limit)
+        self.time_scale = TIME_SCALE
+        self.in_flight = 0
+        self.epoch = 0              # bumped on every decrease
+        self.paused_until = 0.0     # monotonic
+        self.consecutive_throttles = 0
+        self.stats = {"calls": 0, "throttled": 0, "decreases": 0, "waited_seconds": 0.0,
+                      "min_limit": self.limit, "max_limit": self.limit}
+        self._cond = threading.Condition()
+
+    def acquire(self) -> Slot:
+        start = time.monotonic()
+        with self._cond:
+            jitter = random.uniform(0, WAKE_JITTER) * self.time_scale
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self._cond.wait(self.paused_until - now + jitter)
+                    continue
+                if self.in_flight < max(1, int(self.limit)):
+                    break
+                self._cond.wait()
+            self.in_flight += 1
+            self.stats["calls"] += 1
+            self.stats["waited_seconds"] += time.monotonic() - start
+            return Slot(self, self.epoch)
+
+    def release(self, slot: Slot):
+        with self._cond:
+            self.in_flight -= 1
+            if slot.outcome == "ok":
+                self.consecutive_throttles = 0
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif slot.outcome == "throttled":
+                self.stats["throttled"] += 1
+                self.consecutive_throttles += 1
+                # Only the first rejection of an episode cuts the limit
+                if slot.epoch == self.epoch:
+                    self.epoch += 1
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self.stats["decreases"] += 1
+                wait = slot.wait if slot.wait is not None else backoff(self.consecutive_throttles - 1)
+                self.paused_until = max(self.paused_until, time.monotonic() + wait * self.time_scale)
+            self.stats["min_limit"] = min(self.stats["min_limit"], self.limit)
+            self.stats["max_limit"] = max(self.stats["max_limit"], self.limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        slot = self.acquire()
+        try:
+            yield slot
+        except BaseException:
+            slot.failed()
+            raise
+        finally:
+            self.release(slot)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {**self.stats, "limit": round(self.limit, 2),
+                    "min_limit": round(self.stats["min_limit"], 2), "max_limit": round(self.stats["max_limit"], 2),
+                    "waited_seconds": round(self.stats["waited_seconds"], 2)}
+
+
+_limiters: dict[str, AdaptiveLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def limiter(name: str) -> AdaptiveLimiter:
+    """The process-wide limiter for `name` (created on first use)."""
+    with _registry_lock:
+        if name not in _limiters:
+            max_limit = int(os.environ.get(f"{name.upper()}_MAX_CONCURRENCY", "8"))
+            _limiters[name] = AdaptiveLimiter(name, max_limit=max_limit)
+        return _limiters[name]
+
+
+def reset():
+    """Forget every limiter, so the next call starts again from the initial limit."""
+    with _registry_lock:
+        _limiters.clear()
+
+
+def snapshot() -> dict:
+    with _registry_lock:
+        return {name: lim.snapshot() for name, lim in _limiters.items()}
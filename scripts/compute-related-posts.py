@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Precompute related posts into the post_related table.
+
+Every published post is vectorized by TF-IDF over its folded title, tags,
+body text and linked locations (common/related_posts.py); its top --k
+cosine neighbours are written with set_post_related() (migration
+20261019000005_post_related.sql), so a related-posts widget is one lookup.
+
+By default only posts not computed yet (e.g. just written by
+generate-blog-articles.py) are computed, plus the existing posts whose lists
+one of them now belongs in; their stored neighbours are merged with the new
+candidates instead of being recomputed. Computed posts are recorded in
+post_related_computed (migration 20261019000006_post_related_computed.sql),
+so a post whose neighbours all fall below --min-score, and which therefore
+has no rows, is not picked up again on every run. IDF drifts slowly as posts
+are added, so run with --full now and then to recompute everything.
+
+Usage:
+  export SUPABASE_URL="..." SUPABASE_SERVICE_ROLE_KEY="..."
+  python3 scripts/compute-related-posts.py              # new posts only
+  python3 scripts/compute-related-posts.py --full       # every post
+  python3 scripts/compute-related-posts.py --dry-run    # print neighbours, write nothing
+
+Requires: pip install requests numpy scipy
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+from common import env, profiling, telemetry
+from common.endpoints import supabase_url
+
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+PAGE_SIZE = 500
+WRITE_BATCH = 200   # posts per set_post_related() call
+
+HEADERS_REST = {
+    "apikey": SERVICE_ROLE_KEY,
+    "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
+    "Content-Type": "application/json",
+}
+
+
+@telemetry.instrument("rest.get")
+def rest_get_all(table: str, params: dict) -> list:
+    """Every row of a PostgREST query, PAGE_SIZE at a time."""
+    rows, offset = [], 0
+    while True:
+        page_params = {**params, "limit": PAGE_SIZE, "offset": offset}
+        resp = requests.get(f"{SUPABASE_URL}/rest/v1/{table}", headers=HEADERS_REST, params=page_params, timeout=60)
+        if resp.status_code != 200:
+            print(f"Error fetching {table}: {resp.status_code} {resp.text[:300]}")
+            sys.exit(1)
+        page = resp.json()
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+@telemetry.instrument("rest.rpc", ok=lambda result: result is not None)
+def rest_rpc(function: str, params: dict):
+    resp = requests.post(f"{SUPABASE_URL}/rest/v1/rpc/{function}", headers=HEADERS_REST, json=params, timeout=60)
+    if resp.status_code != 200:
+        print(f"RPC ERROR ({function}): {resp.status_code} {resp.text[:500]}")
+        return None
+    return resp.json()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=6, help="Related posts stored per post")
+    parser.add_argument("--min-score", type=float, default=0.05, help="Ignore neighbours below this cosine")
+    parser.add_argument("--full", action="store_true", help="Recompute every post's list")
+    parser.add_argument("--dry-run", action="store_true", help="Print neighbours, write nothing")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
+    args = parser.parse_args()
+    telemetry.start_run("compute-related-posts", profile=args.profile)
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
+    try:
+        from common import related_posts
+    except ImportError:
+        print("numpy and scipy are required: pip install numpy scipy")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("RELATED POSTS")
+    print("=" * 60)
+
+    posts = rest_get_all("posts", {
+        "select": "id,slug,title,tags,content,place_slugs,related_location_slugs",
+        "status": "eq.published",
+        "order": "id.asc",
+    })
+    if len(posts) < 2:
+        print(f"{len(posts)} published post(s), nothing to relate.")
+        return
+    row_of = {p["id"]: i for i, p in enumerate(posts)}
+
+    # Stored lists, as row indices (dropping neighbours no longer published)
+    stored: dict[int, list] = {}
+    computed: set[int] = set()
+    if not args.full:
+        computed = {row_of[r["post_id"]] for r in rest_get_all("post_related_computed", {
+            "select": "post_id", "order": "post_id.asc",
+        }) if r["post_id"] in row_of}
+        related = rest_get_all("post_related", {
+            "select": "post_id,related_post_id,score", "order": "post_id.asc,rank.asc",
+        })
+        for r in sorted(related, key=lambda r: -r["score"]):
+            if r["post_id"] in row_of and r["related_post_id"] in row_of:
+                stored.setdefault(row_of[r["post_id"]], []).append(
+                    related_posts.Neighbour(row_of[r["related_post_id"]], r["score"]))
+        stored = {row: related_posts.unique(neighbours) for row, neighbours in stored.items()}
+
+    start = time.perf_counter()
+    matrix = related_posts.tfidf_matrix(posts)
+    new_rows = list(range(len(posts))) if args.full else [i for i in range(len(posts)) if i not in computed]
+    lists = related_posts.top_k(matrix, new_rows, args.k, args.min_score)
+
+    # Existing posts a new one now outranks one of their neighbours in
+    merged = 0
+    if not args.full and new_rows:
+        for row, candidates in related_posts.incoming(matrix, new_rows, args.k, args.min_score).items():
+            current = stored.get(row, [])
+            best = related_posts.unique(sorted(current + candidates, key=lambda n: -n.score))[:args.k]
+            if [n.post for n in best] != [n.post for n in current]:
+                lists[row] = best
+                merged += 1
+    print(f"{len(posts)} posts, {matrix.shape[1]:,} terms; computed {len(new_rows)} "
+          f"+ updated {merged} existing list(s) in {time.perf_counter() - start:.2f}s")
+
+    if not lists:
+        print("Nothing to update.")
+        return
+
+    if args.dry_run:
+        for row, neighbours in list(lists.items())[:20]:
+            print(f"\n  {posts[row]['title']}")
+            for n in neighbours:
+                print(f"    {n.score:.2f}  {posts[n.post]['title']}")
+        print(f"\nDry run complete ({len(lists)} lists).")
+        return
+
+    written = 0
+    items = list(lists.items())
+    for start in range(0, len(items), WRITE_BATCH):
+        batch = items[start:start + WRITE_BATCH]
+        rows = [
+            {"post_id": posts[row]["id"], "related_post_id": posts[n.post]["id"], "rank": rank,
+             "score": round(n.score, 4)}
+            for row, neighbours in batch
+            for rank, n in enumerate(neighbours, 1)
+        ]
+        result = rest_rpc("set_post_related", {"p_post_ids": [posts[row]["id"] for row, _ in batch], "p_rows": rows})
+        if result is None:
+            print("set_post_related() failed — are migrations 20261019000005/000006 applied?")
+            sys.exit(1)
+        written += len(rows)
+
+    print(f"Wrote {written} rows for {len(lists)} posts.")
+    print("DONE!")
+
+
+if __name__ == "__main__":
+    main()
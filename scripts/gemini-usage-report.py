@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Aggregate Gemini usage across script runs.
+
+Reads the per-call exports the generators write next to their run reports
+(scripts/reports/*.gemini.jsonl, see common/gemini_usage.py) and totals
+calls, prompt/output tokens, images and latency per script, topic, template
+or model, so the expensive prompts stand out.
+
+Usage:
+  python3 scripts/gemini-usage-report.py
+  python3 scripts/gemini-usage-report.py --group-by script,template --since 2026-10-01
+  python3 scripts/gemini-usage-report.py --group-by topic --script generate-blog-articles --limit 20
+  python3 scripts/gemini-usage-report.py --price gemini-3-flash-preview=0.5,3 --format csv --output usage.csv
+
+--price MODEL=IN,OUT adds an estimated cost column (USD per 1M prompt / output
+tokens; thinking tokens bill as output). Prices aren't built in because they change.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+
+from common.gemini_usage import TOKEN_FIELDS, aggregate
+from common.telemetry import report_dir
+
+DIMENSIONS = ("script", "topic", "template", "model")
+KEY_SEP = " / "
+
+
+def load_rows(paths: list[str], since: str = None, script: str = None) -> list[dict]:
+    rows = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if since and row["ts"] < since:
+                    continue
+                if script and row.get("script") != script:
+                    continue
+                rows.append(row)
+    return rows
+
+
+def parse_prices(specs: list[str]) -> dict[str, tuple[float, float]]:
+    prices = {}
+    for spec in specs or []:
+        model, _, value = spec.partition("=")
+        try:
+            prompt_price, output_price = (float(v) for v in value.split(","))
+        except ValueError:
+            raise SystemExit(f"ERROR: --price expects MODEL=IN,OUT, got {spec!r}")
+        prices[model] = (prompt_price, output_price)
+    return prices
+
+
+def cost(row: dict, prices: dict) -> float | None:
+    if row["model"] not in prices:
+        return None
+    prompt_price, output_price = prices[row["model"]]
+    output = row["output_tokens"] + row.get("thoughts_tokens", 0)
+    return (row["prompt_tokens"] * prompt_price + output * output_price) / 1e6
+
+
+def print_table(groups: dict, dims: list[str], rows: list[dict], limit: int, priced: bool):
+    limit = limit or len(groups)
+    label = " / ".join(dims)
+    print(f"\n{label[:40]:40s} {'calls':>6s} {'prompt tok':>11s} {'output tok':>11s} {'images':>7s} "
+          f"{'avg prompt':>11s} {'avg s':>7s}" + (f" {'cost $':>9s}" if priced else ""))
+    for name, g in list(groups.items())[:limit]:
+        line = (f"{name[:40]:40s} {g['calls']:6d} {g['prompt_tokens']:11,d} {g['output_tokens']:11,d} "
+                f"{g['images']:7d} {g['mean_prompt_tokens']:11,.0f} {g['mean_latency_seconds']:7.2f}")
+        if priced:
+            line += f" {g['cost_usd']:9.4f}" if g["cost_usd"] is not None else f" {'—':>9s}"
+        print(line)
+    if len(groups) > limit:
+        print(f"  ... {len(groups) - limit} more (--limit 0 for all)")
+    totals = aggregate(rows, lambda row: "all")["all"]
+    print(f"\nTotal: {totals['prompt_tokens']:,} prompt + {totals['output_tokens']:,} output tokens, "
+          f"{totals['images']} images, {totals['latency_seconds']:.0f}s in Gemini")
+
+
+def write_csv(out, groups: dict, dims: list[str], priced: bool):
+    fields = ["calls", "images", *TOKEN_FIELDS, "mean_prompt_tokens", "latency_seconds", "mean_latency_seconds"]
+    fields += ["cost_usd"] if priced else []
+    writer = csv.writer(out)
+    writer.writerow([*dims, *fields])
+    for key, g in groups.items():
+        writer.writerow([*key.split(KEY_SEP), *(g.get(f) for f in fields)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate Gemini usage exports")
+    parser.add_argument("paths", nargs="*", help="*.gemini.jsonl files (default: all under the reports dir)")
+    parser.add_argument("--group-by", default="script,template", help=f"comma-separated: {', '.join(DIMENSIONS)}")
+    parser.add_argument("--since", help="only calls on/after this ISO date")
+    parser.add_argument("--script", help="only calls made by this script")
+    parser.add_argument("--price", action="append", metavar="MODEL=IN,OUT", help="USD per 1M prompt/output tokens")
+    parser.add_argument("--limit", type=int, default=30, help="rows in the table (0 = all)")
+    parser.add_argument("--format", choices=("table", "csv", "json"), default="table")
+    parser.add_argument("--output", help="write csv/json here instead of stdout")
+    args = parser.parse_args()
+
+    dims = [d.strip() for d in args.group_by.split(",") if d.strip()]
+    unknown = [d for d in dims if d not in DIMENSIONS]
+    if unknown or not dims:
+        print(f"ERROR: --group-by takes {', '.join(DIMENSIONS)}")
+        sys.exit(1)
+
+    paths = args.paths or sorted(glob.glob(os.path.join(report_dir(), "*.gemini.jsonl")))
+    rows = load_rows(paths, args.since, args.script)
+    if not rows:
+        print(f"No Gemini usage found ({len(paths)} file(s) read)")
+        return
+
+    def key(row: dict) -> str:
+        return KEY_SEP.join(str(row.get(d) or "—") for d in dims)
+
+    prices = parse_prices(args.price)
+    groups = aggregate(rows, key)
+    if prices:
+        for g in groups.values():
+            g["cost_usd"] = None
+        for row in rows:
+            c = cost(row, prices)
+            if c is not None:
+                g = groups[key(row)]
+                g["cost_usd"] = round((g["cost_usd"] or 0.0) + c, 6)
+
+    if args.format == "table":
+        print(f"{len(rows)} Gemini calls from {len(paths)} file(s)")
+        print_table(groups, dims, rows, args.limit, bool(prices))
+        return
+
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            write_csv(out, groups, dims, bool(prices))
+        else:
+            json.dump({"group_by": dims, "calls": len(rows), "groups": groups}, out, indent=2, ensure_ascii=False)
+            out.write("\n")
+    finally:
+        if args.output:
+            out.close()
+            print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
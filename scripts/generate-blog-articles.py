@@ -11,30 +11,39 @@ Usage:
   python3 scripts/generate-blog-articles.py
   python3 scripts/generate-blog-articles.py --dry-run     # preview topics only
   python3 scripts/generate-blog-articles.py --limit 5     # generate only 5 articles
+  python3 scripts/generate-blog-articles.py --workers 3   # 3 articles in parallel
+  python3 scripts/generate-blog-articles.py --max-prompt-tokens 2500   # tighter location context
+  python3 scripts/generate-blog-articles.py --mode sections # outline, then sections in parallel
+  python3 scripts/generate-blog-articles.py --with-cover    # cover image in the same pass
 """
 
 import argparse
 import json
-import math
 import os
 import re
-import sys
 import time
 import unicodedata
 import requests
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
 from typing import Optional
 
+from common import (env, gemini, gemini_usage, model_cascade, near_duplicates, post_html, profiling, prompt_context,
+                    telemetry)
+from common.endpoints import mgmt_query_url, supabase_url
+from common.pipeline import run_items
+from common.script_loader import load_script
+
 # ─── Config ──────────────────────────────────────────────────────────────────
 
-SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
 SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
 PROJECT_REF = os.environ.get("SUPABASE_PROJECT_REF", "wsysphytctpgbzoatuzw")
-MGMT_API_URL = f"https://api.supabase.com/v1/projects/{PROJECT_REF}/database/query"
+MGMT_API_URL = mgmt_query_url(PROJECT_REF)
 MGMT_TOKEN = os.environ.get("SUPABASE_ACCESS_TOKEN", "")
 
-GEMINI_MODEL = "gemini-3-flash-preview"
-GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
+GEMINI_MODELS = model_cascade.cascade("text")
+MAX_PROMPT_TOKENS = 4000  # estimated; location context is trimmed to fit
 
 SITE_URL = "https://www.toilanguoisaigon.com"
 
@@ -63,6 +72,7 @@ def slugify(text: str) -> str:
     return text
 
 
+@telemetry.instrument("sql.query", ok=lambda result: result is not None)
 def run_sql(sql: str):
     """Execute SQL via Supabase Management API with retry."""
     if not MGMT_TOKEN:
@@ -81,6 +91,7 @@ def run_sql(sql: str):
     return None
 
 
+@telemetry.instrument("rest.get")
 def rest_get(table: str, params: dict = None):
     url = f"{SUPABASE_URL}/rest/v1/{table}"
     resp = requests.get(url, headers=HEADERS_REST, params=params or {})
@@ -90,6 +101,7 @@ def rest_get(table: str, params: dict = None):
     return resp.json()
 
 
+@telemetry.instrument("rest.post", ok=lambda result: result is not None)
 def rest_post(table: str, data):
     url = f"{SUPABASE_URL}/rest/v1/{table}"
     resp = requests.post(url, headers=HEADERS_REST, json=data)
@@ -99,80 +111,43 @@ def rest_post(table: str, data):
     return resp.json()
 
 
-def call_gemini(prompt: str, max_tokens: int = 8192, temperature: float = 0.8) -> Optional[str]:
-    """Call Gemini API and return text response. Uses 300s timeout for thinking models."""
+@telemetry.instrument("gemini.call", ok=lambda result: result is not None)
+def call_gemini(prompt: str, max_tokens: int = 8192, temperature: float = 0.8,
+                instructions: str = None, json_output: bool = False) -> Optional[str]:
+    """Call Gemini API and return text response. Uses 300s timeout for thinking models.
+
+    `instructions` go in the system instruction, which is context-cached
+    across calls that share it once it is large enough (see
+    common/context_cache.py). json_output asks for application/json.
+    """
     body = {
-        "contents": [{"parts": [{"text": prompt}]}],
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
         "generationConfig": {
             "temperature": temperature,
             "maxOutputTokens": max_tokens,
         },
     }
-    for attempt in range(5):
-        try:
-            resp = requests.post(GEMINI_URL, json=body, timeout=300)
-            if resp.status_code == 429:
-                wait = 30 * (attempt + 1)
-                print(f"  Rate limited, waiting {wait}s...")
-                time.sleep(wait)
-                continue
-            if resp.status_code in (500, 503):
-                wait = 15 * (attempt + 1)
-                print(f"  Server error ({resp.status_code}), retrying in {wait}s...")
-                time.sleep(wait)
-                continue
-            if resp.status_code != 200:
-                print(f"  Gemini error ({resp.status_code}): {resp.text[:300]}")
-                return None
-            data = resp.json()
-            text = data["candidates"][0]["content"]["parts"][0]["text"]
-            return text.strip()
-        except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout):
-            wait = 10 * (attempt + 1)
-            print(f"  Timeout (attempt {attempt+1}/5), retrying in {wait}s...")
-            time.sleep(wait)
-        except (requests.exceptions.ConnectionError, ConnectionResetError):
-            wait = 15 * (attempt + 1)
-            print(f"  Connection error (attempt {attempt+1}/5), retrying in {wait}s...")
-            time.sleep(wait)
-        except Exception as e:
-            print(f"  Gemini exception: {e}")
-            time.sleep(10)
-    return None
+    if json_output:
+        body["generationConfig"]["responseMimeType"] = "application/json"
+    prefix = {"systemInstruction": {"parts": [{"text": instructions}]}} if instructions else None
+    data = gemini.generate(GEMINI_MODELS, body, prefix=prefix, timeout=300)
+    if data is None:
+        return None
+    try:
+        return data["candidates"][0]["content"]["parts"][0]["text"].strip()
+    except (KeyError, IndexError) as e:
+        print(f"  Gemini response has no text ({e!r}): {json.dumps(data)[:300]}")
+        return None
 
 
 def estimate_reading_time(html: str) -> int:
     """Estimate reading time in minutes from HTML content."""
-    text = re.sub(r"<[^>]+>", " ", html)
-    words = len(text.split())
-    return max(3, math.ceil(words / 200))
-
-
-def format_location_data(locations: list) -> str:
-    """Format location data for Gemini prompt context."""
-    lines = []
-    for loc in locations:
-        parts = [f"- **{loc['name']}**"]
-        if loc.get("address"):
-            parts.append(f"  Địa chỉ: {loc['address']}, {loc.get('district', '')}")
-        if loc.get("google_rating"):
-            parts.append(f"  Rating: {loc['google_rating']}/5 ({loc.get('google_review_count', 0)} reviews)")
-        if loc.get("price_range"):
-            pr = {"$": "dưới 50k", "$$": "50k-200k", "$$$": "200k-500k", "$$$$": "trên 500k"}.get(loc["price_range"], loc["price_range"])
-            parts.append(f"  Giá: {pr}")
-        if loc.get("google_review_summary"):
-            summary = loc["google_review_summary"][:150]
-            parts.append(f"  Nhận xét: \"{summary}\"")
-        if loc.get("slug"):
-            parts.append(f"  Link: /place/{loc['slug']}")
-        lines.append("\n".join(parts))
-    return "\n\n".join(lines)
-
-
-def get_existing_slugs() -> set:
-    """Get slugs of already-published posts."""
-    posts = rest_get("posts", {"select": "slug", "status": "eq.published"})
-    return {p["slug"] for p in posts} if posts else set()
+    return post_html.analyze(html).reading_time
+
+
+def get_existing_posts() -> list:
+    """Already-published posts, with what the near-duplicate check compares."""
+    return rest_get("posts", {"select": "slug,title,tags,related_location_slugs", "status": "eq.published"}) or []
 
 
 # ─── Topic Definitions ───────────────────────────────────────────────────────
@@ -557,15 +532,10 @@ def build_topics() -> list:
 
 # ─── Prompt Templates ────────────────────────────────────────────────────────
 
-def build_prompt(topic: dict, locations_text: str) -> str:
-    """Build the Gemini prompt for article generation."""
-    title = topic["title"]
-    template = topic.get("prompt_template", "guide")
-
-    base_instructions = f"""Bạn là một food blogger chuyên nghiệp tại Sài Gòn, viết cho website toilanguoisaigon.com.
-Hãy viết một bài blog chi tiết, hấp dẫn, SEO-friendly bằng tiếng Việt có dấu đầy đủ.
-
-TIÊU ĐỀ: {title}
+def build_instructions(template: str) -> str:
+    """The instructions shared by every article of a template, sent as the system instruction."""
+    base_instructions = """Bạn là một food blogger chuyên nghiệp tại Sài Gòn, viết cho website toilanguoisaigon.com.
+Hãy viết một bài blog chi tiết, hấp dẫn, SEO-friendly bằng tiếng Việt có dấu đầy đủ, theo tiêu đề và dữ liệu quán ăn được gửi kèm.
 
 YÊU CẦU CHUNG:
 - Viết bằng HTML (dùng h2, h3, p, ul, li, strong, em). KHÔNG dùng h1 (đã có ở layout).
@@ -575,10 +545,7 @@ YÊU CẦU CHUNG:
 - Cuối bài có phần "Lời kết" tóm tắt.
 - KHÔNG viết lời chào, lời mở đầu dạng "Xin chào các bạn". Bắt đầu thẳng vào nội dung.
 - KHÔNG thêm tiêu đề h1 ở đầu bài (tiêu đề đã có sẵn).
-- Tuyệt đối KHÔNG bịa ra quán ăn — chỉ sử dụng data có sẵn bên dưới.
-
-DỮ LIỆU THỰC TẾ VỀ CÁC QUÁN ĂN:
-{locations_text}
+- Tuyệt đối KHÔNG bịa ra quán ăn — chỉ sử dụng dữ liệu quán ăn được gửi kèm.
 """
 
     if template == "district_guide":
@@ -640,6 +607,344 @@ CHỈ TRẢ VỀ NỘI DUNG HTML CỦA BÀI VIẾT. KHÔNG thêm ```html``` hay
     return base_instructions
 
 
+def build_prompt(topic: dict, locations_text: str) -> str:
+    """The per-article part of the prompt: title and location data."""
+    return f"""TIÊU ĐỀ: {topic["title"]}
+
+DỮ LIỆU THỰC TẾ VỀ CÁC QUÁN ĂN (mỗi dòng một quán, các cột cách nhau bằng tab):
+{locations_text}
+"""
+
+
+# ─── Sectioned Generation ────────────────────────────────────────────────────
+# --mode sections: a short JSON outline first, then every section written by
+# its own call in parallel, validated and stitched back together. A failed
+# section is retried on its own instead of redoing the whole article.
+
+OUTLINE_MAX_SECTIONS = 8
+SECTION_ATTEMPTS = 2
+ARTICLE_WORDS = 2000
+VOID_TAGS = {"br", "hr", "img", "wbr"}
+PLACE_LINK = re.compile(r'<a\s[^>]*href="/place/([a-z0-9-]+)"[^>]*>(.*?)</a>', re.S)
+
+
+def clean_html(content: str) -> str:
+    """Strip the markdown wrapper Gemini sometimes adds around HTML."""
+    content = re.sub(r"^```html\s*", "", content)
+    return re.sub(r"\s*```$", "", content)
+
+
+def build_outline_prompt(topic: dict, locations_text: str) -> str:
+    return build_prompt(topic, locations_text) + f"""
+Ở BƯỚC NÀY KHÔNG VIẾT BÀI. Chỉ lập dàn ý cho phần thân bài (không gồm mở đầu và "Lời kết"):
+tối đa {OUTLINE_MAX_SECTIONS} section h2, mỗi quán thuộc đúng một section, theo hướng dẫn của template.
+Trả về JSON: {{"sections": [{{"heading": "tiêu đề h2", "slugs": ["slug quán", ...], "brief": "1 câu: section này viết gì"}}]}}
+"""
+
+
+def parse_outline(text: str, slugs: list) -> Optional[list]:
+    """Sections from the outline JSON, with unknown or repeated slugs dropped; None if unusable."""
+    try:
+        data = json.loads(clean_html(text or "").strip().removeprefix("```json").strip())
+        raw = data["sections"] if isinstance(data, dict) else data
+    except (ValueError, KeyError, TypeError):
+        return None
+    known, seen, sections = set(slugs), set(), []
+    for item in raw[:OUTLINE_MAX_SECTIONS] if isinstance(raw, list) else []:
+        if not isinstance(item, dict) or not str(item.get("heading", "")).strip():
+            continue
+        picked = [s for s in item.get("slugs") or [] if s in known and s not in seen]
+        seen.update(picked)
+        sections.append({"heading": str(item["heading"]).strip(), "slugs": picked,
+                         "brief": str(item.get("brief", "")).strip()})
+    if not sections:
+        return None
+    # Locations the outline forgot still belong in the article
+    sections[-1]["slugs"] += [s for s in slugs if s not in seen]
+    return sections
+
+
+def build_section_prompt(topic: dict, outline: list[dict], part: dict, locations_text: str, words: int) -> str:
+    headings = "\n".join(f"- {s['heading']}" for s in outline)
+    if part["kind"] == "intro":
+        task = "đoạn mở đầu (1-2 paragraph, KHÔNG có heading)"
+    elif part["kind"] == "conclusion":
+        task = 'phần "Lời kết" (bắt đầu bằng <h2>Lời kết</h2>)'
+    else:
+        task = f"section <h2>{part['heading']}</h2> ({part['brief']})" if part["brief"] else f"section <h2>{part['heading']}</h2>"
+    data = f"\nDỮ LIỆU CÁC QUÁN TRONG SECTION NÀY (mỗi dòng một quán, các cột cách nhau bằng tab):\n{locations_text}\n" if locations_text else ""
+    return f"""TIÊU ĐỀ: {topic["title"]}
+
+DÀN Ý PHẦN THÂN BÀI:
+{headings}
+
+Ở BƯỚC NÀY CHỈ VIẾT {task}, khoảng {words} từ.
+Chỉ trả về HTML của phần này, không lặp lại các phần khác.
+{data}"""
+
+
+class _TagBalance(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.stack, self.problems = [], []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "h1":
+            self.problems.append("has <h1>")
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag not in self.stack:
+            self.problems.append(f"stray </{tag}>")
+            return
+        while self.stack and self.stack.pop() != tag:
+            pass
+
+
+def validate_section(html: str, part: dict, known_slugs: set) -> tuple[str, Optional[str]]:
+    """(fixed html, problem or None): links to unknown places become plain text, headings are enforced."""
+    html = PLACE_LINK.sub(lambda m: m.group(0) if m.group(1) in known_slugs else m.group(2), html.strip())
+    if part["kind"] != "intro" and not html.lower().startswith("<h2"):
+        html = f"<h2>{part['heading']}</h2>\n{html}"
+    if len(re.sub(r"<[^>]+>", " ", html).split()) < 20:
+        return html, "too short"
+    checker = _TagBalance()
+    checker.feed(html)
+    checker.close()
+    problems = checker.problems + [f"unclosed <{t}>" for t in checker.stack if t not in ("p", "li")]
+    return html, ", ".join(problems) or None
+
+
+def write_sections(topic: dict, slug: str, template: str, instructions: str, locations: list,
+                   context: prompt_context.Context, workers: int) -> Optional[str]:
+    """Outline, then sections in parallel; the stitched HTML, or None to write it in one call instead."""
+    rows = {loc["slug"]: loc for loc in locations[:context.rows] if loc.get("slug")}
+    with gemini_usage.context(topic=slug, template=f"{template}/outline"):
+        text = call_gemini(build_outline_prompt(topic, context.text), max_tokens=2048, temperature=0.4,
+                           instructions=instructions, json_output=True)
+    outline = parse_outline(text, list(rows))
+    if not outline:
+        print("  Outline unusable, writing the article in one call")
+        return None
+
+    parts = [{"kind": "intro", "heading": "", "brief": "", "slugs": []}]
+    parts += [{"kind": "section", **s} for s in outline]
+    parts.append({"kind": "conclusion", "heading": "Lời kết", "brief": "", "slugs": []})
+    words = max(150, ARTICLE_WORDS // len(parts))
+    print(f"  Outline: {len(outline)} sections, writing {len(parts)} parts with {workers} workers...")
+
+    def write(part: dict) -> Optional[str]:
+        section_text = prompt_context.encode([rows[s] for s in part["slugs"]]).text if part["slugs"] else ""
+        prompt = build_section_prompt(topic, outline, part, section_text, words)
+        for attempt in range(SECTION_ATTEMPTS):
+            # Worker threads don't inherit the caller's usage tags
+            with gemini_usage.context(topic=slug, template=f"{template}/section"):
+                html = call_gemini(prompt, max_tokens=2048, temperature=0.8, instructions=instructions)
+            if not html:
+                continue
+            html, problem = validate_section(clean_html(html), part, set(rows))
+            if not problem:
+                return html
+            print(f"  Section \"{part['heading'] or 'mở đầu'}\" rejected ({problem}), "
+                  f"attempt {attempt + 1}/{SECTION_ATTEMPTS}")
+        return None
+
+    sections = run_items(parts, write, workers=workers)
+    failed = [p["heading"] or "mở đầu" for p, html in zip(parts, sections) if html is None]
+    if failed:
+        print(f"  Sections failed ({', '.join(failed)}), writing the article in one call")
+        return None
+    return "\n".join(sections)
+
+
+# ─── Speculative Cover ───────────────────────────────────────────────────────
+# The cover scene only needs the title, category and tags, so with --with-cover
+# it is generated and uploaded while the article is being written and lands in
+# the same insert. Covers are stored under content-hashed names, so if the
+# article then fails the uploaded cover is deleted rather than left orphaned.
+
+_covers = None
+
+
+def covers():
+    """generate-blog-covers.py, loaded once for its scene, image and upload helpers."""
+    global _covers
+    if _covers is None:
+        _covers = load_script("generate-blog-covers.py")
+    return _covers
+
+
+@telemetry.instrument("item.speculative_cover", ok=lambda result: result is not None)
+def make_cover(topic: dict, slug: str) -> Optional[str]:
+    """Generate and upload the cover for a topic. Returns its public URL or None."""
+    blog_covers = covers()
+    scene = blog_covers.get_scene_for_post(topic["title"], topic.get("category", ""), topic.get("tags", []))
+    with gemini_usage.context(topic=slug, template=blog_covers.SCENE_KEYS.get(scene, "fallback")):
+        image_bytes = blog_covers.generate_image(blog_covers.STYLE_PREFIX + scene)
+    if not image_bytes:
+        return None
+    return blog_covers.STORE.upload_image(blog_covers.FOLDER, slug, image_bytes)
+
+
+def cover_result(future: Future) -> Optional[str]:
+    """The speculative cover's URL, waiting for it if the article finished first."""
+    try:
+        url = future.result()
+    except Exception as e:
+        print(f"  Cover failed ({type(e).__name__}: {e}), publishing without it")
+        return None
+    if not url:
+        print("  Cover failed, publishing without it (generate-blog-covers.py will pick it up)")
+    return url
+
+
+def discard_cover(future: Future):
+    """Cancel a cover the article no longer needs, or delete it once it is uploaded."""
+    if future.cancel():
+        return
+
+    def delete(done: Future):
+        url = None if done.exception() else done.result()
+        if url:
+            store = covers().STORE
+            store.delete([store.path_of(url)])
+
+    future.add_done_callback(delete)
+
+
+# ─── Generation ──────────────────────────────────────────────────────────────
+
+@telemetry.instrument("item.generate_article", ok=bool)
+def generate_article(topic: dict, progress: str = "", max_prompt_tokens: int = MAX_PROMPT_TOKENS,
+                     mode: str = "single", section_workers: int = 4,
+                     cover_pool: ThreadPoolExecutor = None, duplicates: near_duplicates.PostIndex = None,
+                     on_duplicate: str = "skip") -> Optional[bool]:
+    """Fetch locations, write the article with Gemini and publish it.
+
+    Returns success, or None when the topic was skipped as a near-duplicate
+    of a post in `duplicates`. With a cover_pool, the cover is generated on
+    it alongside the article.
+    """
+    slug = slugify(topic["title"])
+    print(f"\n{'─' * 50}")
+    print(f"[{progress}] {topic['title']}")
+    print(f"  Slug: {slug}")
+
+    # 1. Fetch location data
+    print("  Fetching locations...")
+    locations = run_sql(topic["location_sql"])
+    if not locations:
+        print("  WARNING: No locations found, using fallback query")
+        locations = run_sql("""
+            SELECT name, slug, address, district, google_rating, google_review_count, price_range, google_review_summary
+            FROM locations WHERE status = 'published'
+            ORDER BY COALESCE(google_rating, 0) DESC LIMIT 10
+        """)
+
+    if not locations:
+        print("  ERROR: Cannot fetch locations, skipping")
+        return False
+
+    print(f"  Found {len(locations)} locations")
+    template = topic.get("prompt_template", "guide")
+    instructions = build_instructions(template)
+    budget = None
+    if max_prompt_tokens:
+        fixed = prompt_context.estimate_tokens(instructions) + prompt_context.estimate_tokens(build_prompt(topic, ""))
+        budget = max_prompt_tokens - fixed
+    context = prompt_context.encode(locations, budget)
+    location_slugs = [loc["slug"] for loc in locations[:context.rows] if loc.get("slug")]
+
+    match = duplicates.similar_locations(location_slugs[:15]) if duplicates is not None else None
+    if match:
+        print(f"  Near-duplicate: {match} ({match.title})")
+        if on_duplicate == "skip":
+            print("  Skipping")
+            return None
+    cover = cover_pool.submit(make_cover, topic, slug) if cover_pool else None
+
+    # 2. Generate article
+    prompt = build_prompt(topic, context.text)
+    trimmed = f", {context.dropped} dropped" if context.dropped else ""
+    tokens = prompt_context.estimate_tokens(instructions) + prompt_context.estimate_tokens(prompt)
+    print(f"  Generating article via Gemini (~{tokens:,} prompt tokens, {context.rows} locations{trimmed})...")
+    content = None
+    if mode == "sections":
+        content = write_sections(topic, slug, template, instructions, locations, context, section_workers)
+    if content is None:
+        with gemini_usage.context(topic=slug, template=template):
+            content = call_gemini(prompt, max_tokens=8192, temperature=0.8, instructions=instructions)
+
+    if not content:
+        print("  ERROR: Gemini returned empty, skipping")
+        if cover:
+            discard_cover(cover)
+        return False
+
+    # One pass over the final HTML: heading anchors, TOC, word count, links, images
+    analysis = post_html.analyze(clean_html(content))
+    content = analysis.content
+    reading_time = analysis.reading_time
+    print(f"  Generated: {analysis.word_count} words, ~{reading_time} min read, "
+          f"{len(analysis.toc)} headings, {len(analysis.place_slugs)} place links")
+
+    # 3. Generate excerpt
+    excerpt_prompt = f"""Viết đoạn tóm tắt (excerpt) hấp dẫn, tối đa 50 từ, bằng tiếng Việt có dấu, cho bài blog có tiêu đề: "{topic['title']}". 
+Mục tiêu: khiến người đọc tò mò và muốn click. Chỉ trả về nội dung tóm tắt, không thêm gì khác."""
+    with gemini_usage.context(topic=slug, template="excerpt"):
+        excerpt = call_gemini(excerpt_prompt, max_tokens=256, temperature=0.7)
+    if not excerpt:
+        excerpt = analysis.excerpt or topic["meta_description"][:200]
+    # Strip quotes if Gemini wrapped it
+    excerpt = excerpt.strip('"').strip("'").strip()
+
+    # 4. Build meta_title
+    meta_title = f"{topic['title']} | Tôi Là Người Sài Gòn"
+    if len(meta_title) > 60:
+        meta_title = topic["title"][:57] + "..."
+
+    # 5. Insert into DB
+    post_data = {
+        "title": topic["title"],
+        "slug": slug,
+        "content": content,
+        "excerpt": excerpt[:300],
+        "status": "published",
+        "category": topic["category"],
+        "tags": topic["tags"],
+        "meta_title": meta_title,
+        "meta_description": topic["meta_description"][:160],
+        "reading_time": reading_time,
+        "published_at": "now()",
+        "related_location_slugs": location_slugs[:15],
+        "toc": analysis.toc,
+        "word_count": analysis.word_count,
+        "place_slugs": analysis.place_slugs,
+        "images": analysis.images,
+    }
+    if cover:
+        if not cover.done():
+            print("  Waiting for cover...")
+        cover_url = cover_result(cover)
+        if cover_url:
+            post_data["cover_image_url"] = cover_url
+            print(f"  Cover: {cover_url}")
+    result = rest_post("posts", post_data)
+
+    if result:
+        print(f"  ✅ Published: /blog/{slug}")
+        if duplicates is not None:
+            duplicates.add(slug, topic["title"], topic["tags"], location_slugs[:15])
+        return True
+    print(f"  ❌ Failed to insert")
+    if cover:
+        discard_cover(cover)
+    return False
+
+
 # ─── Main ────────────────────────────────────────────────────────────────────
 
 def main():
@@ -647,17 +952,26 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Only print topics, don't generate")
     parser.add_argument("--limit", type=int, default=0, help="Limit number of articles to generate")
     parser.add_argument("--offset", type=int, default=0, help="Skip first N topics")
+    parser.add_argument("--workers", type=int, default=1, help="Articles generated in parallel")
+    parser.add_argument("--delay", type=float, default=2.0, help="Pause after each article, per worker (seconds)")
+    parser.add_argument("--max-prompt-tokens", type=int, default=MAX_PROMPT_TOKENS,
+                        help="Estimated prompt budget; location data is trimmed to fit (0 = no limit)")
+    parser.add_argument("--mode", choices=("single", "sections"), default="single",
+                        help="sections: outline first, then write the sections in parallel")
+    parser.add_argument("--section-workers", type=int, default=4, help="Sections written in parallel per article")
+    parser.add_argument("--with-cover", action="store_true",
+                        help="Generate the cover image alongside each article and publish it in the same insert")
+    parser.add_argument("--duplicates", choices=("skip", "flag", "off"), default="skip",
+                        help="What to do with topics too close to a published post (title and tags, or locations)")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
     args = parser.parse_args()
+    telemetry.start_run("generate-blog-articles", profile=args.profile)
 
-    if not SUPABASE_URL or not SERVICE_ROLE_KEY:
-        print("ERROR: Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY")
-        sys.exit(1)
-    if not GEMINI_API_KEY and not args.dry_run:
-        print("ERROR: Missing GEMINI_API_KEY")
-        sys.exit(1)
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", *([] if args.dry_run else ["GEMINI_API_KEY"]))
 
     topics = build_topics()
-    existing_slugs = get_existing_slugs()
+    existing_posts = get_existing_posts()
+    existing_slugs = {p["slug"] for p in existing_posts}
 
     # Filter out already-published topics
     pending = []
@@ -667,14 +981,33 @@ def main():
             continue
         pending.append(t)
 
+    # Near-duplicates of published posts, before any Gemini call
+    duplicates = near_duplicates.PostIndex(existing_posts) if args.duplicates != "off" else None
+    near = 0
+    if duplicates is not None:
+        start = time.perf_counter()
+        kept = []
+        for t in pending:
+            match = duplicates.similar_topic(t["title"], t["tags"])
+            if match:
+                near += 1
+                print(f"  Near-duplicate: {t['title']} — {match}")
+                if args.duplicates == "skip":
+                    continue
+            kept.append(t)
+        pending = kept
+        print(f"  Checked against {len(duplicates)} posts in {(time.perf_counter() - start) * 1000:.0f} ms: "
+              f"{near} near-duplicate{'s' if near != 1 else ''}" + (" skipped" if args.duplicates == "skip" else ""))
+
     if args.offset > 0:
         pending = pending[args.offset:]
     if args.limit > 0:
         pending = pending[:args.limit]
 
     print(f"{'=' * 60}")
-    print(f"Blog Article Generator — {GEMINI_MODEL}")
-    print(f"Total topics: {len(topics)} | Already published: {len(topics) - len(pending)} | To generate: {len(pending)}")
+    print(f"Blog Article Generator — {GEMINI_MODELS}")
+    published = len(topics) - len(pending) - (near if args.duplicates == "skip" else 0)
+    print(f"Total topics: {len(topics)} | Already published: {published} | To generate: {len(pending)}")
     print(f"{'=' * 60}")
 
     if args.dry_run:
@@ -685,96 +1018,25 @@ def main():
         print(f"\nDry run complete. Use without --dry-run to generate.")
         return
 
-    success_count = 0
-    fail_count = 0
-
-    for i, topic in enumerate(pending, 1):
-        slug = slugify(topic["title"])
-        print(f"\n{'─' * 50}")
-        print(f"[{i}/{len(pending)}] {topic['title']}")
-        print(f"  Slug: {slug}")
-
-        # 1. Fetch location data
-        print("  Fetching locations...")
-        locations = run_sql(topic["location_sql"])
-        if not locations:
-            print("  WARNING: No locations found, using fallback query")
-            locations = run_sql("""
-                SELECT name, slug, address, district, google_rating, google_review_count, price_range, google_review_summary
-                FROM locations WHERE status = 'published'
-                ORDER BY COALESCE(google_rating, 0) DESC LIMIT 10
-            """)
-
-        if not locations:
-            print("  ERROR: Cannot fetch locations, skipping")
-            fail_count += 1
-            continue
-
-        print(f"  Found {len(locations)} locations")
-        locations_text = format_location_data(locations)
-        location_slugs = [loc["slug"] for loc in locations if loc.get("slug")]
-
-        # 2. Generate article
-        print("  Generating article via Gemini...")
-        prompt = build_prompt(topic, locations_text)
-        content = call_gemini(prompt, max_tokens=8192, temperature=0.8)
-
-        if not content:
-            print("  ERROR: Gemini returned empty, skipping")
-            fail_count += 1
-            continue
-
-        # Clean up any markdown wrappers
-        content = re.sub(r"^```html\s*", "", content)
-        content = re.sub(r"\s*```$", "", content)
-
-        reading_time = estimate_reading_time(content)
-        word_count = len(re.sub(r"<[^>]+>", " ", content).split())
-        print(f"  Generated: {word_count} words, ~{reading_time} min read")
-
-        # 3. Generate excerpt
-        excerpt_prompt = f"""Viết đoạn tóm tắt (excerpt) hấp dẫn, tối đa 50 từ, bằng tiếng Việt có dấu, cho bài blog có tiêu đề: "{topic['title']}". 
-Mục tiêu: khiến người đọc tò mò và muốn click. Chỉ trả về nội dung tóm tắt, không thêm gì khác."""
-        excerpt = call_gemini(excerpt_prompt, max_tokens=256, temperature=0.7)
-        if not excerpt:
-            excerpt = topic["meta_description"][:200]
-        # Strip quotes if Gemini wrapped it
-        excerpt = excerpt.strip('"').strip("'").strip()
-
-        # 4. Build meta_title
-        meta_title = f"{topic['title']} | Tôi Là Người Sài Gòn"
-        if len(meta_title) > 60:
-            meta_title = topic["title"][:57] + "..."
-
-        # 5. Insert into DB
-        post_data = {
-            "title": topic["title"],
-            "slug": slug,
-            "content": content,
-            "excerpt": excerpt[:300],
-            "status": "published",
-            "category": topic["category"],
-            "tags": topic["tags"],
-            "meta_title": meta_title,
-            "meta_description": topic["meta_description"][:160],
-            "reading_time": reading_time,
-            "published_at": "now()",
-            "related_location_slugs": location_slugs[:15],
-        }
-        result = rest_post("posts", post_data)
-
-        if result:
-            print(f"  ✅ Published: /blog/{slug}")
-            success_count += 1
-        else:
-            print(f"  ❌ Failed to insert")
-            fail_count += 1
-
-        # Rate limit: 2s between articles
-        time.sleep(2)
+    cover_pool = ThreadPoolExecutor(max_workers=args.workers) if args.with_cover else None
+    try:
+        outcomes = run_items(
+            list(enumerate(pending, 1)),
+            lambda item: generate_article(item[1], f"{item[0]}/{len(pending)}", args.max_prompt_tokens,
+                                          args.mode, args.section_workers, cover_pool, duplicates,
+                                          args.duplicates),
+            workers=args.workers,
+            delay=args.delay,
+        )
+    finally:
+        if cover_pool:
+            cover_pool.shutdown(wait=True)
+    success_count = outcomes.count(True)
+    skipped_count = outcomes.count(None)
+    fail_count = len(outcomes) - success_count - skipped_count
 
     print(f"\n{'=' * 60}")
-    print(f"Done! Generated: {success_count} | Failed: {fail_count}")
+    print(f"Done! Generated: {success_count} | Skipped as near-duplicates: {skipped_count} | Failed: {fail_count}")
     print(f"{'=' * 60}")
 
 
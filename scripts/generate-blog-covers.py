@@ -2,12 +2,17 @@
 """
 Generate watercolor cover images for blog posts that lack them.
 Uses Gemini image generation, uploads to Supabase Storage, and updates the posts table.
+Covers are stored as blog-covers/<slug>-<content hash>.webp (.png without
+Pillow installed) with an immutable cache header (common/storage.py); the
+post is pointed at the new object only after the upload. Posts are only picked while they have no cover, so other
+versions of the slug are unreferenced leftovers and are deleted after that.
 
 Usage:
   export GEMINI_API_KEY="..." SUPABASE_URL="..." SUPABASE_SERVICE_ROLE_KEY="..." SUPABASE_ACCESS_TOKEN="..."
   python3 scripts/generate-blog-covers.py
   python3 scripts/generate-blog-covers.py --dry-run
   python3 scripts/generate-blog-covers.py --limit 5
+  python3 scripts/generate-blog-covers.py --workers 4 --delay 1
 """
 
 import argparse
@@ -16,17 +21,20 @@ import json
 import os
 import re
 import requests
-import sys
-import time
 
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
-SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
+from common import env, gemini, gemini_usage, model_cascade, profiling, storage, telemetry
+from common.endpoints import mgmt_query_url, supabase_url
+from common.pipeline import run_items
+
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
 SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
-MGMT_API_URL = f"https://api.supabase.com/v1/projects/{os.environ.get('SUPABASE_PROJECT_REF', 'wsysphytctpgbzoatuzw')}/database/query"
+MGMT_API_URL = mgmt_query_url()
 MGMT_TOKEN = os.environ.get("SUPABASE_ACCESS_TOKEN", "")
 
+GEMINI_MODELS = model_cascade.cascade("image")
 BUCKET = "location-images"
 FOLDER = "blog-covers"
+STORE = storage.Bucket(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, BUCKET)
 
 STYLE_PREFIX = (
     "A beautiful warm watercolor illustration in the style of Vietnamese tranh ve (traditional art), "
@@ -94,6 +102,9 @@ SCENE_TEMPLATES = {
     "giao hàng": "A food delivery scene in Saigon - rider on motorbike with food bags, smartphone showing food app, various restaurant logos.",
 }
 
+# Scene text -> first keyword that maps to it; labels Gemini usage by template
+SCENE_KEYS = {scene: keyword for keyword, scene in reversed(list(SCENE_TEMPLATES.items()))}
+
 
 def get_scene_for_post(title: str, category: str, tags: list) -> str:
     """Pick the best scene description based on title/category/tags.
@@ -120,93 +131,55 @@ def get_scene_for_post(title: str, category: str, tags: list) -> str:
     return "A vibrant Saigon street food scene with diverse dishes, bustling sidewalk, warm evening light, motorbikes, and happy diners."
 
 
+@telemetry.instrument("gemini.generate_image", ok=lambda result: result is not None)
 def generate_image(prompt: str):
     """Call Gemini to generate an image. Returns PNG bytes or None."""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-image:generateContent?key={GEMINI_API_KEY}"
-    
     payload = {
         "contents": [{"parts": [{"text": prompt}]}],
         "generationConfig": {"responseModalities": ["TEXT", "IMAGE"]},
     }
-    
-    for attempt in range(3):
-        try:
-            resp = requests.post(url, json=payload, timeout=120)
-            if resp.status_code == 429:
-                wait = 30 * (attempt + 1)
-                print(f"  Rate limited, waiting {wait}s...")
-                time.sleep(wait)
-                continue
-            if resp.status_code != 200:
-                print(f"  Gemini error ({resp.status_code}): {resp.text[:300]}")
-                if attempt < 2:
-                    time.sleep(10)
-                    continue
-                return None
-            
-            data = resp.json()
-            candidates = data.get("candidates", [])
-            if not candidates:
-                print("  No candidates in response")
-                return None
-            
-            parts = candidates[0].get("content", {}).get("parts", [])
-            for part in parts:
-                if "inlineData" in part:
-                    mime = part["inlineData"].get("mimeType", "")
-                    if mime.startswith("image/"):
-                        return base64.b64decode(part["inlineData"]["data"])
-            
-            print("  No image found in response")
-            return None
-        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-            wait = 15 * (attempt + 1)
-            print(f"  Connection error (attempt {attempt+1}/3), retrying in {wait}s...")
-            time.sleep(wait)
-        except Exception as e:
-            print(f"  Exception: {e}")
-            time.sleep(10)
-    return None
 
+    data = gemini.generate(GEMINI_MODELS, payload, timeout=120)
+    if data is None:
+        return None
 
-def upload_to_supabase(image_bytes: bytes, path: str):
-    """Upload image to Supabase Storage. Returns public URL or None."""
-    upload_url = f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{path}"
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
-        "Content-Type": "image/png",
-        "x-upsert": "true",
-    }
-    for attempt in range(3):
-        try:
-            resp = requests.post(upload_url, headers=headers, data=image_bytes, timeout=60)
-            if resp.status_code in (200, 201):
-                return f"{SUPABASE_URL}/storage/v1/object/public/{BUCKET}/{path}"
-            print(f"  Upload error ({resp.status_code}): {resp.text[:300]}")
-            if attempt < 2:
-                time.sleep(5)
-        except Exception as e:
-            print(f"  Upload exception: {e}")
-            time.sleep(5)
+    candidates = data.get("candidates", [])
+    if not candidates:
+        print("  No candidates in response")
+        return None
+
+    parts = candidates[0].get("content", {}).get("parts", [])
+    for part in parts:
+        if "inlineData" in part:
+            mime = part["inlineData"].get("mimeType", "")
+            if mime.startswith("image/"):
+                return base64.b64decode(part["inlineData"]["data"])
+
+    print("  No image found in response")
     return None
 
 
+@telemetry.instrument("rest.update_post_cover", ok=bool)
 def update_post_cover(post_id: str, cover_url: str) -> bool:
-    """Update the post's cover_image_url in the database."""
+    """Point the post at its new cover, unless another run gave it one meanwhile."""
     headers = {
         "apikey": SUPABASE_SERVICE_ROLE_KEY,
         "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
         "Content-Type": "application/json",
-        "Prefer": "return=minimal",
+        "Prefer": "return=representation",
     }
-    url = f"{SUPABASE_URL}/rest/v1/posts?id=eq.{post_id}"
+    url = f"{SUPABASE_URL}/rest/v1/posts?id=eq.{post_id}&cover_image_url=is.null&select=id"
     resp = requests.patch(url, headers=headers, json={"cover_image_url": cover_url}, timeout=15)
-    if resp.status_code not in (200, 204):
+    if resp.status_code != 200:
         print(f"  DB update error ({resp.status_code}): {resp.text[:300]}")
         return False
+    if not resp.json():
+        print("  Post already has a cover")
+        return False
     return True
 
 
+@telemetry.instrument("rest.get_posts")
 def get_posts_without_covers() -> list:
     """Fetch published posts that have no cover_image_url."""
     headers = {
@@ -228,22 +201,62 @@ def get_posts_without_covers() -> list:
     return resp.json()
 
 
+@telemetry.instrument("item.cover_post", ok=bool)
+def cover_post(post: dict, progress: str = "") -> bool:
+    """Generate, upload and attach the cover for one post. Returns success."""
+    print(f"\n{'─' * 50}")
+    print(f"[{progress}] {post['title']}")
+    print(f"  Slug: {post['slug']}")
+
+    scene = get_scene_for_post(post["title"], post.get("category", ""), post.get("tags", []))
+    prompt = STYLE_PREFIX + scene
+    print(f"  Scene: {scene[:80]}...")
+
+    # Generate
+    print("  Generating cover image...")
+    with gemini_usage.context(topic=post["slug"], template=SCENE_KEYS.get(scene, "fallback")):
+        image_bytes = generate_image(prompt)
+    if not image_bytes:
+        print("  FAILED to generate image")
+        return False
+
+    print(f"  Generated {len(image_bytes):,} bytes")
+
+    # Upload under a content-hashed name, then point the post at it
+    print(f"  Uploading to {FOLDER}/...")
+    public_url = STORE.upload_image(FOLDER, post["slug"], image_bytes)
+    if not public_url:
+        print("  FAILED to upload")
+        return False
+
+    if update_post_cover(post["id"], public_url):
+        # The post had no cover before, so there is no previous version to keep
+        STORE.prune_versions(FOLDER, post["slug"], keep=[public_url])
+        print(f"  ✅ Done: {public_url}")
+        return True
+    STORE.delete([STORE.path_of(public_url)])
+    print("  FAILED to update DB")
+    return False
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="Posts processed in parallel")
+    parser.add_argument("--delay", type=float, default=3.0, help="Pause after each post, per worker (seconds)")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
     args = parser.parse_args()
+    telemetry.start_run("generate-blog-covers", profile=args.profile)
 
-    if not GEMINI_API_KEY or not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
-        print("ERROR: Missing required env vars")
-        sys.exit(1)
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", *([] if args.dry_run else ["GEMINI_API_KEY"]))
 
     posts = get_posts_without_covers()
     if args.limit > 0:
         posts = posts[:args.limit]
 
     print(f"{'=' * 60}")
-    print(f"Blog Cover Generator — gemini-2.5-flash-image")
+    print(f"Blog Cover Generator — {GEMINI_MODELS}")
     print(f"Posts without covers: {len(posts)}")
     print(f"{'=' * 60}")
 
@@ -259,49 +272,14 @@ def main():
         print(f"\nDry run complete.")
         return
 
-    success = 0
-    fail = 0
-
-    for i, post in enumerate(posts, 1):
-        print(f"\n{'─' * 50}")
-        print(f"[{i}/{len(posts)}] {post['title']}")
-        print(f"  Slug: {post['slug']}")
-
-        scene = get_scene_for_post(post["title"], post.get("category", ""), post.get("tags", []))
-        prompt = STYLE_PREFIX + scene
-        print(f"  Scene: {scene[:80]}...")
-
-        # Generate
-        print("  Generating cover image...")
-        image_bytes = generate_image(prompt)
-        if not image_bytes:
-            print("  FAILED to generate image")
-            fail += 1
-            time.sleep(3)
-            continue
-
-        print(f"  Generated {len(image_bytes):,} bytes")
-
-        # Upload
-        storage_path = f"{FOLDER}/{post['slug']}.png"
-        print(f"  Uploading to {storage_path}...")
-        public_url = upload_to_supabase(image_bytes, storage_path)
-        if not public_url:
-            print("  FAILED to upload")
-            fail += 1
-            time.sleep(3)
-            continue
-
-        # Update DB
-        if update_post_cover(post["id"], public_url):
-            print(f"  ✅ Done: {public_url}")
-            success += 1
-        else:
-            print("  FAILED to update DB")
-            fail += 1
-
-        # Rate limit
-        time.sleep(3)
+    outcomes = run_items(
+        list(enumerate(posts, 1)),
+        lambda item: cover_post(item[1], f"{item[0]}/{len(posts)}"),
+        workers=args.workers,
+        delay=args.delay,
+    )
+    success = sum(outcomes)
+    fail = len(outcomes) - success
 
     print(f"\n{'=' * 60}")
     print(f"Done! Success: {success} | Failed: {fail}")
@@ -29,16 +29,15 @@ import requests
 import sys
 import time
 
-try:
-    from PIL import Image
-except ImportError:
-    print("Pillow is required: pip install Pillow")
-    sys.exit(1)
+from common import env, gemini, gemini_usage, model_cascade, profiling, telemetry
+from common.endpoints import supabase_url
 
-GEMINI_API_KEY = os.environ["GEMINI_API_KEY"]
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_SERVICE_ROLE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
 
+Image = None  # Pillow; main() imports it only when actually generating
+
+GEMINI_MODELS = model_cascade.cascade("image")
 BUCKET = "location-images"
 FOLDER = "brand"
 
@@ -124,21 +123,17 @@ ASSETS = {
 }
 
 
+@telemetry.instrument("gemini.generate_image", ok=lambda result: result is not None)
 def generate_image(prompt: str) -> bytes | None:
     """Call Gemini 2.5 Flash to generate an image. Returns PNG bytes or None."""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-image:generateContent?key={GEMINI_API_KEY}"
-
     payload = {
         "contents": [{"parts": [{"text": prompt}]}],
         "generationConfig": {"responseModalities": ["TEXT", "IMAGE"]},
     }
 
-    resp = requests.post(url, json=payload, timeout=120)
-    if resp.status_code != 200:
-        print(f"  ERROR: Gemini API returned {resp.status_code}: {resp.text[:500]}")
+    data = gemini.generate(GEMINI_MODELS, payload, timeout=120)
+    if data is None:
         return None
-
-    data = resp.json()
     candidates = data.get("candidates", [])
     if not candidates:
         print("  ERROR: No candidates in response")
@@ -156,6 +151,7 @@ def generate_image(prompt: str) -> bytes | None:
     return None
 
 
+@telemetry.instrument("storage.upload", ok=lambda result: result is not None)
 def upload_to_supabase(image_bytes: bytes, path: str) -> str | None:
     """Upload image to Supabase Storage. Returns public URL or None."""
     upload_url = f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{path}"
@@ -216,7 +212,9 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Only print prompts, don't generate")
     parser.add_argument("--asset", type=str, help="Generate only this asset slug (logo, og, mystery-card)")
     parser.add_argument("--save-local", action="store_true", help="Also save images locally")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
     args = parser.parse_args()
+    telemetry.start_run("generate-brand-assets", profile=args.profile)
 
     assets_to_gen = ASSETS
     if args.asset:
@@ -226,6 +224,15 @@ def main():
             sys.exit(1)
         assets_to_gen = {args.asset: ASSETS[args.asset]}
 
+    if not args.dry_run:
+        env.require("GEMINI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
+        global Image
+        try:
+            from PIL import Image
+        except ImportError:
+            print("Pillow is required: pip install Pillow")
+            sys.exit(1)
+
     local_dir = "scripts/brand-assets-output"
     os.makedirs(local_dir, exist_ok=True)
 
@@ -243,7 +250,8 @@ def main():
 
         # Generate
         print("  Generating image with Gemini...")
-        image_bytes = generate_image(info["prompt"])
+        with gemini_usage.context(topic=slug, template=slug):
+            image_bytes = generate_image(info["prompt"])
         if not image_bytes:
             print(f"  FAILED to generate {slug}")
             errors.append(slug)
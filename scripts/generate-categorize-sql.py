@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Render CATEGORY_KEYWORDS / EXPANDED_KEYWORDS (common/category_keywords.py) into
+the migration that defines the category_keywords table and the
+categorize_locations() RPC, so keyword matching runs inside Postgres instead of
+downloading every location.
+
+Usage:
+  python3 scripts/generate-categorize-sql.py            # rewrite the migration
+  python3 scripts/generate-categorize-sql.py --check    # exit 1 if it is stale
+  python3 scripts/generate-categorize-sql.py --stdout   # print instead of writing
+  python3 scripts/generate-categorize-sql.py --apply    # also run it on the project
+
+The migration is idempotent, so --apply is how keyword edits reach an existing
+database. --apply needs SUPABASE_ACCESS_TOKEN (and SUPABASE_PROJECT_REF);
+everything else runs offline.
+"""
+
+import argparse
+import os
+import sys
+
+from common.category_keywords import CATEGORY_KEYWORDS, EXPANDED_KEYWORDS
+
+MIGRATION_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "supabase", "migrations", "20261019000001_categorize_locations.sql",
+)
+
+# EXPANDED_KEYWORDS only ever applies after CATEGORY_KEYWORDS found nothing,
+# so its priorities start above any seed group index.
+EXPANDED_PRIORITY_OFFSET = 1000
+
+HEADER = """\
+-- ============================================================
+-- Migration: Server-side location categorization
+--   category_keywords table + categorize_locations() RPC
+-- Date: 2026-10-19
+--
+-- GENERATED by scripts/generate-categorize-sql.py from
+-- scripts/common/category_keywords.py — edit the keyword tables
+-- there and regenerate, do not edit this file by hand.
+-- ============================================================
+
+-- 1. Extensions (Supabase keeps them in the "extensions" schema)
+CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA extensions;
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+-- unaccent() is only STABLE; this wrapper pins the dictionary so it can be
+-- used in index expressions and generated columns.
+CREATE OR REPLACE FUNCTION f_unaccent(text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE PARALLEL SAFE STRICT
+AS $$
+  SELECT extensions.unaccent('extensions.unaccent'::regdictionary, $1)
+$$;
+
+-- 2. Keyword table. Lower priority wins, exactly like the first-match loop
+--    in match_category() / match_expanded().
+CREATE TABLE IF NOT EXISTS category_keywords (
+  id serial PRIMARY KEY,
+  source text NOT NULL CHECK (source IN ('seed', 'expanded')),
+  priority integer NOT NULL,
+  category_slug text NOT NULL,
+  keyword text NOT NULL,
+  pattern text GENERATED ALWAYS AS (
+    '%' || replace(replace(replace(keyword, '\\', '\\\\'), '%', '\\%'), '_', '\\_') || '%'
+  ) STORED,
+  folded_pattern text GENERATED ALWAYS AS (
+    f_unaccent('%' || replace(replace(replace(keyword, '\\', '\\\\'), '%', '\\%'), '_', '\\_') || '%')
+  ) STORED
+);
+
+CREATE INDEX IF NOT EXISTS idx_category_keywords_source_priority
+  ON category_keywords (source, priority);
+
+-- Only the service role (this migration, categorize_locations()) touches it:
+-- RLS with no policy hides it from anon/authenticated through PostgREST
+ALTER TABLE category_keywords ENABLE ROW LEVEL SECURITY;
+
+-- 3. Trigram indexes so each keyword's LIKE '%kw%' is an index scan
+CREATE INDEX IF NOT EXISTS idx_locations_name_lower_trgm
+  ON locations USING gin (lower(name) extensions.gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_locations_name_folded_trgm
+  ON locations USING gin (f_unaccent(lower(name)) extensions.gin_trgm_ops);
+
+-- 4. Keywords
+TRUNCATE category_keywords RESTART IDENTITY;
+"""
+
+FOOTER = """
+-- 5. categorize_locations(): assign the best-priority keyword match to every
+--    published location in one statement.
+--
+--    p_sources               which keyword tables to use ('seed', 'expanded')
+--    p_only_uncategorized    skip locations that already have a category
+--                            (incremental mode for new imports)
+--    p_fold_unaccented_names also match names typed without diacritics
+--                            ("Com Tam Ba Ghien") against folded keywords
+--    p_location_ids          restrict to these locations (NULL = all)
+--
+--    Returns one row per category with the number of rows inserted.
+DROP FUNCTION IF EXISTS categorize_locations(text[], boolean, boolean, uuid[]);
+
+CREATE OR REPLACE FUNCTION categorize_locations(
+  p_sources text[] DEFAULT ARRAY['seed', 'expanded'],
+  p_only_uncategorized boolean DEFAULT true,
+  p_fold_unaccented_names boolean DEFAULT false,
+  p_location_ids uuid[] DEFAULT NULL
+)
+RETURNS TABLE (category_slug text, assigned integer)
+LANGUAGE sql
+AS $$
+  WITH matches AS (
+    SELECT l.id AS location_id, k.priority, k.category_slug
+    FROM category_keywords k
+    JOIN locations l ON lower(l.name) LIKE k.pattern
+    WHERE k.source = ANY (p_sources)
+      AND l.status = 'published'
+      AND (p_location_ids IS NULL OR l.id = ANY (p_location_ids))
+      AND (NOT p_only_uncategorized
+           OR NOT EXISTS (SELECT 1 FROM location_categories lc WHERE lc.location_id = l.id))
+    UNION ALL
+    SELECT l.id AS location_id, k.priority, k.category_slug
+    FROM category_keywords k
+    JOIN locations l ON f_unaccent(lower(l.name)) LIKE k.folded_pattern
+    WHERE p_fold_unaccented_names
+      AND k.source = ANY (p_sources)
+      AND l.status = 'published'
+      AND lower(l.name) = f_unaccent(lower(l.name))
+      AND (p_location_ids IS NULL OR l.id = ANY (p_location_ids))
+      AND (NOT p_only_uncategorized
+           OR NOT EXISTS (SELECT 1 FROM location_categories lc WHERE lc.location_id = l.id))
+  ),
+  best AS (
+    SELECT DISTINCT ON (location_id) location_id, category_slug
+    FROM matches
+    ORDER BY location_id, priority
+  ),
+  inserted AS (
+    INSERT INTO location_categories (location_id, category_id)
+    SELECT b.location_id, c.id
+    FROM best b
+    JOIN categories c ON c.slug = b.category_slug
+    ON CONFLICT DO NOTHING
+    RETURNING category_id
+  )
+  SELECT c.slug, COUNT(*)::integer
+  FROM inserted i
+  JOIN categories c ON c.id = i.category_id
+  GROUP BY c.slug
+  ORDER BY 2 DESC;
+$$;
+
+-- Writes location_categories: only the service role (scripts) may call it.
+REVOKE EXECUTE ON FUNCTION categorize_locations(text[], boolean, boolean, uuid[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION categorize_locations(text[], boolean, boolean, uuid[]) TO service_role;
+"""
+
+
+def sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def keyword_rows():
+    """Yield (source, priority, category_slug, keyword) in match order."""
+    for priority, (cat_slug, keywords) in enumerate(CATEGORY_KEYWORDS):
+        for kw in keywords:
+            yield "seed", priority, cat_slug, kw
+    for priority, (cat_slug, keywords) in enumerate(EXPANDED_KEYWORDS, start=EXPANDED_PRIORITY_OFFSET):
+        for kw in keywords:
+            yield "expanded", priority, cat_slug, kw
+
+
+def render() -> str:
+    values = [
+        f"  ({sql_literal(source)}, {priority}, {sql_literal(slug)}, {sql_literal(kw)})"
+        for source, priority, slug, kw in keyword_rows()
+    ]
+    insert = (
+        "INSERT INTO category_keywords (source, priority, category_slug, keyword) VALUES\n"
+        + ",\n".join(values)
+        + ";\n"
+    )
+    return HEADER + insert + FOOTER
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the categorize_locations() migration")
+    parser.add_argument("--check", action="store_true", help="Fail if the migration is out of date")
+    parser.add_argument("--stdout", action="store_true", help="Print SQL instead of writing the file")
+    parser.add_argument("--apply", action="store_true", help="Also execute the SQL via the Management API")
+    args = parser.parse_args()
+
+    sql = render()
+
+    if args.stdout:
+        sys.stdout.write(sql)
+        return
+
+    if args.check:
+        current = open(MIGRATION_PATH, encoding="utf-8").read() if os.path.exists(MIGRATION_PATH) else ""
+        if current != sql:
+            print(f"{MIGRATION_PATH} is out of date — run python3 scripts/generate-categorize-sql.py")
+            sys.exit(1)
+        print("Migration is up to date.")
+        return
+
+    with open(MIGRATION_PATH, "w", encoding="utf-8") as f:
+        f.write(sql)
+    print(f"Wrote {sum(1 for _ in keyword_rows())} keywords to {MIGRATION_PATH}")
+
+    if args.apply:
+        apply_sql(sql)
+
+
+def apply_sql(sql: str):
+    """Run the migration through the Supabase Management API."""
+    import requests
+
+    token = os.environ.get("SUPABASE_ACCESS_TOKEN", "")
+    if not token:
+        print("ERROR: --apply needs SUPABASE_ACCESS_TOKEN")
+        sys.exit(1)
+    project_ref = os.environ.get("SUPABASE_PROJECT_REF", "wsysphytctpgbzoatuzw")
+    url = f"https://api.supabase.com/v1/projects/{project_ref}/database/query"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    }
+    resp = requests.post(url, headers=headers, json={"query": sql}, timeout=120)
+    if resp.status_code not in (200, 201):
+        print(f"SQL ERROR ({resp.status_code}): {resp.text[:500]}")
+        sys.exit(1)
+    print("Applied to database.")
+
+
+if __name__ == "__main__":
+    main()
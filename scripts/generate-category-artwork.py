@@ -17,10 +17,13 @@ import requests
 import sys
 import time
 
-GEMINI_API_KEY = os.environ["GEMINI_API_KEY"]
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_SERVICE_ROLE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
+from common import env, gemini, gemini_usage, model_cascade, profiling, telemetry
+from common.endpoints import supabase_url
 
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+
+GEMINI_MODELS = model_cascade.cascade("image")
 BUCKET = "location-images"
 FOLDER = "category-artwork"
 
@@ -84,10 +87,9 @@ CATEGORIES = {
 }
 
 
+@telemetry.instrument("gemini.generate_image", ok=lambda result: result is not None)
 def generate_image(prompt: str):
     """Call Gemini 2.5 Flash to generate an image. Returns PNG bytes or None."""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-image:generateContent?key={GEMINI_API_KEY}"
-
     payload = {
         "contents": [
             {
@@ -101,13 +103,10 @@ def generate_image(prompt: str):
         },
     }
 
-    resp = requests.post(url, json=payload, timeout=120)
-    if resp.status_code != 200:
-        print(f"  ERROR: Gemini API returned {resp.status_code}: {resp.text[:500]}")
+    data = gemini.generate(GEMINI_MODELS, payload, timeout=120)
+    if data is None:
         return None
 
-    data = resp.json()
-
     # Extract image from response parts
     candidates = data.get("candidates", [])
     if not candidates:
@@ -126,6 +125,7 @@ def generate_image(prompt: str):
     return None
 
 
+@telemetry.instrument("storage.upload", ok=lambda result: result is not None)
 def upload_to_supabase(image_bytes: bytes, path: str):
     """Upload image to Supabase Storage. Returns public URL or None."""
     upload_url = f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{path}"
@@ -151,7 +151,9 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Only print prompts, don't generate")
     parser.add_argument("--category", type=str, help="Generate only this category slug")
     parser.add_argument("--save-local", action="store_true", help="Also save images locally")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
     args = parser.parse_args()
+    telemetry.start_run("generate-category-artwork", profile=args.profile)
 
     categories = CATEGORIES
     if args.category:
@@ -161,6 +163,9 @@ def main():
             sys.exit(1)
         categories = {args.category: CATEGORIES[args.category]}
 
+    if not args.dry_run:
+        env.require("GEMINI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
+
     results = {}
 
     for slug, info in categories.items():
@@ -174,7 +179,8 @@ def main():
 
         # Generate
         print("  Generating image with Gemini...")
-        image_bytes = generate_image(info["prompt"])
+        with gemini_usage.context(topic=slug, template="category-artwork"):
+            image_bytes = generate_image(info["prompt"])
         if not image_bytes:
             print(f"  FAILED to generate {slug}")
             continue
@@ -3,8 +3,13 @@
 Generate watercolor cover images for all 18 collections via Gemini 2.5 Flash,
 upload to Supabase Storage, and update the collections table.
 
+Covers are stored as collection-covers/<slug>-<content hash>.webp (.png
+without Pillow installed) with an immutable cache header (common/storage.py),
+so a regenerated cover gets a new URL. Once the collection points at the new one, the cover it replaced is kept
+(cached pages still show it) and only versions older than that are deleted.
+
 Usage:
-  python3 scripts/generate-collection-covers.py [--dry-run] [--collection SLUG]
+  python3 scripts/generate-collection-covers.py [--dry-run] [--collection SLUG] [--workers N] [--delay S]
 
 Requires: pip install requests
 """
@@ -15,16 +20,20 @@ import json
 import os
 import requests
 import sys
-import time
 
-GEMINI_API_KEY = os.environ["GEMINI_API_KEY"]
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_SERVICE_ROLE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-MGMT_API_URL = f"https://api.supabase.com/v1/projects/{os.environ.get('SUPABASE_PROJECT_REF', 'wsysphytctpgbzoatuzw')}/database/query"
-MGMT_TOKEN = os.environ["SUPABASE_ACCESS_TOKEN"]
+from common import env, gemini, gemini_usage, model_cascade, profiling, storage, telemetry
+from common.endpoints import mgmt_query_url, supabase_url
+from common.pipeline import run_items
+
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+MGMT_API_URL = mgmt_query_url()
+MGMT_TOKEN = os.environ.get("SUPABASE_ACCESS_TOKEN", "")
 
+GEMINI_MODELS = model_cascade.cascade("image")
 BUCKET = "location-images"
 FOLDER = "collection-covers"
+STORE = storage.Bucket(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, BUCKET)
 
 # Style prompt prefix
 STYLE_PREFIX = (
@@ -171,21 +180,17 @@ COLLECTIONS = {
 }
 
 
+@telemetry.instrument("gemini.generate_image", ok=lambda result: result is not None)
 def generate_image(prompt):
     """Call Gemini 2.5 Flash to generate an image. Returns PNG bytes or None."""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-image:generateContent?key={GEMINI_API_KEY}"
-
     payload = {
         "contents": [{"parts": [{"text": prompt}]}],
         "generationConfig": {"responseModalities": ["TEXT", "IMAGE"]},
     }
 
-    resp = requests.post(url, json=payload, timeout=120)
-    if resp.status_code != 200:
-        print(f"  ERROR: Gemini API returned {resp.status_code}: {resp.text[:500]}")
+    data = gemini.generate(GEMINI_MODELS, payload, timeout=120)
+    if data is None:
         return None
-
-    data = resp.json()
     candidates = data.get("candidates", [])
     if not candidates:
         print(f"  ERROR: No candidates in response")
@@ -203,34 +208,81 @@ def generate_image(prompt):
     return None
 
 
-def upload_to_supabase(image_bytes, path):
-    """Upload image to Supabase Storage. Returns public URL or None."""
-    upload_url = f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{path}"
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
-        "Content-Type": "image/png",
-        "x-upsert": "true",
-    }
-    resp = requests.post(upload_url, headers=headers, data=image_bytes, timeout=60)
-    if resp.status_code not in (200, 201):
-        print(f"  ERROR: Upload failed {resp.status_code}: {resp.text[:300]}")
-        return None
-    return f"{SUPABASE_URL}/storage/v1/object/public/{BUCKET}/{path}"
-
-
+@telemetry.instrument("sql.update_collection_cover", ok=lambda result: result[0])
 def update_collection_cover(collection_id, cover_url):
-    """Update the collection's cover_image_url in the database."""
+    """Update the collection's cover_image_url. Returns (success, the URL it pointed at before)."""
     headers = {
         "Authorization": f"Bearer {MGMT_TOKEN}",
         "Content-Type": "application/json",
         "User-Agent": "supabase-cli/2.76.15",
     }
-    sql = f"UPDATE collections SET cover_image_url = '{cover_url}' WHERE id = {collection_id};"
+    # One statement: the old value is read under the row lock and returned with the update
+    sql = (
+        f"UPDATE collections c SET cover_image_url = '{cover_url}' "
+        f"FROM (SELECT id, cover_image_url FROM collections WHERE id = {collection_id} FOR UPDATE) old "
+        f"WHERE c.id = old.id RETURNING old.cover_image_url AS previous;"
+    )
     resp = requests.post(MGMT_API_URL, headers=headers, json={"query": sql})
     if resp.status_code != 201:
         print(f"  ERROR updating DB: {resp.status_code} {resp.text[:300]}")
-        return False
-    return True
+        return False, None
+    rows = resp.json()
+    return True, rows[0].get("previous") if rows else None
+
+
+@telemetry.instrument("item.cover_collection", ok=lambda result: result is not None)
+def cover_collection(slug, info, save_local=False):
+    """Generate, upload and attach one collection cover. Returns the public URL or None."""
+    print(f"\n{'='*60}")
+    print(f"Collection: {slug} (id={info['id']})")
+    print(f"Prompt: {info['prompt'][:120]}...")
+
+    # Generate
+    print("  Generating image with Gemini...")
+    with gemini_usage.context(topic=slug, template="collection-cover"):
+        image_bytes = generate_image(info["prompt"])
+    if not image_bytes:
+        print(f"  FAILED to generate {slug}")
+        return None
+
+    print(f"  Generated {len(image_bytes):,} bytes")
+
+    # Save locally and process with ImageMagick
+    if save_local:
+        local_dir = "scripts/collection-covers-output"
+        os.makedirs(local_dir, exist_ok=True)
+        local_path = os.path.join(local_dir, f"{slug}-orig.png")
+        with open(local_path, "wb") as f:
+            f.write(image_bytes)
+
+        fixed_path = os.path.join(local_dir, f"{slug}.png")
+        os.system(f"magick {local_path} -fuzz 10% -trim +repage -resize 1024x768^ -gravity center -extent 1024x768 -gravity southeast -pointsize 24 -fill \"rgba(255,255,255,0.6)\" -annotate +20+20 \"toilanguoisaigon.com\" {fixed_path}")
+
+        # Read back processed bytes
+        with open(fixed_path, "rb") as f:
+            image_bytes = f.read()
+
+        print(f"  Processed and saved locally: {fixed_path}")
+
+    # Upload to Supabase under a content-hashed name
+    print(f"  Uploading to Supabase: {FOLDER}/")
+    public_url = STORE.upload_image(FOLDER, slug, image_bytes)
+    if not public_url:
+        print(f"  FAILED to upload {slug}")
+        return None
+
+    print(f"  Uploaded: {public_url}")
+
+    # Point the collection at the new object, then drop the versions before the one it replaced
+    print(f"  Updating collection {info['id']} in DB...")
+    updated, previous = update_collection_cover(info["id"], public_url)
+    if updated:
+        pruned = STORE.prune_versions(FOLDER, slug, keep=[public_url, previous])
+        print(f"  SUCCESS: {slug}" + (f" ({pruned} old version(s) deleted)" if pruned else ""))
+        return public_url
+    STORE.delete([STORE.path_of(public_url)])
+    print(f"  FAILED to update DB for {slug}")
+    return None
 
 
 def main():
@@ -238,7 +290,11 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Only print prompts, don't generate")
     parser.add_argument("--collection", type=str, help="Generate only this collection slug")
     parser.add_argument("--save-local", action="store_true", help="Also save images locally")
+    parser.add_argument("--workers", type=int, default=1, help="Collections processed in parallel")
+    parser.add_argument("--delay", type=float, default=5.0, help="Pause after each collection, per worker (seconds)")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
     args = parser.parse_args()
+    telemetry.start_run("generate-collection-covers", profile=args.profile)
 
     collections = COLLECTIONS
     if args.collection:
@@ -248,69 +304,23 @@ def main():
             sys.exit(1)
         collections = {args.collection: COLLECTIONS[args.collection]}
 
-    results = {}
-    errors = []
-
-    for slug, info in collections.items():
-        print(f"\n{'='*60}")
-        print(f"Collection: {slug} (id={info['id']})")
-        print(f"Prompt: {info['prompt'][:120]}...")
-
-        if args.dry_run:
+    if args.dry_run:
+        for slug, info in collections.items():
+            print(f"\n{'='*60}")
+            print(f"Collection: {slug} (id={info['id']})")
+            print(f"Prompt: {info['prompt'][:120]}...")
             print("  [DRY RUN] Skipping generation")
-            continue
-
-        # Generate
-        print("  Generating image with Gemini...")
-        image_bytes = generate_image(info["prompt"])
-        if not image_bytes:
-            print(f"  FAILED to generate {slug}")
-            errors.append(slug)
-            time.sleep(3)
-            continue
-
-        print(f"  Generated {len(image_bytes):,} bytes")
-
-        # Save locally and process with ImageMagick
-        if args.save_local:
-            local_dir = "scripts/collection-covers-output"
-            os.makedirs(local_dir, exist_ok=True)
-            local_path = os.path.join(local_dir, f"{slug}-orig.png")
-            with open(local_path, "wb") as f:
-                f.write(image_bytes)
-            
-            fixed_path = os.path.join(local_dir, f"{slug}.png")
-            os.system(f"magick {local_path} -fuzz 10% -trim +repage -resize 1024x768^ -gravity center -extent 1024x768 -gravity southeast -pointsize 24 -fill \"rgba(255,255,255,0.6)\" -annotate +20+20 \"toilanguoisaigon.com\" {fixed_path}")
-            
-            # Read back processed bytes
-            with open(fixed_path, "rb") as f:
-                image_bytes = f.read()
-                
-            print(f"  Processed and saved locally: {fixed_path}")
-
-        # Upload to Supabase
-        storage_path = f"{FOLDER}/{slug}.png"
-        print(f"  Uploading to Supabase: {storage_path}")
-        public_url = upload_to_supabase(image_bytes, storage_path)
-        if not public_url:
-            print(f"  FAILED to upload {slug}")
-            errors.append(slug)
-            time.sleep(3)
-            continue
-
-        print(f"  Uploaded: {public_url}")
-
-        # Update DB
-        print(f"  Updating collection {info['id']} in DB...")
-        if update_collection_cover(info["id"], public_url):
-            print(f"  SUCCESS: {slug}")
-            results[slug] = public_url
-        else:
-            print(f"  FAILED to update DB for {slug}")
-            errors.append(slug)
-
-        # Rate limit
-        time.sleep(5)
+        return
+
+    env.require("GEMINI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_ACCESS_TOKEN")
+    urls = run_items(
+        collections.items(),
+        lambda item: cover_collection(item[0], item[1], save_local=args.save_local),
+        workers=args.workers,
+        delay=args.delay,
+    )
+    results = {slug: url for slug, url in zip(collections, urls) if url}
+    errors = [slug for slug, url in zip(collections, urls) if not url]
 
     # Summary
     print(f"\n{'='*60}")
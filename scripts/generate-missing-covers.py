@@ -6,28 +6,27 @@ import base64
 import subprocess
 import sys
 
+from common import env, gemini, gemini_usage, model_cascade, storage, telemetry
+from common.endpoints import supabase_url
+
 # Validate environment variables
-required_vars = ["GEMINI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY"]
-missing_vars = [var for var in required_vars if not os.environ.get(var)]
-if missing_vars:
-    print(f"Error: Missing required environment variables: {', '.join(missing_vars)}")
-    sys.exit(1)
+env.require("GEMINI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
 
-GEMINI_API_KEY = os.environ["GEMINI_API_KEY"]
-SUPABASE_URL = os.environ["SUPABASE_URL"]
+SUPABASE_URL = supabase_url()
 SUPABASE_SERVICE_ROLE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
+GEMINI_MODELS = model_cascade.cascade("image")
+FOLDER = "collection-covers"
+STORE = storage.Bucket(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, "location-images")
 
+@telemetry.instrument("gemini.generate_image", ok=lambda result: result is not None)
 def generate_image(prompt):
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-image:generateContent?key={GEMINI_API_KEY}"
     payload = {
         "contents": [{"parts": [{"text": prompt}]}],
         "generationConfig": {"responseModalities": ["TEXT", "IMAGE"]},
     }
-    resp = requests.post(url, json=payload, timeout=120)
-    if resp.status_code != 200:
-        print(f"Gemini API Error: {resp.status_code} - {resp.text}")
+    data = gemini.generate(GEMINI_MODELS, payload, timeout=120)
+    if data is None:
         return None
-    data = resp.json()
     candidates = data.get("candidates", [])
     if not candidates:
         return None
@@ -40,19 +39,6 @@ def generate_image(prompt):
                 return base64.b64decode(b64)
     return None
 
-def upload_to_supabase(image_bytes, path):
-    upload_url = f"{SUPABASE_URL}/storage/v1/object/location-images/collection-covers/{path}"
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
-        "Content-Type": "image/png",
-        "x-upsert": "true",
-    }
-    resp = requests.post(upload_url, headers=headers, data=image_bytes, timeout=60)
-    if resp.status_code not in (200, 201):
-        print(f"Supabase Storage Error: {resp.status_code} - {resp.text}")
-        return None
-    return f"{SUPABASE_URL}/storage/v1/object/public/location-images/collection-covers/{path}"
-
 # Get missing collections using REST API via PostgREST (no need for Management API if using Service Role)
 headers = {
     "apikey": SUPABASE_SERVICE_ROLE_KEY,
@@ -62,6 +48,7 @@ headers = {
 # Filter for AI collections without cover images
 rest_url = f"{SUPABASE_URL}/rest/v1/collections?source=eq.ai&cover_image_url=is.null&select=id,title,slug"
 
+telemetry.start_run("generate-missing-covers", profile="--profile" in sys.argv[1:])
 print("Fetching collections without cover images...")
 resp = requests.get(rest_url, headers=headers)
 
@@ -91,7 +78,8 @@ if resp.status_code == 200:
         print(f"--- Generating for: {title} (ID: {c_id}) ---")
         prompt = f"{STYLE_PREFIX} A lively and atmospheric Saigon scene illustrating the theme: '{title}'. Highlight Vietnamese food, local culture, and a cozy dining vibe."
         
-        img_bytes = generate_image(prompt)
+        with gemini_usage.context(topic=slug, template="collection-theme"):
+            img_bytes = generate_image(prompt)
         if img_bytes:
             tmp_orig = f"/tmp/covers/{slug}.png"
             tmp_fixed = f"/tmp/covers/{slug}-fixed.png"
@@ -111,16 +99,19 @@ if resp.status_code == 200:
             with open(tmp_fixed, "rb") as f:
                 fixed_bytes = f.read()
                 
-            cover_url = upload_to_supabase(fixed_bytes, f"{slug}.png")
+            cover_url = STORE.upload_image(FOLDER, slug, fixed_bytes)
             if cover_url:
                 print(f"Uploaded to {cover_url}")
-                # Update record using REST API
+                # Update record using REST API, then drop any older versions of this cover
                 update_url = f"{SUPABASE_URL}/rest/v1/collections?id=eq.{c_id}"
                 update_resp = requests.patch(update_url, headers=headers, json={"cover_image_url": cover_url})
                 if update_resp.status_code in (200, 204):
                     print("Database record updated successfully.")
+                    # Only collections without a cover are picked, so there is no previous version to keep
+                    STORE.prune_versions(FOLDER, slug, keep=[cover_url])
                 else:
                     print(f"Failed to update database: {update_resp.status_code} - {update_resp.text}")
+                    STORE.delete([STORE.path_of(cover_url)])
             else:
                 print("Failed to upload image.")
         else:
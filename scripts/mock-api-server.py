@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Gemini, PostgREST, Storage and the Management API, so the
+generators can be load-tested without real quota or the live project.
+
+Usage:
+  python3 scripts/mock-api-server.py --seed fixtures.json
+  python3 scripts/mock-api-server.py --latency gemini=lognormal:8,0.5 --latency rest=uniform:0.05,0.2 \\
+      --throttle-rate gemini=0.05 --error-rate gemini=0.02 --rpm gemini=10
+
+  # then, in another shell
+  export MOCK_API_URL="http://127.0.0.1:8787"
+  export GEMINI_API_KEY=mock SUPABASE_SERVICE_ROLE_KEY=mock SUPABASE_ACCESS_TOKEN=mock
+  python3 scripts/generate-blog-covers.py --limit 20
+  curl http://127.0.0.1:8787/__mock/stats
+
+Seed file (all keys optional):
+  {
+    "tables": {"posts": [{...}], "locations": [{...}]},
+    "rpc":    {"categorize_locations": [{"category_slug": "pho", "assigned": 3}]},
+    "sql":    [{"match": "FROM locations .* district", "rows": [{...}]}]
+  }
+
+SERVICE is one of gemini, rest, storage, sql, or "all". Options repeat.
+"""
+
+import argparse
+import json
+import sys
+
+from common.mock_api import MockServer, MockState, build_policies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mock of the external APIs used by scripts/")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--seed", help="JSON file with tables / rpc / sql fixtures")
+    parser.add_argument("--latency", action="append", metavar="SERVICE=SPEC",
+                        help="fixed:S | uniform:A,B | normal:MU,SIGMA | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--error-rate", action="append", metavar="SERVICE=P", help="share of 500/503 answers")
+    parser.add_argument("--throttle-rate", action="append", metavar="SERVICE=P", help="share of random 429 answers")
+    parser.add_argument("--retry-after", action="append", metavar="SERVICE=S", help="Retry-After on random 429s")
+    parser.add_argument("--rpm", action="append", metavar="SERVICE=N", help="per-key requests per minute")
+    parser.add_argument("--quota", action="append", metavar="SERVICE=N", help="per-key total requests")
+    parser.add_argument("--image-size", type=int, default=256, help="side of the generated PNGs in pixels")
+    parser.add_argument("--article-words", type=int, default=1200, help="words per generated article")
+    parser.add_argument("--max-body-bytes", type=int, default=0, help="answer 413 above this REST payload size")
+    parser.add_argument("--cache-min-tokens", type=int, default=0, help="reject smaller Gemini context caches (400)")
+    parser.add_argument("--random-seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    seed = {}
+    if args.seed:
+        with open(args.seed, encoding="utf-8") as f:
+            seed = json.load(f)
+
+    try:
+        policies = build_policies(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+            rpm=args.rpm,
+            quota=args.quota,
+            retry_after=args.retry_after,
+        )
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    state = MockState(
+        seed,
+        policies,
+        image_size=args.image_size,
+        article_words=args.article_words,
+        max_body_bytes=args.max_body_bytes,
+        cache_min_tokens=args.cache_min_tokens,
+        random_seed=args.random_seed,
+    )
+    server = MockServer(state, args.host, args.port, verbose=args.verbose)
+
+    print(f"{'=' * 60}")
+    print(f"Mock API listening on {server.url}")
+    for table, rows in state.tables.items():
+        print(f"  {table}: {len(rows)} rows")
+    for service, policy in policies.items():
+        print(f"  {service:8s} {policy}")
+    print(f"export MOCK_API_URL=\"{server.url}\"")
+    print(f"{'=' * 60}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping.")
+        print(json.dumps(state.snapshot(), indent=2))
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
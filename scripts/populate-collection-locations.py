@@ -5,274 +5,127 @@ to collections based on categories, tags, keywords, and attributes.
 Usage:
   export SUPABASE_URL="https://your-project.supabase.co"
   export SUPABASE_SERVICE_ROLE_KEY="your-service-role-key"
-  python3 scripts/populate-collection-locations.py
+  python3 scripts/populate-collection-locations.py [--profile]
 """
 
+import argparse
 import os
 import json
 import random
-from supabase import create_client
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+from common import env, profiling, telemetry
+from common.collection_rules import COLLECTION_RULES, all_rule_keywords
+from common.endpoints import supabase_url
+from common.location_store import LocationStore, match_locations
 
-# ─── Collection matching rules ───────────────────────────────────────────
-# Each collection has a set of criteria to match locations.
-# Fields: category_slugs, tag_slugs, name_keywords, price_ranges,
-#          min_rating, districts, opening_hours_filter, limit
-
-COLLECTION_RULES = {
-    # 1: Sài Gòn Không Ngủ — late-night food
-    "saigon-khong-ngu": {
-        "tag_slugs": ["an-khuya"],
-        "name_keywords": ["đêm", "khuya", "24h", "24 giờ", "midnight"],
-        "limit": 20,
-    },
-    # 2: Bữa Sáng Nạp Năng Lượng — breakfast spots
-    "bua-sang-nap-nang-luong": {
-        "tag_slugs": ["an-sang"],
-        "category_slugs": ["pho", "bun", "banh-mi", "xoi", "banh-cuon", "chao", "hu-tieu-mi"],
-        "name_keywords": ["sáng", "breakfast", "phở", "bún", "bánh mì", "xôi", "bánh cuốn", "cháo", "hủ tiếu"],
-        "limit": 20,
-    },
-    # 3: Cơm Trưa Văn Phòng "Chất Lừ" — office lunch
-    "com-trua-van-phong-chat-lu": {
-        "tag_slugs": ["an-trua"],
-        "category_slugs": ["com"],
-        "name_keywords": ["cơm", "trưa", "lunch", "cơm tấm", "cơm văn phòng", "cơm gà"],
-        "limit": 20,
-    },
-    # 4: Bữa Tối Chill Chill — dinner chill
-    "bua-toi-chill-chill": {
-        "tag_slugs": ["an-toi"],
-        "name_keywords": ["tối", "dinner", "nướng", "lẩu", "BBQ"],
-        "price_ranges": ["$$", "$$$"],
-        "limit": 20,
-    },
-    # 5: Vỉa Hè Tinh Hoa — premium street food
-    "via-he-tinh-hoa": {
-        "tag_slugs": ["quan-via-he", "binh-dan"],
-        "name_keywords": ["vỉa hè", "hẻm", "lề đường"],
-        "price_ranges": ["$", "$$"],
-        "min_rating": 4.0,
-        "limit": 20,
-    },
-    # 6: Rooftop Lộng Gió, View Bạc Tỷ — rooftop / views
-    "rooftop-long-gio-view-bac-ty": {
-        "tag_slugs": ["view-dep", "sang-trong"],
-        "name_keywords": ["rooftop", "sky", "terrace", "tầng thượng", "view"],
-        "price_ranges": ["$$$", "$$$$"],
-        "limit": 15,
-    },
-    # 7: Xanh Mướt Mắt - Cafe Sân Vườn — garden cafes
-    "xanh-muot-mat-cafe-san-vuon": {
-        "category_slugs": ["cafe"],
-        "name_keywords": ["sân vườn", "garden", "xanh", "cây", "vườn", "green", "terrace"],
-        "limit": 15,
-    },
-    # 8: Check-in Sống Ảo Triệu Like — instagrammable
-    "check-in-song-ao-trieu-like": {
-        "tag_slugs": ["song-ao", "view-dep"],
-        "name_keywords": ["sống ảo", "check-in", "Instagram", "decor", "art", "concept"],
-        "limit": 20,
-    },
-    # 9: Góc Riêng Cho Hai Người — date night
-    "goc-rieng-cho-hai-nguoi": {
-        "tag_slugs": ["phu-hop-hen-ho", "co-phong-rieng"],
-        "name_keywords": ["hẹn hò", "date", "romantic", "couple", "riêng tư"],
-        "price_ranges": ["$$", "$$$", "$$$$"],
-        "limit": 15,
-    },
-    # 10: Họp Nhóm Càng Đông Càng Vui — group gatherings
-    "hop-nhom-cang-dong-cang-vui": {
-        "tag_slugs": ["phu-hop-nhom-ban"],
-        "category_slugs": ["lau-nuong", "nhau-bia"],
-        "name_keywords": ["lẩu", "nướng", "BBQ", "buffet", "nhậu", "bia"],
-        "limit": 20,
-    },
-    # 11: Workstation Lý Tưởng — work cafes
-    "workstation-ly-tuong": {
-        "tag_slugs": ["co-wifi", "co-may-lanh"],
-        "category_slugs": ["cafe"],
-        "name_keywords": ["workspace", "coworking", "work", "cafe", "cà phê", "coffee"],
-        "limit": 15,
-    },
-    # 12: Một Mình Vẫn Chill — solo dining
-    "mot-minh-van-chill": {
-        "category_slugs": ["cafe", "pho", "bun", "com", "banh-mi", "hu-tieu-mi"],
-        "price_ranges": ["$", "$$"],
-        "name_keywords": ["quán nhỏ", "một mình"],
-        "min_rating": 4.0,
-        "limit": 15,
-    },
-    # 13: Finedining
-    "finedining": {
-        "tag_slugs": ["sang-trong"],
-        "category_slugs": ["nha-hang", "mon-quoc-te"],
-        "name_keywords": ["fine dining", "restaurant", "nhà hàng", "steak", "wine", "lounge"],
-        "price_ranges": ["$$$", "$$$$"],
-        "limit": 15,
-    },
-    # 14: Thưởng Thức Âm Nhạc Live — live music venues
-    "thuong-thuc-am-nhac-live": {
-        "name_keywords": ["live", "music", "acoustic", "jazz", "bar", "pub", "lounge", "nhạc sống"],
-        "category_slugs": ["nhau-bia"],
-        "limit": 15,
-    },
-    # 15: Cuối Tuần Cùng Gia Đình — family weekend
-    "cuoi-tuan-cung-gia-dinh": {
-        "tag_slugs": ["phu-hop-gia-dinh", "co-cho-dau-xe"],
-        "name_keywords": ["gia đình", "family", "buffet", "nhà hàng"],
-        "limit": 20,
-    },
-    # 16: "Boss" Đi Cùng, "Sen" Vui Vẻ (Pet-Friendly)
-    "boss-di-cung-sen-vui-ve-pet-friendly": {
-        "tag_slugs": ["pet-friendly"],
-        "name_keywords": ["pet", "dog", "cat", "thú cưng"],
-        "limit": 15,
-    },
-    # Michelin collections removed — data was not authentic (no verified Michelin locations in DB)
-}
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+supabase = None  # created in main(), so --help needs neither credentials nor supabase-py
 
 
+@telemetry.instrument("fetch.locations")
 def fetch_all_locations():
-    """Fetch all published locations with their categories and tags."""
-    all_locs = []
+    """Fetch all published locations into a compact LocationStore.
+
+    Rows are ordered by id so the store can look ids up by bisection, and each
+    page is folded into the store and dropped before the next one is fetched.
+    """
+    store = LocationStore(all_rule_keywords())
     offset = 0
     batch = 500
     while True:
         resp = supabase.table("locations") \
-            .select("id, name, slug, district, price_range, average_rating, google_rating, opening_hours, description") \
+            .select("id, name, district, price_range, average_rating, google_rating, description") \
             .eq("status", "published") \
+            .order("id") \
             .range(offset, offset + batch - 1) \
             .execute()
-        all_locs.extend(resp.data)
+        for loc in resp.data:
+            store.add(loc)
         if len(resp.data) < batch:
             break
         offset += batch
-    print(f"Fetched {len(all_locs)} published locations")
-    return all_locs
+    print(f"Fetched {len(store)} published locations")
+    return store
 
 
-def fetch_location_categories():
-    """Fetch location_categories junction: location_id → category slugs."""
-    mapping = {}
-    resp = supabase.table("location_categories") \
-        .select("location_id, categories(slug)") \
-        .execute()
-    for row in resp.data:
-        lid = row["location_id"]
-        cat = row.get("categories")
-        if cat:
+@telemetry.instrument("fetch.location_categories")
+def fetch_location_categories(store):
+    """Fetch location_categories junction into the store's category masks."""
+    offset = 0
+    batch = 1000
+    while True:
+        resp = supabase.table("location_categories") \
+            .select("location_id, categories(slug)") \
+            .order("location_id") \
+            .order("category_id") \
+            .range(offset, offset + batch - 1) \
+            .execute()
+        for row in resp.data:
+            cat = row.get("categories")
             slug = cat.get("slug") if isinstance(cat, dict) else None
             if slug:
-                mapping.setdefault(lid, set()).add(slug)
-    return mapping
+                store.add_category(row["location_id"], slug)
+        if len(resp.data) < batch:
+            break
+        offset += batch
 
 
-def fetch_location_tags():
-    """Fetch location_tags junction: location_id → tag slugs."""
-    mapping = {}
+@telemetry.instrument("fetch.location_tags")
+def fetch_location_tags(store):
+    """Fetch location_tags junction into the store's tag masks."""
     offset = 0
     batch = 1000
     while True:
         resp = supabase.table("location_tags") \
             .select("location_id, tags(slug)") \
+            .order("location_id") \
+            .order("tag_id") \
             .range(offset, offset + batch - 1) \
             .execute()
         for row in resp.data:
-            lid = row["location_id"]
             tag = row.get("tags")
-            if tag:
-                slug = tag.get("slug") if isinstance(tag, dict) else None
-                if slug:
-                    mapping.setdefault(lid, set()).add(slug)
+            slug = tag.get("slug") if isinstance(tag, dict) else None
+            if slug:
+                store.add_tag(row["location_id"], slug)
         if len(resp.data) < batch:
             break
         offset += batch
-    return mapping
 
 
+@telemetry.instrument("fetch.collections")
 def fetch_collections():
     """Fetch all collections."""
     resp = supabase.table("collections").select("id, slug, title").execute()
     return {c["slug"]: c for c in resp.data}
 
 
-def match_locations(locations, rules, cat_map, tag_map):
-    """Score and match locations to a collection based on rules."""
-    scored = []
-
-    rule_cats = set(rules.get("category_slugs", []))
-    rule_tags = set(rules.get("tag_slugs", []))
-    keywords = [kw.lower() for kw in rules.get("name_keywords", [])]
-    price_ranges = set(rules.get("price_ranges", []))
-    min_rating = rules.get("min_rating", 0)
-    districts = set(rules.get("districts", []))
-    limit = rules.get("limit", 15)
-
-    for loc in locations:
-        score = 0
-        loc_cats = cat_map.get(loc["id"], set())
-        loc_tags = tag_map.get(loc["id"], set())
-        name_lower = (loc["name"] or "").lower()
-        desc_lower = (loc.get("description") or "").lower()
-        rating = loc.get("google_rating") or loc.get("average_rating") or 0
-
-        # Category match (strong signal)
-        cat_overlap = rule_cats & loc_cats
-        score += len(cat_overlap) * 3
-
-        # Tag match (strong signal)
-        tag_overlap = rule_tags & loc_tags
-        score += len(tag_overlap) * 5
-
-        # Keyword match in name (medium signal)
-        for kw in keywords:
-            if kw in name_lower:
-                score += 2
-            if kw in desc_lower:
-                score += 1
-
-        # Price range match
-        if price_ranges and loc.get("price_range") in price_ranges:
-            score += 1
-
-        # Rating filter
-        if min_rating > 0 and rating < min_rating:
-            continue  # Skip if below minimum
-
-        # District filter
-        if districts and loc.get("district") not in districts:
-            continue
-
-        if score > 0:
-            scored.append((score, rating, loc))
-
-    # Sort by score desc, then rating desc
-    scored.sort(key=lambda x: (-x[0], -x[1]))
-
-    # Take top N
-    return [item[2] for item in scored[:limit]]
-
-
 def main():
+    parser = argparse.ArgumentParser(description="Rebuild collection_locations from COLLECTION_RULES")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
+    args = parser.parse_args()
+    telemetry.start_run("populate-collection-locations", profile=args.profile)
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
+    from supabase import create_client
+    global supabase
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
     print("=== Populating collection_locations ===\n")
 
-    locations = fetch_all_locations()
-    cat_map = fetch_location_categories()
-    tag_map = fetch_location_tags()
-    collections = fetch_collections()
+    with profiling.phase("fetch"):
+        store = fetch_all_locations()
+        fetch_location_categories(store)
+        fetch_location_tags(store)
+        collections = fetch_collections()
 
-    print(f"Categories mapped: {sum(len(v) for v in cat_map.values())} assignments")
-    print(f"Tags mapped: {sum(len(v) for v in tag_map.values())} assignments")
+    print(f"Categories mapped: {store.category_assignments()} assignments")
+    print(f"Tags mapped: {store.tag_assignments()} assignments")
     print(f"Collections: {len(collections)}")
     print()
 
     # Clear existing data
     print("Clearing existing collection_locations...")
-    supabase.table("collection_locations").delete().neq("collection_id", 0).execute()
+    with profiling.phase("write"):
+        supabase.table("collection_locations").delete().neq("collection_id", 0).execute()
 
     total_inserted = 0
 
@@ -282,22 +135,24 @@ def main():
             print(f"⚠ Collection '{slug}' not found in DB, skipping")
             continue
 
-        matched = match_locations(locations, rules, cat_map, tag_map)
+        with profiling.phase("match"):
+            matched = match_locations(store, rules)
 
         if not matched:
             print(f"⚠ Collection '{coll['title']}' — 0 matches!")
             continue
 
-        # Insert rows
-        rows = [
-            {
-                "collection_id": coll["id"],
-                "location_id": loc["id"],
-            }
-            for loc in matched
-        ]
-
-        supabase.table("collection_locations").insert(rows).execute()
+        with profiling.phase("write"):
+            # Insert rows
+            rows = [
+                {
+                    "collection_id": coll["id"],
+                    "location_id": store.location_id(row),
+                }
+                for row in matched
+            ]
+
+            supabase.table("collection_locations").insert(rows).execute()
         total_inserted += len(rows)
         print(f"✓ {coll['title']}: {len(rows)} locations")
 
@@ -2,23 +2,29 @@
 Seed categories & tags, then auto-assign categories to 890 locations
 using Vietnamese keyword matching (same logic as getCategoryArtwork in constants.ts).
 
-Run: python scripts/seed-categories-tags.py
+Run: python scripts/seed-categories-tags.py [--profile]
 
 Uses Supabase Management API for DB access (no direct connection needed).
+Keyword matching runs inside Postgres via the categorize_locations() RPC
+(migration 20261019000001_categorize_locations.sql, generated from
+common/category_keywords.py), so no location rows are downloaded.
 """
 
+import argparse
 import json
 import os
 import requests
-import time
-from typing import Optional
+
+from common import env, profiling, telemetry
+from common.endpoints import mgmt_query_url, supabase_url
+from common.bulk_writer import BulkWriter
 
 # ─── Config ──────────────────────────────────────────────────────────────────
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SERVICE_ROLE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-MGMT_API_URL = f"https://api.supabase.com/v1/projects/{os.environ.get('SUPABASE_PROJECT_REF', 'wsysphytctpgbzoatuzw')}/database/query"
-MGMT_TOKEN = os.environ["SUPABASE_ACCESS_TOKEN"]
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+MGMT_API_URL = mgmt_query_url()
+MGMT_TOKEN = os.environ.get("SUPABASE_ACCESS_TOKEN", "")
 
 HEADERS_REST = {
     "apikey": SERVICE_ROLE_KEY,
@@ -34,6 +40,7 @@ HEADERS_MGMT = {
 }
 
 
+@telemetry.instrument("sql.query", ok=lambda result: result is not None)
 def run_sql(sql: str):
     """Execute SQL via Supabase Management API."""
     resp = requests.post(MGMT_API_URL, headers=HEADERS_MGMT, json={"query": sql})
@@ -43,6 +50,7 @@ def run_sql(sql: str):
     return resp.json()
 
 
+@telemetry.instrument("rest.get")
 def rest_get(table: str, params: dict = None):
     """GET from Supabase REST API."""
     url = f"{SUPABASE_URL}/rest/v1/{table}"
@@ -53,17 +61,29 @@ def rest_get(table: str, params: dict = None):
     return resp.json()
 
 
-def rest_post(table: str, data: list):
-    """POST (insert) to Supabase REST API. Returns inserted rows."""
-    url = f"{SUPABASE_URL}/rest/v1/{table}"
-    headers = {**HEADERS_REST, "Prefer": "return=representation,resolution=merge-duplicates"}
-    resp = requests.post(url, headers=headers, json=data)
-    if resp.status_code not in (200, 201):
-        print(f"REST POST ERROR ({table}): {resp.status_code} {resp.text[:500]}")
-        return []
+@telemetry.instrument("rest.rpc", ok=lambda result: result is not None)
+def rest_rpc(function: str, params: dict):
+    """Call a Postgres function through PostgREST. Returns its rows or None."""
+    url = f"{SUPABASE_URL}/rest/v1/rpc/{function}"
+    resp = requests.post(url, headers=HEADERS_REST, json=params)
+    if resp.status_code != 200:
+        print(f"REST RPC ERROR ({function}): {resp.status_code} {resp.text[:500]}")
+        return None
     return resp.json()
 
 
+@telemetry.instrument("rest.bulk_upsert")
+def bulk_upsert(table: str, rows: list, on_conflict: str):
+    """Upsert rows with the adaptive BulkWriter. Returns a BulkResult."""
+    writer = BulkWriter(
+        f"{SUPABASE_URL}/rest/v1/{table}?on_conflict={on_conflict}",
+        {**HEADERS_REST, "Prefer": "return=minimal,resolution=merge-duplicates"},
+    )
+    result = writer.write(rows)
+    result.print_failures()
+    return result
+
+
 # ─── Categories ──────────────────────────────────────────────────────────────
 
 # 20 Vietnamese food/drink categories covering all 890 locations
@@ -90,67 +110,6 @@ CATEGORIES = [
     {"name": "Món quốc tế", "slug": "mon-quoc-te"},
 ]
 
-# Keywords for matching location names → categories (order matters: first match wins)
-# Each tuple: (category_slug, [keywords])
-CATEGORY_KEYWORDS = [
-    ("pho", ["phở", "pho "]),
-    ("bun", ["bún ", "bún,", "bún.", "bún-"]),
-    ("banh-canh", ["bánh canh"]),
-    ("banh-cuon", ["bánh cuốn", "bánh ướt"]),
-    ("banh-mi", ["bánh mì", "banh mi", "bánh mỳ", "sandwich", "hamburger", "burger"]),
-    ("chao", ["cháo"]),
-    ("xoi", ["xôi"]),
-    ("goi-cuon-nem", ["gỏi cuốn", "nem nướng", "nem cuốn", "bì cuốn", "cuốn diếp"]),
-    ("hu-tieu-mi", [
-        "hủ tiếu", "hủ tíu", "hu tieu", "mì ", "mì,", "mỳ ", "mì quảng",
-        "mì vịt", "mì gia", "mì xào", "sủi cảo", "hoành thánh",
-        "ramen", "sushi", "udon", "soba", "mì ý", "spaghetti"
-    ]),
-    ("com", [
-        "cơm tấm", "cơm ", "com tam", "com binh dan", "cơm hủ",
-        "cơm gà", "cơm niêu", "cơm sườn"
-    ]),
-    ("chay", ["chay", "vegetarian", "vegan", "zen house"]),
-    ("oc-hai-san", [
-        "ốc ", "ốc,", "ghẹ", "hải sản", "seafood", "cua ", "hàu ",
-        "tôm ", "càng ghẹ", "sò ", "nghêu"
-    ]),
-    ("lau-nuong", [
-        "lẩu", "nướng", "hotpot", "bbq", "buffet nướng",
-        "thịt nướng", "steak", "bò nướng", "gà nướng"
-    ]),
-    ("nhau-bia", [
-        "nhậu", "bia ", "beer", "quán nhậu", "rooftop", "lounge",
-        "bar ", "cocktail", "bistro", "wine", "pub"
-    ]),
-    ("cafe", [
-        "cà phê", "cafe", "coffee", "ca phe", "caffe", "kafe",
-        "cappuccino", "matcha", "trà ", "tea ", "acoustic"
-    ]),
-    ("kem-gelato", [
-        "kem ", "kem,", "gelato", "ice cream", "yogurt", "sữa chua"
-    ]),
-    ("che-trang-mieng", [
-        "chè ", "chè,", "bánh ", "dessert", "bánh tráng", "bánh flan",
-        "chuối nướng", "chuối nếp", "tàu hũ", "đậu hũ", "bánh bao",
-        "bánh bột", "bánh khọt", "bánh xèo", "takoyaki", "bánh bạch tuộc",
-        "bánh gạo", "tokbokki", "bánh tráng trộn", "bánh cống",
-        "bánh đúc", "bánh plan"
-    ]),
-    ("nuoc-uong", [
-        "sinh tố", "nước ép", "nước mía", "juice", "smoothie",
-        "trà sữa", "nước uống", "fruit", "boba", "trà trái cây"
-    ]),
-    ("nha-hang", [
-        "nhà hàng", "restaurant", "dining", "quán ăn", "ẩm thực"
-    ]),
-    ("mon-quoc-te", [
-        "pizza", "pasta", "taco", "indian", "korean", "hàn quốc",
-        "japanese", "nhật", "thái ", "thai food", "mexican", "french",
-        "italian", "dimsum", "dim sum"
-    ]),
-]
-
 # ─── Tags ────────────────────────────────────────────────────────────────────
 
 TAGS = [
@@ -195,127 +154,83 @@ TAGS = [
 ]
 
 
-def match_category(name: str) -> Optional[str]:
-    """Match a location name to a category slug using keyword matching."""
-    name_lower = name.lower()
-    for cat_slug, keywords in CATEGORY_KEYWORDS:
-        for kw in keywords:
-            if kw in name_lower:
-                return cat_slug
-    return None
-
-
 def main():
+    parser = argparse.ArgumentParser(description="Seed categories and tags, then categorize locations")
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
+    args = parser.parse_args()
+    telemetry.start_run("seed-categories-tags", profile=args.profile)
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_ACCESS_TOKEN")
     print("=" * 60)
     print("SEEDING CATEGORIES & TAGS")
     print("=" * 60)
 
     # ─── Step 1: Insert categories ───────────────────────────────────────
-    print("\n[1/5] Inserting categories...")
-    cat_result = rest_post("categories", CATEGORIES)
-    if not cat_result:
-        print("ERROR: Failed to insert categories. Trying one by one...")
-        cat_result = []
-        for cat in CATEGORIES:
-            r = rest_post("categories", [cat])
-            if r:
-                cat_result.extend(r)
-    
+    print("\n[1/4] Inserting categories...")
+    with profiling.phase("write"):
+        bulk_upsert("categories", CATEGORIES, on_conflict="slug")
+
     # Build slug→id map
-    cats = rest_get("categories", {"select": "id,slug", "order": "id"})
+    with profiling.phase("fetch"):
+        cats = rest_get("categories", {"select": "id,slug", "order": "id"})
     cat_map = {c["slug"]: c["id"] for c in cats}
     print(f"  -> {len(cat_map)} categories in DB: {list(cat_map.keys())}")
 
     # ─── Step 2: Insert tags ─────────────────────────────────────────────
-    print("\n[2/5] Inserting tags...")
-    tag_result = rest_post("tags", TAGS)
-    if not tag_result:
-        print("ERROR: Failed to insert tags. Trying one by one...")
-        tag_result = []
-        for tag in TAGS:
-            r = rest_post("tags", [tag])
-            if r:
-                tag_result.extend(r)
-    
-    tags = rest_get("tags", {"select": "id,slug", "order": "id"})
+    print("\n[2/4] Inserting tags...")
+    with profiling.phase("write"):
+        bulk_upsert("tags", TAGS, on_conflict="slug")
+
+    with profiling.phase("fetch"):
+        tags = rest_get("tags", {"select": "id,slug", "order": "id"})
     print(f"  -> {len(tags)} tags in DB")
 
-    # ─── Step 3: Fetch all published locations ───────────────────────────
-    print("\n[3/5] Fetching all published locations...")
-    all_locations = []
-    offset = 0
-    PAGE_SIZE = 1000
-    while True:
-        locs = rest_get("locations", {
-            "select": "id,name",
-            "status": "eq.published",
-            "order": "name",
-            "offset": str(offset),
-            "limit": str(PAGE_SIZE),
+    # ─── Step 3: Categorize locations server-side ────────────────────────
+    print("\n[3/4] Matching categories to locations (categorize_locations RPC)...")
+    with profiling.phase("match"):
+        stats = rest_rpc("categorize_locations", {
+            "p_sources": ["seed"],
+            "p_only_uncategorized": False,
         })
-        all_locations.extend(locs)
-        if len(locs) < PAGE_SIZE:
-            break
-        offset += PAGE_SIZE
-    print(f"  -> {len(all_locations)} published locations fetched")
-
-    # ─── Step 4: Match categories to locations ───────────────────────────
-    print("\n[4/5] Matching categories to locations...")
-    assignments = []  # [{location_id, category_id}]
-    unmatched = []
-    stats = {}
-
-    for loc in all_locations:
-        cat_slug = match_category(loc["name"])
-        if cat_slug and cat_slug in cat_map:
-            cat_id = cat_map[cat_slug]
-            assignments.append({
-                "location_id": loc["id"],
-                "category_id": cat_id,
-            })
-            stats[cat_slug] = stats.get(cat_slug, 0) + 1
-        else:
-            unmatched.append(loc["name"])
-
-    print(f"  -> {len(assignments)} locations matched, {len(unmatched)} unmatched")
-    print("\n  Category distribution:")
-    for slug, count in sorted(stats.items(), key=lambda x: -x[1]):
-        cat_name = next((c["name"] for c in CATEGORIES if c["slug"] == slug), slug)
-        print(f"    {cat_name:25s} {count:4d}")
-    
-    if unmatched:
-        print(f"\n  Unmatched locations ({len(unmatched)}):")
-        for name in unmatched[:30]:
-            print(f"    - {name}")
-        if len(unmatched) > 30:
-            print(f"    ... and {len(unmatched) - 30} more")
-
-    # ─── Step 5: Insert location_categories ──────────────────────────────
-    print("\n[5/5] Inserting location_categories assignments...")
-    BATCH_SIZE = 200
-    inserted = 0
-    for i in range(0, len(assignments), BATCH_SIZE):
-        batch = assignments[i:i + BATCH_SIZE]
-        # Use upsert to avoid conflicts
-        url = f"{SUPABASE_URL}/rest/v1/location_categories"
-        headers = {
-            **HEADERS_REST,
-            "Prefer": "return=minimal,resolution=merge-duplicates",
-        }
-        resp = requests.post(url, headers=headers, json=batch)
-        if resp.status_code in (200, 201):
-            inserted += len(batch)
-            print(f"  -> Batch {i//BATCH_SIZE + 1}: inserted {len(batch)} rows (total: {inserted})")
-        else:
-            print(f"  -> Batch {i//BATCH_SIZE + 1} ERROR: {resp.status_code} {resp.text[:300]}")
-        time.sleep(0.2)  # Rate limit
+    if stats is None:
+        print("  ERROR: categorize_locations() failed — is migration "
+              "20261019000001_categorize_locations.sql applied?")
+        stats = []
+    inserted = sum(row["assigned"] for row in stats)
+
+    print(f"  -> {inserted} location_categories rows inserted")
+    print("\n  Category distribution (new rows):")
+    for row in stats:
+        cat_name = next((c["name"] for c in CATEGORIES if c["slug"] == row["category_slug"]), row["category_slug"])
+        print(f"    {cat_name:25s} {row['assigned']:4d}")
+
+    # ─── Step 4: Report what is still unmatched ──────────────────────────
+    print("\n[4/4] Checking unmatched locations...")
+    with profiling.phase("fetch"):
+        unmatched_count = run_sql("""
+            SELECT COUNT(*) AS cnt FROM locations l
+            WHERE l.status = 'published'
+              AND NOT EXISTS (SELECT 1 FROM location_categories lc WHERE lc.location_id = l.id);
+        """)
+        unmatched_total = unmatched_count[0]["cnt"] if unmatched_count else 0
+        if unmatched_total:
+            sample = run_sql("""
+                SELECT l.name FROM locations l
+                WHERE l.status = 'published'
+                  AND NOT EXISTS (SELECT 1 FROM location_categories lc WHERE lc.location_id = l.id)
+                ORDER BY l.name LIMIT 30;
+            """) or []
+            print(f"\n  Unmatched locations ({unmatched_total}):")
+            for row in sample:
+                print(f"    - {row['name']}")
+            if unmatched_total > 30:
+                print(f"    ... and {unmatched_total - 30} more")
 
     print("\n" + "=" * 60)
     print("DONE!")
     print(f"  Categories: {len(cat_map)}")
     print(f"  Tags: {len(tags)}")
     print(f"  Location-category assignments: {inserted}")
-    print(f"  Unmatched locations: {len(unmatched)}")
+    print(f"  Unmatched locations: {unmatched_total}")
     print("=" * 60)
 
 
@@ -1,11 +1,16 @@
 """
 Seed 10 new curated collections and auto-assign locations via keyword/criteria matching.
 
+Each collection carries a structured match spec that the seed_collection() RPC
+(supabase/migrations/20261019000002_seed_collection_rpc.sql) evaluates in the
+database: the collection and its positioned locations are inserted in a single
+transaction, so no location ids travel through this script.
+
 Run:
   export SUPABASE_URL="https://wsysphytctpgbzoatuzw.supabase.co"
   export SUPABASE_SERVICE_ROLE_KEY="..."
-  export SUPABASE_ACCESS_TOKEN="..."
-  python scripts/seed-new-collections.py
+  python scripts/seed-new-collections.py                    # one RPC for all 10
+  python scripts/seed-new-collections.py --per-collection   # one RPC each
 
 Collections:
   1. Ăn No Không Lo Giá          — budget-friendly ($)
@@ -18,20 +23,22 @@ Collections:
   8. Quán Mới Trên MXH Đang Viral — trendy/new social media spots
   9. Cà Phê Sài Gòn             — coffee culture
   10. Bún & Phở Đỉnh Cao        — noodle soups
+
+Match spec (see location_matches_clause() for clause keys):
+  {"all": clause, "any": [clause, ...], "order_by": "rating" | "newest", "limit": n}
 """
 
-import json
+import argparse
 import os
 import requests
-import time
+
+from common import env, profiling, telemetry
+from common.endpoints import supabase_url
 
 # ─── Config ──────────────────────────────────────────────────────────────────
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SERVICE_ROLE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-PROJECT_REF = os.environ.get("SUPABASE_PROJECT_REF", "wsysphytctpgbzoatuzw")
-MGMT_API_URL = f"https://api.supabase.com/v1/projects/{PROJECT_REF}/database/query"
-MGMT_TOKEN = os.environ["SUPABASE_ACCESS_TOKEN"]
+SUPABASE_URL = supabase_url(os.environ.get("SUPABASE_URL", ""))
+SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
 
 HEADERS_REST = {
     "apikey": SERVICE_ROLE_KEY,
@@ -40,37 +47,14 @@ HEADERS_REST = {
     "Prefer": "return=representation",
 }
 
-HEADERS_MGMT = {
-    "Authorization": f"Bearer {MGMT_TOKEN}",
-    "Content-Type": "application/json",
-}
-
-
-def run_sql(sql: str):
-    """Execute SQL via Supabase Management API."""
-    resp = requests.post(MGMT_API_URL, headers=HEADERS_MGMT, json={"query": sql})
-    if resp.status_code not in (200, 201):
-        print(f"  SQL ERROR ({resp.status_code}): {resp.text[:500]}")
-        return None
-    return resp.json()
-
 
-def rest_get(table: str, params: dict = None):
-    """GET from Supabase REST API."""
-    url = f"{SUPABASE_URL}/rest/v1/{table}"
-    resp = requests.get(url, headers=HEADERS_REST, params=params or {})
+@telemetry.instrument("rest.rpc", ok=lambda result: result is not None)
+def rest_rpc(function: str, params: dict):
+    """Call a Postgres function through PostgREST. Returns its rows or None."""
+    url = f"{SUPABASE_URL}/rest/v1/rpc/{function}"
+    resp = requests.post(url, headers=HEADERS_REST, json=params)
     if resp.status_code != 200:
-        print(f"  REST GET error ({resp.status_code}): {resp.text[:300]}")
-        return []
-    return resp.json()
-
-
-def rest_post(table: str, data):
-    """POST to Supabase REST API."""
-    url = f"{SUPABASE_URL}/rest/v1/{table}"
-    resp = requests.post(url, headers=HEADERS_REST, json=data)
-    if resp.status_code not in (200, 201):
-        print(f"  REST POST error ({resp.status_code}): {resp.text[:300]}")
+        print(f"  REST RPC error ({function}): {resp.status_code} {resp.text[:500]}")
         return None
     return resp.json()
 
@@ -85,8 +69,7 @@ COLLECTIONS = [
         "mood": "Bình dân, no bụng",
         "emoji": "💰",
         # Match: price_range = '$'
-        "match_type": "sql",
-        "match_sql": "SELECT id FROM locations WHERE status = 'published' AND price_range = '$' ORDER BY COALESCE(google_rating, 0) DESC LIMIT 30",
+        "match": {"all": {"price_ranges": ["$"]}, "limit": 30},
     },
     {
         "title": "Date Night Hoàn Hảo",
@@ -95,16 +78,14 @@ COLLECTIONS = [
         "mood": "Lãng mạn, sang trọng",
         "emoji": "🕯️",
         # Match: expensive + romantic keywords
-        "match_type": "sql",
-        "match_sql": """
-            SELECT id FROM locations WHERE status = 'published' 
-            AND (
-                price_range IN ('$$$', '$$$$') 
-                OR LOWER(name) ~* '(rooftop|lounge|wine|steak|fine.?din|italian|french|bistro|romantic|garden|terrace)'
-                OR LOWER(COALESCE(google_review_summary, '')) ~* '(lãng mạn|romantic|date|hẹn hò|candle|view đẹp|sang trọng)'
-            )
-            ORDER BY COALESCE(google_rating, 0) DESC LIMIT 25
-        """,
+        "match": {
+            "any": [
+                {"price_ranges": ["$$$", "$$$$"]},
+                {"name_regex": "(rooftop|lounge|wine|steak|fine.?din|italian|french|bistro|romantic|garden|terrace)"},
+                {"summary_regex": "(lãng mạn|romantic|date|hẹn hò|candle|view đẹp|sang trọng)"},
+            ],
+            "limit": 25,
+        },
     },
     {
         "title": "Quán Ăn Trong Hẻm Bí Mật",
@@ -113,15 +94,13 @@ COLLECTIONS = [
         "mood": "Bình dân, phiêu lưu",
         "emoji": "🏘️",
         # Match: address contains hẻm/hẻm or low price + high rating
-        "match_type": "sql",
-        "match_sql": """
-            SELECT id FROM locations WHERE status = 'published'
-            AND (
-                LOWER(address) ~* '(hẻm|hẽm|hem |/[0-9])'
-                OR (price_range = '$' AND COALESCE(google_rating, 0) >= 4.2)
-            )
-            ORDER BY COALESCE(google_rating, 0) DESC LIMIT 30
-        """,
+        "match": {
+            "any": [
+                {"address_regex": "(hẻm|hẽm|hem |/[0-9])"},
+                {"price_ranges": ["$"], "min_rating": 4.2},
+            ],
+            "limit": 30,
+        },
     },
     {
         "title": "Sài Gòn Healthy",
@@ -130,15 +109,13 @@ COLLECTIONS = [
         "mood": "Healthy, xanh",
         "emoji": "🥗",
         # Match: healthy/vegan/chay keywords
-        "match_type": "sql",
-        "match_sql": """
-            SELECT id FROM locations WHERE status = 'published'
-            AND (
-                LOWER(name) ~* '(healthy|health|salad|chay|vegan|vegetarian|organic|clean|granola|acai|smoothie|detox|zen|yoga|quinoa|tofu)'
-                OR LOWER(COALESCE(google_review_summary, '')) ~* '(healthy|lành mạnh|thuần chay|chay|vegan|organic|sạch)'
-            )
-            ORDER BY COALESCE(google_rating, 0) DESC LIMIT 25
-        """,
+        "match": {
+            "any": [
+                {"name_regex": "(healthy|health|salad|chay|vegan|vegetarian|organic|clean|granola|acai|smoothie|detox|zen|yoga|quinoa|tofu)"},
+                {"summary_regex": "(healthy|lành mạnh|thuần chay|chay|vegan|organic|sạch)"},
+            ],
+            "limit": 25,
+        },
     },
     {
         "title": "Ăn Gì Khi Trời Mưa?",
@@ -147,15 +124,13 @@ COLLECTIONS = [
         "mood": "Ấm cúng, comfort",
         "emoji": "🌧️",
         # Match: soup/warm food keywords
-        "match_type": "sql",
-        "match_sql": """
-            SELECT id FROM locations WHERE status = 'published'
-            AND (
-                LOWER(name) ~* '(phở|pho|bún|bun|cháo|chao|lẩu|lau|hotpot|súp|soup|mì |hủ tiếu|hủ tíu|canh|bánh canh|bò kho|ramen|udon)'
-                OR LOWER(COALESCE(google_review_summary, '')) ~* '(nóng hổi|ấm|comfort|mưa|warming)'
-            )
-            ORDER BY COALESCE(google_rating, 0) DESC LIMIT 30
-        """,
+        "match": {
+            "any": [
+                {"name_regex": "(phở|pho|bún|bun|cháo|chao|lẩu|lau|hotpot|súp|soup|mì |hủ tiếu|hủ tíu|canh|bánh canh|bò kho|ramen|udon)"},
+                {"summary_regex": "(nóng hổi|ấm|comfort|mưa|warming)"},
+            ],
+            "limit": 30,
+        },
     },
     {
         "title": "Sài Gòn Xưa — Quán Cổ Trăm Năm",
@@ -164,15 +139,13 @@ COLLECTIONS = [
         "mood": "Hoài niệm, cổ điển",
         "emoji": "🏛️",
         # Match: old/heritage keywords
-        "match_type": "sql",
-        "match_sql": """
-            SELECT id FROM locations WHERE status = 'published'
-            AND (
-                LOWER(name) ~* '(xưa|cổ|old|truyền thống|heritage|bà |cô |dì |chú |anh |ông |chị |hoài niệm|lâu đời|năm |1[89][0-9][0-9]|cà phê vợt)'
-                OR LOWER(COALESCE(google_review_summary, '')) ~* '(lâu đời|lâu năm|truyền thống|xưa|hoài niệm|cổ|decades|heritage|old school|từ năm)'
-            )
-            ORDER BY COALESCE(google_rating, 0) DESC LIMIT 25
-        """,
+        "match": {
+            "any": [
+                {"name_regex": "(xưa|cổ|old|truyền thống|heritage|bà |cô |dì |chú |anh |ông |chị |hoài niệm|lâu đời|năm |1[89][0-9][0-9]|cà phê vợt)"},
+                {"summary_regex": "(lâu đời|lâu năm|truyền thống|xưa|hoài niệm|cổ|decades|heritage|old school|từ năm)"},
+            ],
+            "limit": 25,
+        },
     },
     {
         "title": "Buffet Thoả Thích",
@@ -181,15 +154,13 @@ COLLECTIONS = [
         "mood": "Ăn thả ga",
         "emoji": "🍖",
         # Match: buffet keywords
-        "match_type": "sql",
-        "match_sql": """
-            SELECT id FROM locations WHERE status = 'published'
-            AND (
-                LOWER(name) ~* '(buffet|buf |all.?you.?can|thả ga|nướng.*lẩu|lẩu.*nướng|bbq|korean bbq|yakiniku|shabu)'
-                OR LOWER(COALESCE(google_review_summary, '')) ~* '(buffet|all you can eat|thả ga|ăn không giới hạn)'
-            )
-            ORDER BY COALESCE(google_rating, 0) DESC LIMIT 20
-        """,
+        "match": {
+            "any": [
+                {"name_regex": "(buffet|buf |all.?you.?can|thả ga|nướng.*lẩu|lẩu.*nướng|bbq|korean bbq|yakiniku|shabu)"},
+                {"summary_regex": "(buffet|all you can eat|thả ga|ăn không giới hạn)"},
+            ],
+            "limit": 20,
+        },
     },
     {
         "title": "Quán Mới Trên MXH Đang Viral",
@@ -198,13 +169,11 @@ COLLECTIONS = [
         "mood": "Trendy, viral",
         "emoji": "📱",
         # Match: newest locations with high google reviews (proxy for viral)
-        "match_type": "sql",
-        "match_sql": """
-            SELECT id FROM locations WHERE status = 'published'
-            AND COALESCE(google_review_count, 0) >= 100
-            AND COALESCE(google_rating, 0) >= 4.0
-            ORDER BY created_at DESC LIMIT 20
-        """,
+        "match": {
+            "all": {"min_review_count": 100, "min_rating": 4.0},
+            "order_by": "newest",
+            "limit": 20,
+        },
     },
     {
         "title": "Cà Phê Sài Gòn",
@@ -213,14 +182,10 @@ COLLECTIONS = [
         "mood": "Chill, thư giãn",
         "emoji": "☕",
         # Match: cafe/coffee keywords
-        "match_type": "sql",
-        "match_sql": """
-            SELECT id FROM locations WHERE status = 'published'
-            AND (
-                LOWER(name) ~* '(cà phê|cafe|coffee|ca phe|cappuccino|espresso|latte|brew|roast|drip)'
-            )
-            ORDER BY COALESCE(google_rating, 0) DESC LIMIT 30
-        """,
+        "match": {
+            "all": {"name_regex": "(cà phê|cafe|coffee|ca phe|cappuccino|espresso|latte|brew|roast|drip)"},
+            "limit": 30,
+        },
     },
     {
         "title": "Bún & Phở Đỉnh Cao",
@@ -229,88 +194,85 @@ COLLECTIONS = [
         "mood": "Đậm đà, truyền thống",
         "emoji": "🍜",
         # Match: pho/bun keywords
-        "match_type": "sql",
-        "match_sql": """
-            SELECT id FROM locations WHERE status = 'published'
-            AND (
-                LOWER(name) ~* '(phở|pho|bún|bun )'
-            )
-            ORDER BY COALESCE(google_rating, 0) DESC LIMIT 30
-        """,
+        "match": {
+            "all": {"name_regex": "(phở|pho|bún|bun )"},
+            "limit": 30,
+        },
     },
 ]
 
 
-def main():
-    print("=" * 60)
-    print("Seeding 10 new curated collections")
-    print("=" * 60)
-
-    # Check existing collections to avoid duplicates
-    existing = rest_get("collections", {"select": "slug", "source": "eq.manual"})
-    existing_slugs = {c["slug"] for c in existing} if existing else set()
-
-    for coll in COLLECTIONS:
-        slug = coll["slug"]
-        if slug in existing_slugs:
-            print(f"\n⏭  '{coll['title']}' already exists — skipping")
-            continue
-
-        print(f"\n{'─' * 50}")
-        print(f"Creating: {coll['title']} ({slug})")
-
-        # 1. Insert collection
-        insert_data = {
+def rpc_item(coll: dict) -> dict:
+    """Split a COLLECTIONS entry into the {collection, match} RPC payload."""
+    return {
+        "collection": {
             "title": coll["title"],
-            "slug": slug,
+            "slug": coll["slug"],
             "description": coll["description"],
             "mood": coll.get("mood"),
             "emoji": coll.get("emoji"),
-            "source": "manual",
-            "status": "published",
-            "is_featured": False,
-        }
-        result = rest_post("collections", insert_data)
-        if not result:
-            print(f"  FAILED to insert collection")
-            continue
+        },
+        "match": coll["match"],
+    }
+
 
-        collection_id = result[0]["id"]
-        print(f"  Created collection id={collection_id}")
+def seed_all() -> list:
+    """Seed every collection in one seed_collections() call (one transaction)."""
+    rows = rest_rpc("seed_collections", {"p_items": [rpc_item(c) for c in COLLECTIONS]})
+    return rows or []
 
-        # 2. Find matching locations
-        match_sql = coll["match_sql"]
-        rows = run_sql(match_sql)
-        if not rows:
-            print(f"  WARNING: no locations matched")
+
+def seed_each() -> list:
+    """Seed collections one RPC at a time, so one failure does not roll back the rest."""
+    results = []
+    for coll in COLLECTIONS:
+        item = rpc_item(coll)
+        rows = rest_rpc("seed_collection", {
+            "p_collection": item["collection"],
+            "p_match": item["match"],
+        })
+        if rows is None:
+            print(f"  FAILED: {coll['title']}")
             continue
+        results.extend(rows)
+    return results
 
-        location_ids = [r["id"] for r in rows]
-        print(f"  Matched {len(location_ids)} locations")
 
-        # 3. Insert collection_locations
-        links = []
-        for pos, loc_id in enumerate(location_ids, start=1):
-            links.append({
-                "collection_id": collection_id,
-                "location_id": loc_id,
-                "position": pos,
-            })
+def main():
+    parser = argparse.ArgumentParser(description="Seed curated collections")
+    parser.add_argument(
+        "--per-collection",
+        action="store_true",
+        help="Call seed_collection() once per collection instead of one batch RPC",
+    )
+    parser.add_argument("--profile", action="store_true", help=profiling.HELP)
+    args = parser.parse_args()
+    telemetry.start_run("seed-new-collections", profile=args.profile)
+    env.require("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
 
-        # Batch insert in chunks of 50
-        for i in range(0, len(links), 50):
-            chunk = links[i:i+50]
-            resp = rest_post("collection_locations", chunk)
-            if resp:
-                print(f"  Linked {len(chunk)} locations (batch {i//50 + 1})")
-            else:
-                print(f"  ERROR linking batch {i//50 + 1}")
-            time.sleep(0.2)
+    print("=" * 60)
+    print(f"Seeding {len(COLLECTIONS)} new curated collections")
+    print("=" * 60)
+
+    rows = seed_each() if args.per_collection else seed_all()
+    titles = {c["slug"]: c["title"] for c in COLLECTIONS}
 
-        print(f"  ✅ Done: {coll['title']} → {len(location_ids)} locations")
+    created = skipped = linked = 0
+    for row in rows:
+        title = titles.get(row["slug"], row["slug"])
+        if not row["created"]:
+            skipped += 1
+            print(f"⏭  '{title}' already exists — skipping")
+            continue
+        created += 1
+        linked += row["linked"]
+        if row["linked"] == 0:
+            print(f"⚠  {title} (id={row['collection_id']}): no locations matched")
+        else:
+            print(f"✅ {title} (id={row['collection_id']}) → {row['linked']} locations")
 
     print(f"\n{'=' * 60}")
-    print("All collections seeded!")
+    print(f"Created {created}, skipped {skipped}, linked {linked} locations")
     print("=" * 60)
 
 
@@ -0,0 +1,60 @@
+"""
+load_docs() must only index what the site lists: published rows.
+
+    python3 -m unittest discover -s scripts/tests
+"""
+
+import importlib.util
+import os
+import sys
+import unittest
+from unittest import mock
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS)
+
+_spec = importlib.util.spec_from_file_location("build_search_index", os.path.join(SCRIPTS, "build-search-index.py"))
+build_search_index = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(build_search_index)
+
+TABLES = {
+    "locations": [
+        {"slug": "pho-hoa", "name": "Phở Hòa", "district": "Quận 3", "status": "published"},
+        {"slug": "pho-nhap", "name": "Phở nháp", "district": "Quận 1", "status": "draft"},
+    ],
+    "collections": [
+        {"slug": "com-tam-ngon", "title": "Cơm tấm ngon", "status": "published"},
+        {"slug": "bun-bo-nhap", "title": "Bún bò nháp", "status": "draft"},
+        {"slug": "banh-mi-cu", "title": "Bánh mì cũ", "status": "archived"},
+    ],
+    "posts": [
+        {"slug": "pho-sai-gon", "title": "Phở Sài Gòn", "tags": [], "status": "published"},
+        {"slug": "bai-nhap", "title": "Bài nháp", "tags": [], "status": "draft"},
+    ],
+}
+
+
+def fake_rest_get_all(table: str, params: dict) -> list:
+    """Apply the query's eq. filters the way PostgREST would."""
+    filters = {key: value[len("eq."):] for key, value in params.items() if str(value).startswith("eq.")}
+    return [row for row in TABLES[table] if all(str(row.get(key)) == value for key, value in filters.items())]
+
+
+class LoadDocsTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(build_search_index, "rest_get_all", side_effect=fake_rest_get_all)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_published_rows_are_indexed(self):
+        slugs = {(doc.kind, doc.slug) for doc in build_search_index.load_docs()}
+        self.assertEqual(slugs, {("location", "pho-hoa"), ("collection", "com-tam-ngon"), ("post", "pho-sai-gon")})
+
+    def test_non_published_collection_is_left_out(self):
+        slugs = [doc.slug for doc in build_search_index.load_docs() if doc.kind == "collection"]
+        self.assertNotIn("bun-bo-nhap", slugs)
+        self.assertNotIn("banh-mi-cu", slugs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""
+Heading anchors from post_html.analyze().
+
+    python3 -m unittest discover -s scripts/tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import post_html  # noqa: E402
+
+
+class HeadingAnchorTest(unittest.TestCase):
+    def test_missing_id_is_added(self):
+        analysis = post_html.analyze('<h2 class="x">Phở Hòa</h2>')
+        self.assertEqual(analysis.content, '<h2 class="x" id="pho-hoa">Phở Hòa</h2>')
+        self.assertEqual(analysis.toc, [{"level": 2, "text": "Phở Hòa", "anchor": "pho-hoa"}])
+
+    def test_empty_id_is_replaced_in_place(self):
+        analysis = post_html.analyze('<h2 id="" class="x">Phở Hòa</h2><h3 ID=\'\'>Cơm tấm</h3>')
+        self.assertEqual(analysis.content, '<h2 id="pho-hoa" class="x">Phở Hòa</h2><h3 id="com-tam">Cơm tấm</h3>')
+        self.assertEqual([entry["anchor"] for entry in analysis.toc], ["pho-hoa", "com-tam"])
+
+    def test_explicit_id_is_kept_and_not_reused(self):
+        analysis = post_html.analyze('<h2>Phở</h2><h2 id="pho">Khác</h2>')
+        self.assertEqual(analysis.content, '<h2 id="pho-2">Phở</h2><h2 id="pho">Khác</h2>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,11 @@ import { supabase } from '@/integrations/supabase/client';
 import { showError, showSuccess } from '@/utils/toast';
 import { Post } from '@/types/database';
 
-export type CreatePostData = Omit<Post, 'id' | 'created_at' | 'updated_at' | 'profiles'>;
+// toc, word_count, place_slugs and images are derived from content (scripts/analyze-posts.py)
+export type CreatePostData = Omit<
+  Post,
+  'id' | 'created_at' | 'updated_at' | 'profiles' | 'toc' | 'word_count' | 'place_slugs' | 'images'
+>;
 
 export const useCreatePost = () => {
   const queryClient = useQueryClient();
@@ -3,16 +3,13 @@ import { supabase } from '@/integrations/supabase/client';
 import { Post } from '@/types/database';
 
 /**
- * Fetch blog posts that reference a given location slug in their related_location_slugs array.
+ * Fetch blog posts that mention a given location, via the location_posts reverse index
+ * (posts linking the place first, then newest).
  */
 const fetchRelatedBlogPosts = async (locationSlug: string): Promise<Post[]> => {
   const { data, error } = await supabase
-    .from('posts')
-    .select('id, title, slug, excerpt, cover_image_url, reading_time, published_at, category')
-    .eq('status', 'published')
-    .contains('related_location_slugs', [locationSlug])
-    .order('published_at', { ascending: false, nullsFirst: false })
-    .limit(4);
+    .rpc('get_location_posts', { p_location_slug: locationSlug, p_limit: 4 })
+    .select('id, title, slug, excerpt, cover_image_url, reading_time, published_at, category');
 
   if (error) {
     throw new Error(error.message);
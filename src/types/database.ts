@@ -182,6 +182,17 @@ export interface Tag {
   created_at: string;
 }
 
+export interface PostTocEntry {
+  level: 2 | 3;
+  text: string;
+  anchor: string;
+}
+
+export interface PostImage {
+  src: string;
+  alt: string;
+}
+
 export interface Post {
   id: string;
   created_at: string;
@@ -200,6 +211,10 @@ export interface Post {
   reading_time: number;
   published_at: string | null;
   related_location_slugs: string[];
+  toc: PostTocEntry[];
+  word_count: number | null;
+  place_slugs: string[];
+  images: PostImage[];
   profiles: Pick<Profile, 'full_name' | 'avatar_url'> | null;
 }
 
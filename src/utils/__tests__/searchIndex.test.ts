@@ -0,0 +1,80 @@
+import { describe, it, expect, vi } from 'vitest';
+import { createSearchIndex, decodePostings, foldText, searchTokens } from '../searchIndex';
+
+// Output of scripts/common/search_index.py for three documents
+const FILES: Record<string, unknown> = {
+  'manifest.json': { v: 1, version: 'abc', shard_prefix: 2, shards: ['3', 'co', 'go', 'ho', 'ng', 'ph', 'qu', 'sa', 'ta'] },
+  'abc/docs.json': {
+    v: 1,
+    docs: [
+      ['l', 'pho-hoa', 'Phở Hòa', 'Quận 3'],
+      ['c', 'com-tam-ngon', 'Cơm tấm ngon', ''],
+      ['p', 'pho-sai-gon', 'Phở Sài Gòn', ''],
+    ],
+  },
+  'abc/3.json': { v: 1, tokens: { '3': [0] } },
+  'abc/co.json': { v: 1, tokens: { com: [1] } },
+  'abc/go.json': { v: 1, tokens: { gon: [2] } },
+  'abc/ho.json': { v: 1, tokens: { hoa: [0] } },
+  'abc/ph.json': { v: 1, tokens: { pho: [0, 2] } },
+  'abc/sa.json': { v: 1, tokens: { sai: [2] } },
+  'abc/ta.json': { v: 1, tokens: { tam: [1] } },
+};
+
+function makeIndex() {
+  const fetcher = vi.fn(async (url: string) => {
+    const body = FILES[url.replace('https://cdn.test/', '')];
+    return { ok: body !== undefined, json: async () => body };
+  });
+  return { index: createSearchIndex('https://cdn.test', fetcher), fetcher };
+}
+
+describe('foldText', () => {
+  it('strips Vietnamese diacritics and maps đ', () => {
+    expect(foldText('Phở Hòa')).toBe('pho hoa');
+    expect(foldText('Đường  Đồng Khởi')).toBe('duong dong khoi');
+  });
+});
+
+describe('searchTokens', () => {
+  it('splits folded text on non-alphanumerics', () => {
+    expect(searchTokens('Phở Hòa (Q.1)')).toEqual(['pho', 'hoa', 'q', '1']);
+  });
+});
+
+describe('decodePostings', () => {
+  it('turns deltas back into ids', () => {
+    expect(decodePostings([3, 4, 1])).toEqual([3, 7, 8]);
+    expect(decodePostings([])).toEqual([]);
+  });
+});
+
+describe('createSearchIndex', () => {
+  it('matches without diacritics, most important first', async () => {
+    const { index } = makeIndex();
+    const results = await index.search('pho');
+    expect(results.map((r) => r.slug)).toEqual(['pho-hoa', 'pho-sai-gon']);
+    expect(results[0]).toEqual({ kind: 'location', slug: 'pho-hoa', title: 'Phở Hòa', subtitle: 'Quận 3' });
+  });
+
+  it('requires every token and matches prefixes', async () => {
+    const { index } = makeIndex();
+    expect((await index.search('phở sài')).map((r) => r.slug)).toEqual(['pho-sai-gon']);
+    expect((await index.search('com ta')).map((r) => r.slug)).toEqual(['com-tam-ngon']);
+    expect(await index.search('pho com')).toEqual([]);
+  });
+
+  it('only fetches the shards a query needs, once', async () => {
+    const { index, fetcher } = makeIndex();
+    await index.search('pho');
+    await index.search('Phở');
+    const urls = fetcher.mock.calls.map(([url]) => url);
+    expect(urls).toEqual(['https://cdn.test/manifest.json', 'https://cdn.test/abc/docs.json', 'https://cdn.test/abc/ph.json']);
+  });
+
+  it('returns nothing for unknown shards or empty queries', async () => {
+    const { index } = makeIndex();
+    expect(await index.search('xyz')).toEqual([]);
+    expect(await index.search('  ')).toEqual([]);
+  });
+});
@@ -0,0 +1,131 @@
+/**
+ * Client-side search over the static index built by scripts/build-search-index.py.
+ *
+ * Text is folded the same way as scripts/common/text.py (lowercase, đ → d,
+ * diacritics stripped), so "pho" finds "Phở" and "com tam" finds "Cơm tấm".
+ * A query fetches the manifest and docs once, then only the shards its tokens
+ * fall in (one small JSON file per two-letter prefix), cached for the session.
+ */
+
+const DEFAULT_BASE = `${process.env.NEXT_PUBLIC_SUPABASE_URL ?? ''}/storage/v1/object/public/location-images/search-index`;
+
+export type SearchKind = 'location' | 'collection' | 'post';
+
+export interface SearchResult {
+  kind: SearchKind;
+  slug: string;
+  title: string;
+  subtitle: string;
+}
+
+interface Manifest {
+  version: string;
+  shard_prefix: number;
+  shards: string[];
+}
+
+type DocRow = [string, string, string, string];
+type Fetcher = (url: string) => Promise<{ ok: boolean; json(): Promise<unknown> }>;
+
+const KINDS: Record<string, SearchKind> = { l: 'location', c: 'collection', p: 'post' };
+
+/** Lowercase, map đ to d and strip diacritics: "Phở Hòa" -> "pho hoa". */
+export function foldText(text: string): string {
+  return text
+    .toLowerCase()
+    .replace(/đ/g, 'd')
+    .normalize('NFD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .replace(/\s+/g, ' ')
+    .trim();
+}
+
+/** Folded [a-z0-9] tokens, as indexed by scripts/common/search_index.py. */
+export function searchTokens(text: string): string[] {
+  return foldText(text).match(/[a-z0-9]+/g) ?? [];
+}
+
+/** Posting lists are stored as deltas: [3, 4, 1] -> [3, 7, 8]. */
+export function decodePostings(deltas: number[]): number[] {
+  let id = 0;
+  return deltas.map((delta) => (id += delta));
+}
+
+export function createSearchIndex(baseUrl: string = DEFAULT_BASE, fetcher: Fetcher = fetch) {
+  let manifest: Promise<Manifest> | null = null;
+  let docs: Promise<DocRow[]> | null = null;
+  const shards = new Map<string, Promise<Record<string, number[]>>>();
+
+  const load = async <T,>(path: string): Promise<T> => {
+    const resp = await fetcher(`${baseUrl}/${path}`);
+    if (!resp.ok) throw new Error(`Search index: could not load ${path}`);
+    return (await resp.json()) as T;
+  };
+
+  const getManifest = () => (manifest ??= load<Manifest>('manifest.json'));
+
+  const getDocs = async () => {
+    const { version } = await getManifest();
+    return (docs ??= load<{ docs: DocRow[] }>(`${version}/docs.json`).then((data) => data.docs));
+  };
+
+  const getShard = async (name: string) => {
+    const { version, shards: names } = await getManifest();
+    if (!names.includes(name)) return {};
+    if (!shards.has(name)) {
+      shards.set(name, load<{ tokens: Record<string, number[]> }>(`${version}/${name}.json`).then((data) => data.tokens));
+    }
+    return shards.get(name)!;
+  };
+
+  /** Doc id -> score for one query token: 2 for an exact token, 1 for a longer token it prefixes. */
+  const matchToken = async (token: string, prefixLength: number) => {
+    const matches = new Map<number, number>();
+    if (token.length < prefixLength) {
+      // Too short to pick a shard: only an exact short token ("1", "q") matches
+      for (const id of decodePostings((await getShard(token))[token] ?? [])) matches.set(id, 2);
+      return matches;
+    }
+    const entries = await getShard(token.slice(0, prefixLength));
+    for (const [indexed, postings] of Object.entries(entries)) {
+      if (!indexed.startsWith(token)) continue;
+      const score = indexed === token ? 2 : 1;
+      for (const id of decodePostings(postings)) {
+        matches.set(id, Math.max(matches.get(id) ?? 0, score));
+      }
+    }
+    return matches;
+  };
+
+  /** Documents matching every query token (as a word or word prefix), best first. */
+  const search = async (query: string, limit = 10): Promise<SearchResult[]> => {
+    const tokens = [...new Set(searchTokens(query))];
+    if (tokens.length === 0) return [];
+    const { shard_prefix: prefixLength } = await getManifest();
+    const [rows, ...perToken] = await Promise.all([getDocs(), ...tokens.map((t) => matchToken(t, prefixLength))]);
+
+    const [first, ...rest] = perToken.sort((a, b) => a.size - b.size);
+    const scored: [number, number][] = [];
+    for (const [id, score] of first) {
+      let total = score;
+      for (const matches of rest) {
+        const s = matches.get(id);
+        if (s === undefined) {
+          total = -1;
+          break;
+        }
+        total += s;
+      }
+      if (total >= 0) scored.push([id, total]);
+    }
+    // Lower ids were indexed first, i.e. are more important within their kind
+    scored.sort((a, b) => b[1] - a[1] || a[0] - b[0]);
+
+    return scored.slice(0, limit).map(([id]) => {
+      const [kind, slug, title, subtitle] = rows[id];
+      return { kind: KINDS[kind], slug, title, subtitle };
+    });
+  };
+
+  return { search };
+}
@@ -0,0 +1,415 @@
+-- ============================================================
+-- Migration: Server-side location categorization
+--   category_keywords table + categorize_locations() RPC
+-- Date: 2026-10-19
+--
+-- GENERATED by scripts/generate-categorize-sql.py from
+-- scripts/common/category_keywords.py — edit the keyword tables
+-- there and regenerate, do not edit this file by hand.
+-- ============================================================
+
+-- 1. Extensions (Supabase keeps them in the "extensions" schema)
+CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA extensions;
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+-- unaccent() is only STABLE; this wrapper pins the dictionary so it can be
+-- used in index expressions and generated columns.
+CREATE OR REPLACE FUNCTION f_unaccent(text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE PARALLEL SAFE STRICT
+AS $$
+  SELECT extensions.unaccent('extensions.unaccent'::regdictionary, $1)
+$$;
+
+-- 2. Keyword table. Lower priority wins, exactly like the first-match loop
+--    in match_category() / match_expanded().
+CREATE TABLE IF NOT EXISTS category_keywords (
+  id serial PRIMARY KEY,
+  source text NOT NULL CHECK (source IN ('seed', 'expanded')),
+  priority integer NOT NULL,
+  category_slug text NOT NULL,
+  keyword text NOT NULL,
+  pattern text GENERATED ALWAYS AS (
+    '%' || replace(replace(replace(keyword, '\', '\\'), '%', '\%'), '_', '\_') || '%'
+  ) STORED,
+  folded_pattern text GENERATED ALWAYS AS (
+    f_unaccent('%' || replace(replace(replace(keyword, '\', '\\'), '%', '\%'), '_', '\_') || '%')
+  ) STORED
+);
+
+CREATE INDEX IF NOT EXISTS idx_category_keywords_source_priority
+  ON category_keywords (source, priority);
+
+-- Only the service role (this migration, categorize_locations()) touches it:
+-- RLS with no policy hides it from anon/authenticated through PostgREST
+ALTER TABLE category_keywords ENABLE ROW LEVEL SECURITY;
+
+-- 3. Trigram indexes so each keyword's LIKE '%kw%' is an index scan
+CREATE INDEX IF NOT EXISTS idx_locations_name_lower_trgm
+  ON locations USING gin (lower(name) extensions.gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_locations_name_folded_trgm
+  ON locations USING gin (f_unaccent(lower(name)) extensions.gin_trgm_ops);
+
+-- 4. Keywords
+TRUNCATE category_keywords RESTART IDENTITY;
+INSERT INTO category_keywords (source, priority, category_slug, keyword) VALUES
+  ('seed', 0, 'pho', 'phở'),
+  ('seed', 0, 'pho', 'pho '),
+  ('seed', 1, 'bun', 'bún '),
+  ('seed', 1, 'bun', 'bún,'),
+  ('seed', 1, 'bun', 'bún.'),
+  ('seed', 1, 'bun', 'bún-'),
+  ('seed', 2, 'banh-canh', 'bánh canh'),
+  ('seed', 3, 'banh-cuon', 'bánh cuốn'),
+  ('seed', 3, 'banh-cuon', 'bánh ướt'),
+  ('seed', 4, 'banh-mi', 'bánh mì'),
+  ('seed', 4, 'banh-mi', 'banh mi'),
+  ('seed', 4, 'banh-mi', 'bánh mỳ'),
+  ('seed', 4, 'banh-mi', 'sandwich'),
+  ('seed', 4, 'banh-mi', 'hamburger'),
+  ('seed', 4, 'banh-mi', 'burger'),
+  ('seed', 5, 'chao', 'cháo'),
+  ('seed', 6, 'xoi', 'xôi'),
+  ('seed', 7, 'goi-cuon-nem', 'gỏi cuốn'),
+  ('seed', 7, 'goi-cuon-nem', 'nem nướng'),
+  ('seed', 7, 'goi-cuon-nem', 'nem cuốn'),
+  ('seed', 7, 'goi-cuon-nem', 'bì cuốn'),
+  ('seed', 7, 'goi-cuon-nem', 'cuốn diếp'),
+  ('seed', 8, 'hu-tieu-mi', 'hủ tiếu'),
+  ('seed', 8, 'hu-tieu-mi', 'hủ tíu'),
+  ('seed', 8, 'hu-tieu-mi', 'hu tieu'),
+  ('seed', 8, 'hu-tieu-mi', 'mì '),
+  ('seed', 8, 'hu-tieu-mi', 'mì,'),
+  ('seed', 8, 'hu-tieu-mi', 'mỳ '),
+  ('seed', 8, 'hu-tieu-mi', 'mì quảng'),
+  ('seed', 8, 'hu-tieu-mi', 'mì vịt'),
+  ('seed', 8, 'hu-tieu-mi', 'mì gia'),
+  ('seed', 8, 'hu-tieu-mi', 'mì xào'),
+  ('seed', 8, 'hu-tieu-mi', 'sủi cảo'),
+  ('seed', 8, 'hu-tieu-mi', 'hoành thánh'),
+  ('seed', 8, 'hu-tieu-mi', 'ramen'),
+  ('seed', 8, 'hu-tieu-mi', 'sushi'),
+  ('seed', 8, 'hu-tieu-mi', 'udon'),
+  ('seed', 8, 'hu-tieu-mi', 'soba'),
+  ('seed', 8, 'hu-tieu-mi', 'mì ý'),
+  ('seed', 8, 'hu-tieu-mi', 'spaghetti'),
+  ('seed', 9, 'com', 'cơm tấm'),
+  ('seed', 9, 'com', 'cơm '),
+  ('seed', 9, 'com', 'com tam'),
+  ('seed', 9, 'com', 'com binh dan'),
+  ('seed', 9, 'com', 'cơm hủ'),
+  ('seed', 9, 'com', 'cơm gà'),
+  ('seed', 9, 'com', 'cơm niêu'),
+  ('seed', 9, 'com', 'cơm sườn'),
+  ('seed', 10, 'chay', 'chay'),
+  ('seed', 10, 'chay', 'vegetarian'),
+  ('seed', 10, 'chay', 'vegan'),
+  ('seed', 10, 'chay', 'zen house'),
+  ('seed', 11, 'oc-hai-san', 'ốc '),
+  ('seed', 11, 'oc-hai-san', 'ốc,'),
+  ('seed', 11, 'oc-hai-san', 'ghẹ'),
+  ('seed', 11, 'oc-hai-san', 'hải sản'),
+  ('seed', 11, 'oc-hai-san', 'seafood'),
+  ('seed', 11, 'oc-hai-san', 'cua '),
+  ('seed', 11, 'oc-hai-san', 'hàu '),
+  ('seed', 11, 'oc-hai-san', 'tôm '),
+  ('seed', 11, 'oc-hai-san', 'càng ghẹ'),
+  ('seed', 11, 'oc-hai-san', 'sò '),
+  ('seed', 11, 'oc-hai-san', 'nghêu'),
+  ('seed', 12, 'lau-nuong', 'lẩu'),
+  ('seed', 12, 'lau-nuong', 'nướng'),
+  ('seed', 12, 'lau-nuong', 'hotpot'),
+  ('seed', 12, 'lau-nuong', 'bbq'),
+  ('seed', 12, 'lau-nuong', 'buffet nướng'),
+  ('seed', 12, 'lau-nuong', 'thịt nướng'),
+  ('seed', 12, 'lau-nuong', 'steak'),
+  ('seed', 12, 'lau-nuong', 'bò nướng'),
+  ('seed', 12, 'lau-nuong', 'gà nướng'),
+  ('seed', 13, 'nhau-bia', 'nhậu'),
+  ('seed', 13, 'nhau-bia', 'bia '),
+  ('seed', 13, 'nhau-bia', 'beer'),
+  ('seed', 13, 'nhau-bia', 'quán nhậu'),
+  ('seed', 13, 'nhau-bia', 'rooftop'),
+  ('seed', 13, 'nhau-bia', 'lounge'),
+  ('seed', 13, 'nhau-bia', 'bar '),
+  ('seed', 13, 'nhau-bia', 'cocktail'),
+  ('seed', 13, 'nhau-bia', 'bistro'),
+  ('seed', 13, 'nhau-bia', 'wine'),
+  ('seed', 13, 'nhau-bia', 'pub'),
+  ('seed', 14, 'cafe', 'cà phê'),
+  ('seed', 14, 'cafe', 'cafe'),
+  ('seed', 14, 'cafe', 'coffee'),
+  ('seed', 14, 'cafe', 'ca phe'),
+  ('seed', 14, 'cafe', 'caffe'),
+  ('seed', 14, 'cafe', 'kafe'),
+  ('seed', 14, 'cafe', 'cappuccino'),
+  ('seed', 14, 'cafe', 'matcha'),
+  ('seed', 14, 'cafe', 'trà '),
+  ('seed', 14, 'cafe', 'tea '),
+  ('seed', 14, 'cafe', 'acoustic'),
+  ('seed', 15, 'kem-gelato', 'kem '),
+  ('seed', 15, 'kem-gelato', 'kem,'),
+  ('seed', 15, 'kem-gelato', 'gelato'),
+  ('seed', 15, 'kem-gelato', 'ice cream'),
+  ('seed', 15, 'kem-gelato', 'yogurt'),
+  ('seed', 15, 'kem-gelato', 'sữa chua'),
+  ('seed', 16, 'che-trang-mieng', 'chè '),
+  ('seed', 16, 'che-trang-mieng', 'chè,'),
+  ('seed', 16, 'che-trang-mieng', 'bánh '),
+  ('seed', 16, 'che-trang-mieng', 'dessert'),
+  ('seed', 16, 'che-trang-mieng', 'bánh tráng'),
+  ('seed', 16, 'che-trang-mieng', 'bánh flan'),
+  ('seed', 16, 'che-trang-mieng', 'chuối nướng'),
+  ('seed', 16, 'che-trang-mieng', 'chuối nếp'),
+  ('seed', 16, 'che-trang-mieng', 'tàu hũ'),
+  ('seed', 16, 'che-trang-mieng', 'đậu hũ'),
+  ('seed', 16, 'che-trang-mieng', 'bánh bao'),
+  ('seed', 16, 'che-trang-mieng', 'bánh bột'),
+  ('seed', 16, 'che-trang-mieng', 'bánh khọt'),
+  ('seed', 16, 'che-trang-mieng', 'bánh xèo'),
+  ('seed', 16, 'che-trang-mieng', 'takoyaki'),
+  ('seed', 16, 'che-trang-mieng', 'bánh bạch tuộc'),
+  ('seed', 16, 'che-trang-mieng', 'bánh gạo'),
+  ('seed', 16, 'che-trang-mieng', 'tokbokki'),
+  ('seed', 16, 'che-trang-mieng', 'bánh tráng trộn'),
+  ('seed', 16, 'che-trang-mieng', 'bánh cống'),
+  ('seed', 16, 'che-trang-mieng', 'bánh đúc'),
+  ('seed', 16, 'che-trang-mieng', 'bánh plan'),
+  ('seed', 17, 'nuoc-uong', 'sinh tố'),
+  ('seed', 17, 'nuoc-uong', 'nước ép'),
+  ('seed', 17, 'nuoc-uong', 'nước mía'),
+  ('seed', 17, 'nuoc-uong', 'juice'),
+  ('seed', 17, 'nuoc-uong', 'smoothie'),
+  ('seed', 17, 'nuoc-uong', 'trà sữa'),
+  ('seed', 17, 'nuoc-uong', 'nước uống'),
+  ('seed', 17, 'nuoc-uong', 'fruit'),
+  ('seed', 17, 'nuoc-uong', 'boba'),
+  ('seed', 17, 'nuoc-uong', 'trà trái cây'),
+  ('seed', 18, 'nha-hang', 'nhà hàng'),
+  ('seed', 18, 'nha-hang', 'restaurant'),
+  ('seed', 18, 'nha-hang', 'dining'),
+  ('seed', 18, 'nha-hang', 'quán ăn'),
+  ('seed', 18, 'nha-hang', 'ẩm thực'),
+  ('seed', 19, 'mon-quoc-te', 'pizza'),
+  ('seed', 19, 'mon-quoc-te', 'pasta'),
+  ('seed', 19, 'mon-quoc-te', 'taco'),
+  ('seed', 19, 'mon-quoc-te', 'indian'),
+  ('seed', 19, 'mon-quoc-te', 'korean'),
+  ('seed', 19, 'mon-quoc-te', 'hàn quốc'),
+  ('seed', 19, 'mon-quoc-te', 'japanese'),
+  ('seed', 19, 'mon-quoc-te', 'nhật'),
+  ('seed', 19, 'mon-quoc-te', 'thái '),
+  ('seed', 19, 'mon-quoc-te', 'thai food'),
+  ('seed', 19, 'mon-quoc-te', 'mexican'),
+  ('seed', 19, 'mon-quoc-te', 'french'),
+  ('seed', 19, 'mon-quoc-te', 'italian'),
+  ('seed', 19, 'mon-quoc-te', 'dimsum'),
+  ('seed', 19, 'mon-quoc-te', 'dim sum'),
+  ('expanded', 1000, 'lau-nuong', 'bò bít tết'),
+  ('expanded', 1000, 'lau-nuong', 'bò né'),
+  ('expanded', 1000, 'lau-nuong', 'bò tơ'),
+  ('expanded', 1000, 'lau-nuong', 'bò lá lốt'),
+  ('expanded', 1000, 'lau-nuong', 'bê thui'),
+  ('expanded', 1000, 'lau-nuong', 'bò tùng xẻo'),
+  ('expanded', 1000, 'lau-nuong', 'dê '),
+  ('expanded', 1000, 'lau-nuong', 'dê tươi'),
+  ('expanded', 1000, 'lau-nuong', 'dê phố'),
+  ('expanded', 1000, 'lau-nuong', 'dê vàng'),
+  ('expanded', 1000, 'lau-nuong', 'heo quay'),
+  ('expanded', 1000, 'lau-nuong', 'vịt quay'),
+  ('expanded', 1000, 'lau-nuong', 'roast duck'),
+  ('expanded', 1000, 'lau-nuong', 'thui'),
+  ('expanded', 1001, 'che-trang-mieng', 'bột chiên'),
+  ('expanded', 1001, 'che-trang-mieng', 'há cảo'),
+  ('expanded', 1001, 'che-trang-mieng', 'donut'),
+  ('expanded', 1001, 'che-trang-mieng', 'cake'),
+  ('expanded', 1001, 'che-trang-mieng', 'sweet'),
+  ('expanded', 1001, 'che-trang-mieng', 'brunch'),
+  ('expanded', 1001, 'che-trang-mieng', 'cream'),
+  ('expanded', 1001, 'che-trang-mieng', 'chuối'),
+  ('expanded', 1001, 'che-trang-mieng', 'paoli'),
+  ('expanded', 1001, 'che-trang-mieng', 'dừng chân'),
+  ('expanded', 1001, 'che-trang-mieng', 'sầu riêng'),
+  ('expanded', 1002, 'bun', 'riêu'),
+  ('expanded', 1002, 'bun', 'bún cá'),
+  ('expanded', 1002, 'bun', 'bun bo'),
+  ('expanded', 1002, 'bun', 'bun ca'),
+  ('expanded', 1002, 'bun', 'bún riêu'),
+  ('expanded', 1002, 'bun', 'bún bò'),
+  ('expanded', 1003, 'hu-tieu-mi', 'mi ga'),
+  ('expanded', 1003, 'hu-tieu-mi', 'mi quang'),
+  ('expanded', 1003, 'hu-tieu-mi', 'mi gia'),
+  ('expanded', 1003, 'hu-tieu-mi', 'izakaya'),
+  ('expanded', 1003, 'hu-tieu-mi', 'sushi '),
+  ('expanded', 1003, 'hu-tieu-mi', 'sashimi'),
+  ('expanded', 1004, 'chao', 'chao suon'),
+  ('expanded', 1004, 'chao', 'porridge'),
+  ('expanded', 1004, 'chao', 'congee'),
+  ('expanded', 1004, 'chao', 'frog porridge'),
+  ('expanded', 1005, 'oc-hai-san', 'link ốc'),
+  ('expanded', 1005, 'oc-hai-san', 'bé ốc'),
+  ('expanded', 1005, 'oc-hai-san', 'ốc khánh'),
+  ('expanded', 1005, 'oc-hai-san', 'cá lóc'),
+  ('expanded', 1005, 'oc-hai-san', 'cá kèo'),
+  ('expanded', 1005, 'oc-hai-san', 'vua chả cá'),
+  ('expanded', 1006, 'mon-quoc-te', 'chicken'),
+  ('expanded', 1006, 'mon-quoc-te', 'gà rán'),
+  ('expanded', 1006, 'mon-quoc-te', 'jeju'),
+  ('expanded', 1006, 'mon-quoc-te', 'dookki'),
+  ('expanded', 1006, 'mon-quoc-te', 'topokki'),
+  ('expanded', 1006, 'mon-quoc-te', 'tokbokki'),
+  ('expanded', 1006, 'mon-quoc-te', 'gaucho'),
+  ('expanded', 1006, 'mon-quoc-te', 'burger'),
+  ('expanded', 1006, 'mon-quoc-te', 'taco '),
+  ('expanded', 1006, 'mon-quoc-te', 'tandoor'),
+  ('expanded', 1006, 'mon-quoc-te', 'halal'),
+  ('expanded', 1006, 'mon-quoc-te', 'izakaya '),
+  ('expanded', 1006, 'mon-quoc-te', 'kamura'),
+  ('expanded', 1007, 'xoi', 'xoi ga'),
+  ('expanded', 1007, 'xoi', 'sticky rice'),
+  ('expanded', 1008, 'goi-cuon-nem', 'nem chua'),
+  ('expanded', 1008, 'goi-cuon-nem', 'cuốn sài gòn'),
+  ('expanded', 1008, 'goi-cuon-nem', 'cuốn cao thắng'),
+  ('expanded', 1008, 'goi-cuon-nem', 'hang cuon'),
+  ('expanded', 1008, 'goi-cuon-nem', 'bếp cuốn'),
+  ('expanded', 1009, 'cafe', 'café'),
+  ('expanded', 1009, 'cafe', 'garden'),
+  ('expanded', 1009, 'cafe', 'running bean'),
+  ('expanded', 1009, 'cafe', 'sofé'),
+  ('expanded', 1010, 'nha-hang', 'quán ăn'),
+  ('expanded', 1010, 'nha-hang', 'food street'),
+  ('expanded', 1010, 'nha-hang', 'street food'),
+  ('expanded', 1010, 'nha-hang', 'market'),
+  ('expanded', 1010, 'nha-hang', 'buffet'),
+  ('expanded', 1010, 'nha-hang', 'cuisine'),
+  ('expanded', 1010, 'nha-hang', 'recipe'),
+  ('expanded', 1010, 'nha-hang', 'bếp '),
+  ('expanded', 1010, 'nha-hang', 'tiệm ăn'),
+  ('expanded', 1010, 'nha-hang', 'quán mộc'),
+  ('expanded', 1010, 'nha-hang', 'quán nhà'),
+  ('expanded', 1010, 'nha-hang', 'hẻm quán'),
+  ('expanded', 1010, 'nha-hang', 'deck saigon'),
+  ('expanded', 1010, 'nha-hang', 'square one'),
+  ('expanded', 1010, 'nha-hang', 'quince'),
+  ('expanded', 1010, 'nha-hang', 'opera'),
+  ('expanded', 1010, 'nha-hang', 'strand'),
+  ('expanded', 1010, 'nha-hang', 'sole saigon'),
+  ('expanded', 1010, 'nha-hang', 'oryz'),
+  ('expanded', 1010, 'nha-hang', 'dim tu tac'),
+  ('expanded', 1010, 'nha-hang', 'food connexion'),
+  ('expanded', 1010, 'nha-hang', 'quán ba tròn'),
+  ('expanded', 1010, 'nha-hang', 'hoa viên'),
+  ('expanded', 1010, 'nha-hang', 'hàng dương'),
+  ('expanded', 1010, 'nha-hang', 'quán hợp lực'),
+  ('expanded', 1010, 'nha-hang', 'quán ông tiên'),
+  ('expanded', 1010, 'nha-hang', 'quán cô béo'),
+  ('expanded', 1010, 'nha-hang', 'quán a cường'),
+  ('expanded', 1010, 'nha-hang', 'wagon wheel'),
+  ('expanded', 1010, 'nha-hang', 'điểm tâm'),
+  ('expanded', 1010, 'nha-hang', 'on the upper'),
+  ('expanded', 1010, 'nha-hang', 'latest recipe'),
+  ('expanded', 1010, 'nha-hang', 'dalat corner'),
+  ('expanded', 1010, 'nha-hang', 'cloud nine'),
+  ('expanded', 1010, 'nha-hang', 'ghiền quán'),
+  ('expanded', 1010, 'nha-hang', 'mủn quán'),
+  ('expanded', 1010, 'nha-hang', 'tam anh quán'),
+  ('expanded', 1010, 'nha-hang', 'madame lam'),
+  ('expanded', 1010, 'nha-hang', 'bếp hà nội'),
+  ('expanded', 1010, 'nha-hang', 'bếp huế'),
+  ('expanded', 1010, 'nha-hang', 'góc huế'),
+  ('expanded', 1010, 'nha-hang', 'huế thương'),
+  ('expanded', 1010, 'nha-hang', 'naked flavors'),
+  ('expanded', 1010, 'nha-hang', 'cửu long quán'),
+  ('expanded', 1010, 'nha-hang', 'tiệm vịt'),
+  ('expanded', 1010, 'nha-hang', 'trần quang ký'),
+  ('expanded', 1010, 'nha-hang', 'vịt quay'),
+  ('expanded', 1010, 'nha-hang', 'sesan'),
+  ('expanded', 1010, 'nha-hang', 'quán sở'),
+  ('expanded', 1010, 'nha-hang', 'broken rice'),
+  ('expanded', 1010, 'nha-hang', 'ben nghe'),
+  ('expanded', 1010, 'nha-hang', 'ben thanh'),
+  ('expanded', 1011, 'nuoc-uong', 'tiger sugar'),
+  ('expanded', 1011, 'nuoc-uong', 'tigersugar'),
+  ('expanded', 1011, 'nuoc-uong', 'gong cha'),
+  ('expanded', 1011, 'nuoc-uong', 'trà'),
+  ('expanded', 1011, 'nuoc-uong', 'mê trà'),
+  ('expanded', 1011, 'nuoc-uong', 'me tra'),
+  ('expanded', 1011, 'nuoc-uong', 'royaltea'),
+  ('expanded', 1012, 'kem-gelato', 'kem '),
+  ('expanded', 1012, 'kem-gelato', 'glacier'),
+  ('expanded', 1012, 'kem-gelato', 'roseice'),
+  ('expanded', 1012, 'kem-gelato', 'i love cream'),
+  ('expanded', 1012, 'kem-gelato', 'i love kem'),
+  ('expanded', 1013, 'cafe', 'pet me'),
+  ('expanded', 1013, 'cafe', 'pet coffee'),
+  ('expanded', 1013, 'cafe', 'mèo'),
+  ('expanded', 1014, 'com', 'broken rice'),
+  ('expanded', 1014, 'com', 'huyen broken');
+
+-- 5. categorize_locations(): assign the best-priority keyword match to every
+--    published location in one statement.
+--
+--    p_sources               which keyword tables to use ('seed', 'expanded')
+--    p_only_uncategorized    skip locations that already have a category
+--                            (incremental mode for new imports)
+--    p_fold_unaccented_names also match names typed without diacritics
+--                            ("Com Tam Ba Ghien") against folded keywords
+--    p_location_ids          restrict to these locations (NULL = all)
+--
+--    Returns one row per category with the number of rows inserted.
+DROP FUNCTION IF EXISTS categorize_locations(text[], boolean, boolean, uuid[]);
+
+CREATE OR REPLACE FUNCTION categorize_locations(
+  p_sources text[] DEFAULT ARRAY['seed', 'expanded'],
+  p_only_uncategorized boolean DEFAULT true,
+  p_fold_unaccented_names boolean DEFAULT false,
+  p_location_ids uuid[] DEFAULT NULL
+)
+RETURNS TABLE (category_slug text, assigned integer)
+LANGUAGE sql
+AS $$
+  WITH matches AS (
+    SELECT l.id AS location_id, k.priority, k.category_slug
+    FROM category_keywords k
+    JOIN locations l ON lower(l.name) LIKE k.pattern
+    WHERE k.source = ANY (p_sources)
+      AND l.status = 'published'
+      AND (p_location_ids IS NULL OR l.id = ANY (p_location_ids))
+      AND (NOT p_only_uncategorized
+           OR NOT EXISTS (SELECT 1 FROM location_categories lc WHERE lc.location_id = l.id))
+    UNION ALL
+    SELECT l.id AS location_id, k.priority, k.category_slug
+    FROM category_keywords k
+    JOIN locations l ON f_unaccent(lower(l.name)) LIKE k.folded_pattern
+    WHERE p_fold_unaccented_names
+      AND k.source = ANY (p_sources)
+      AND l.status = 'published'
+      AND lower(l.name) = f_unaccent(lower(l.name))
+      AND (p_location_ids IS NULL OR l.id = ANY (p_location_ids))
+      AND (NOT p_only_uncategorized
+           OR NOT EXISTS (SELECT 1 FROM location_categories lc WHERE lc.location_id = l.id))
+  ),
+  best AS (
+    SELECT DISTINCT ON (location_id) location_id, category_slug
+    FROM matches
+    ORDER BY location_id, priority
+  ),
+  inserted AS (
+    INSERT INTO location_categories (location_id, category_id)
+    SELECT b.location_id, c.id
+    FROM best b
+    JOIN categories c ON c.slug = b.category_slug
+    ON CONFLICT DO NOTHING
+    RETURNING category_id
+  )
+  SELECT c.slug, COUNT(*)::integer
+  FROM inserted i
+  JOIN categories c ON c.id = i.category_id
+  GROUP BY c.slug
+  ORDER BY 2 DESC;
+$$;
+
+-- Writes location_categories: only the service role (scripts) may call it.
+REVOKE EXECUTE ON FUNCTION categorize_locations(text[], boolean, boolean, uuid[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION categorize_locations(text[], boolean, boolean, uuid[]) TO service_role;
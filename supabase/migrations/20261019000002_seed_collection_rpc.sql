@@ -0,0 +1,126 @@
+-- ============================================================
+-- Migration: seed_collection() / seed_collections() RPCs
+--   Create a curated collection and its positioned members in one
+--   transaction (used by scripts/seed-new-collections.py).
+-- Date: 2026-10-19
+-- ============================================================
+
+-- 1. Match spec clause test.
+--
+--    A clause is a JSON object whose keys are ANDed; absent keys always pass:
+--      name_regex        lower(name) ~* regex
+--      summary_regex     lower(google_review_summary) ~* regex
+--      address_regex     lower(address) ~* regex
+--      price_ranges      price_range is one of the listed values
+--      min_rating        COALESCE(google_rating, 0) >= value
+--      min_review_count  COALESCE(google_review_count, 0) >= value
+CREATE OR REPLACE FUNCTION location_matches_clause(l locations, c jsonb)
+RETURNS boolean
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    (c->>'name_regex' IS NULL OR LOWER(l.name) ~* (c->>'name_regex'))
+    AND (c->>'summary_regex' IS NULL OR LOWER(COALESCE(l.google_review_summary, '')) ~* (c->>'summary_regex'))
+    AND (c->>'address_regex' IS NULL OR LOWER(COALESCE(l.address, '')) ~* (c->>'address_regex'))
+    AND (c->'price_ranges' IS NULL
+         OR l.price_range = ANY (ARRAY(SELECT jsonb_array_elements_text(c->'price_ranges'))))
+    AND (c->>'min_rating' IS NULL OR COALESCE(l.google_rating, 0) >= (c->>'min_rating')::numeric)
+    AND (c->>'min_review_count' IS NULL OR COALESCE(l.google_review_count, 0) >= (c->>'min_review_count')::integer)
+$$;
+
+-- 2. seed_collection(): insert the collection, select candidates and insert
+--    positioned collection_locations in a single statement.
+--
+--    p_collection  {title, slug, description, mood, emoji}
+--    p_match       {all: clause, any: [clause, ...], order_by: 'rating' | 'newest', limit: n}
+--                  Published locations must match `all` and at least one
+--                  `any` clause (when given). Positions follow order_by.
+--
+--    Existing slugs are left untouched and reported with created = false.
+DROP FUNCTION IF EXISTS seed_collection(jsonb, jsonb);
+
+CREATE OR REPLACE FUNCTION seed_collection(p_collection jsonb, p_match jsonb)
+RETURNS TABLE (collection_id integer, slug text, linked integer, created boolean)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_existing integer;
+BEGIN
+  SELECT c.id INTO v_existing FROM collections c WHERE c.slug = p_collection->>'slug';
+  IF FOUND THEN
+    RETURN QUERY SELECT v_existing, p_collection->>'slug', 0, false;
+    RETURN;
+  END IF;
+
+  RETURN QUERY
+  WITH new_collection AS (
+    INSERT INTO collections (title, slug, description, mood, emoji, source, status, is_featured)
+    VALUES (
+      p_collection->>'title',
+      p_collection->>'slug',
+      p_collection->>'description',
+      p_collection->>'mood',
+      p_collection->>'emoji',
+      'manual',
+      'published',
+      false
+    )
+    RETURNING id
+  ),
+  candidates AS (
+    SELECT
+      l.id,
+      ROW_NUMBER() OVER (
+        ORDER BY
+          CASE WHEN p_match->>'order_by' = 'newest' THEN l.created_at END DESC NULLS LAST,
+          COALESCE(l.google_rating, 0) DESC,
+          l.id
+      )::integer AS position
+    FROM locations l
+    WHERE l.status = 'published'
+      AND location_matches_clause(l, COALESCE(p_match->'all', '{}'::jsonb))
+      AND (
+        p_match->'any' IS NULL
+        OR EXISTS (
+          SELECT 1 FROM jsonb_array_elements(p_match->'any') AS clause(c)
+          WHERE location_matches_clause(l, clause.c)
+        )
+      )
+  ),
+  links AS (
+    INSERT INTO collection_locations (collection_id, location_id, position)
+    SELECT nc.id, cand.id, cand.position
+    FROM new_collection nc
+    CROSS JOIN candidates cand
+    WHERE cand.position <= COALESCE((p_match->>'limit')::integer, 30)
+    RETURNING 1
+  )
+  SELECT nc.id, p_collection->>'slug', (SELECT COUNT(*)::integer FROM links), true
+  FROM new_collection nc;
+END;
+$$;
+
+-- 3. seed_collections(): the same for a whole batch, in one transaction.
+--    p_items is [{collection: {...}, match: {...}}, ...].
+DROP FUNCTION IF EXISTS seed_collections(jsonb);
+
+CREATE OR REPLACE FUNCTION seed_collections(p_items jsonb)
+RETURNS TABLE (collection_id integer, slug text, linked integer, created boolean)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  item jsonb;
+BEGIN
+  FOR item IN SELECT * FROM jsonb_array_elements(p_items) LOOP
+    RETURN QUERY SELECT * FROM seed_collection(item->'collection', item->'match');
+  END LOOP;
+END;
+$$;
+
+-- Both write collections: only the service role (scripts) may call them.
+REVOKE EXECUTE ON FUNCTION seed_collection(jsonb, jsonb) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION seed_collections(jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION seed_collection(jsonb, jsonb) TO service_role;
+GRANT EXECUTE ON FUNCTION seed_collections(jsonb) TO service_role;
@@ -0,0 +1,19 @@
+-- ============================================================
+-- Migration: Precomputed post derivatives
+--   Table of contents, word count, /place/ links and images extracted
+--   from posts.content when a post is written (scripts/common/post_html.py),
+--   so pages read them instead of parsing the HTML on every render.
+--   Existing posts are filled by scripts/analyze-posts.py.
+-- Date: 2026-10-19
+-- ============================================================
+
+-- [{"level": 2, "text": "...", "anchor": "..."}], anchors match the headings' id attributes
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS toc JSONB NOT NULL DEFAULT '[]';
+-- NULL until the post has been analyzed
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS word_count INTEGER;
+-- /place/<slug> link targets, in order of first appearance
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS place_slugs TEXT[] NOT NULL DEFAULT '{}';
+-- [{"src": "...", "alt": "..."}]
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS images JSONB NOT NULL DEFAULT '[]';
+
+CREATE INDEX IF NOT EXISTS idx_posts_place_slugs ON posts USING GIN (place_slugs);
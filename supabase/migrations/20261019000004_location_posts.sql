@@ -0,0 +1,95 @@
+-- ============================================================
+-- Migration: location_posts reverse index
+--   Which posts mention each location, kept in sync with
+--   posts.place_slugs (the /place/ links in the HTML) and
+--   posts.related_location_slugs by a trigger, so place pages find
+--   their articles with one indexed lookup instead of scanning posts.
+--   Posts written before place_slugs existed are filled in by
+--   scripts/analyze-posts.py, which parses their HTML.
+-- Date: 2026-10-19
+-- ============================================================
+
+-- 1. Junction table
+CREATE TABLE IF NOT EXISTS location_posts (
+  location_id uuid NOT NULL REFERENCES locations(id) ON DELETE CASCADE,
+  post_id uuid NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+  position integer NOT NULL DEFAULT 0,   -- order of first mention in the post
+  linked boolean NOT NULL DEFAULT false, -- true when the HTML links /place/<slug>
+  PRIMARY KEY (location_id, post_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_location_posts_post ON location_posts (post_id);
+
+-- 2. Rebuild one post's rows from its slug arrays
+CREATE OR REPLACE FUNCTION sync_location_posts(p_post_id uuid)
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  DELETE FROM location_posts WHERE post_id = p_post_id;
+
+  INSERT INTO location_posts (location_id, post_id, position, linked)
+  SELECT l.id, p.id, MIN(m.position), bool_or(m.linked)
+  FROM posts p
+  CROSS JOIN LATERAL (
+    SELECT slug, ord AS position, true AS linked
+    FROM unnest(COALESCE(p.place_slugs, '{}')) WITH ORDINALITY AS s(slug, ord)
+    UNION ALL
+    SELECT slug, 1000 + ord, false
+    FROM unnest(COALESCE(p.related_location_slugs, '{}')) WITH ORDINALITY AS s(slug, ord)
+  ) m
+  JOIN locations l ON l.slug = m.slug
+  WHERE p.id = p_post_id
+  GROUP BY l.id, p.id;
+$$;
+
+-- 3. Keep it in sync on every write that can change the slugs
+CREATE OR REPLACE FUNCTION sync_location_posts_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM sync_location_posts(NEW.id);
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_location_posts ON posts;
+CREATE TRIGGER trg_location_posts
+  AFTER INSERT OR UPDATE OF place_slugs, related_location_slugs ON posts
+  FOR EACH ROW
+  EXECUTE FUNCTION sync_location_posts_trigger();
+
+REVOKE EXECUTE ON FUNCTION sync_location_posts(uuid) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION sync_location_posts(uuid) TO service_role;
+
+-- 4. Backfill from what existing posts already store
+SELECT sync_location_posts(id) FROM posts;
+
+-- 5. Published posts mentioning a location: those linking it first, then newest
+--    (callers pick columns: rpc('get_location_posts', ...).select('id, title, ...'))
+CREATE OR REPLACE FUNCTION get_location_posts(p_location_slug text, p_limit integer DEFAULT 4)
+RETURNS SETOF posts
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT p.*
+  FROM locations l
+  JOIN location_posts lp ON lp.location_id = l.id
+  JOIN posts p ON p.id = lp.post_id
+  WHERE l.slug = p_location_slug
+    AND p.status = 'published'
+  ORDER BY lp.linked DESC, p.published_at DESC NULLS LAST
+  LIMIT p_limit;
+$$;
+
+-- 6. RLS: readable by everyone (posts' own policy still hides drafts); written only by the trigger
+ALTER TABLE location_posts ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "location_posts_select_all" ON location_posts;
+CREATE POLICY "location_posts_select_all"
+  ON location_posts FOR SELECT
+  USING (true);
@@ -0,0 +1,71 @@
+-- ============================================================
+-- Migration: post_related
+--   Precomputed related posts (TF-IDF cosine neighbours over title,
+--   tags, body text and shared locations), written by
+--   scripts/compute-related-posts.py so a related-posts widget is a
+--   single key lookup.
+-- Date: 2026-10-19
+-- ============================================================
+
+-- 1. Neighbour lists, rank 1 = most similar
+CREATE TABLE IF NOT EXISTS post_related (
+  post_id uuid NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+  related_post_id uuid NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+  rank smallint NOT NULL,
+  score real NOT NULL,
+  computed_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (post_id, rank),
+  UNIQUE (post_id, related_post_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_post_related_related ON post_related (related_post_id);
+
+-- 2. set_post_related(): replace the lists of the given posts in one transaction
+--
+--    p_post_ids  posts whose lists are rewritten (a post with no rows ends up with none)
+--    p_rows      [{post_id, related_post_id, rank, score}, ...]
+CREATE OR REPLACE FUNCTION set_post_related(p_post_ids uuid[], p_rows jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_written integer;
+BEGIN
+  DELETE FROM post_related WHERE post_id = ANY (p_post_ids);
+
+  INSERT INTO post_related (post_id, related_post_id, rank, score)
+  SELECT r.post_id, r.related_post_id, r.rank, r.score
+  FROM jsonb_to_recordset(p_rows) AS r(post_id uuid, related_post_id uuid, rank smallint, score real)
+  WHERE r.post_id = ANY (p_post_ids);
+
+  GET DIAGNOSTICS v_written = ROW_COUNT;
+  RETURN v_written;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION set_post_related(uuid[], jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION set_post_related(uuid[], jsonb) TO service_role;
+
+-- 3. Published related posts of a post, best first
+--    (callers pick columns: rpc('get_related_posts', ...).select('id, title, ...'))
+CREATE OR REPLACE FUNCTION get_related_posts(p_post_id uuid, p_limit integer DEFAULT 4)
+RETURNS SETOF posts
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT p.*
+  FROM post_related pr
+  JOIN posts p ON p.id = pr.related_post_id
+  WHERE pr.post_id = p_post_id
+    AND p.status = 'published'
+  ORDER BY pr.rank
+  LIMIT p_limit;
+$$;
+
+-- 4. RLS: readable by everyone; written only by set_post_related() (service role)
+ALTER TABLE post_related ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "post_related_select_all" ON post_related;
+CREATE POLICY "post_related_select_all"
+  ON post_related FOR SELECT
+  USING (true);
@@ -0,0 +1,52 @@
+-- ============================================================
+-- Migration: post_related_computed
+--   Records which posts compute-related-posts.py has already
+--   processed, so a post whose neighbours all scored below
+--   --min-score (and so has no post_related rows) is not treated
+--   as new and recomputed on every incremental run.
+-- Date: 2026-10-19
+-- ============================================================
+
+-- 1. One row per post whose related list has been computed
+CREATE TABLE IF NOT EXISTS post_related_computed (
+  post_id uuid PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+  computed_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Backfill: every post that already has a list
+INSERT INTO post_related_computed (post_id, computed_at)
+SELECT post_id, max(computed_at)
+FROM post_related
+GROUP BY post_id
+ON CONFLICT (post_id) DO NOTHING;
+
+-- 2. set_post_related() now also marks the given posts as computed
+CREATE OR REPLACE FUNCTION set_post_related(p_post_ids uuid[], p_rows jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_written integer;
+BEGIN
+  DELETE FROM post_related WHERE post_id = ANY (p_post_ids);
+
+  INSERT INTO post_related (post_id, related_post_id, rank, score)
+  SELECT r.post_id, r.related_post_id, r.rank, r.score
+  FROM jsonb_to_recordset(p_rows) AS r(post_id uuid, related_post_id uuid, rank smallint, score real)
+  WHERE r.post_id = ANY (p_post_ids);
+
+  GET DIAGNOSTICS v_written = ROW_COUNT;
+
+  INSERT INTO post_related_computed (post_id, computed_at)
+  SELECT id, now() FROM unnest(p_post_ids) AS id
+  ON CONFLICT (post_id) DO UPDATE SET computed_at = EXCLUDED.computed_at;
+
+  RETURN v_written;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION set_post_related(uuid[], jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION set_post_related(uuid[], jsonb) TO service_role;
+
+-- 3. RLS: bookkeeping for the script only (service role bypasses RLS; no public policy)
+ALTER TABLE post_related_computed ENABLE ROW LEVEL SECURITY;